@@ -1,96 +1,114 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, BackgroundTasks, Query
-from fastapi.responses import StreamingResponse
+from fastapi import APIRouter, UploadFile, File, HTTPException, BackgroundTasks, Query, Depends, Request
+from fastapi.responses import Response
 from typing import List, Optional
-from sqlalchemy.orm import Session
-from ....core.audio.analyzer import AudioAnalyzer
-from ....core.metadata.enricher import MetadataEnricher
-from ....models.audio import AudioFile, AudioFeatures, Metadata, Tag
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, load_only, selectinload
+from ....config import settings
+from ....core.audio.executor import AnalysisQueueFullError, AnalysisTimeoutError
+from ....core.audio.records import build_audio_file, build_audio_features, build_metadata
+from ....core.audio.uploads import save_upload, UploadRejectedError
+from ....core.audio.waveform import WaveformStore, WaveformError
+from ....core.similarity.feature_index import FeatureIndex
+from ....core.similarity.embedding_index import EmbeddingIndex
+from ....core.similarity.duplicate_index import DuplicateIndex
+from ....models.audio import AudioFile, Metadata, Tag
 from ....schemas.audio import (
     AudioFile as AudioFileSchema,
+    AudioFileSummary,
     AudioAnalysisResult,
-    SimilaritySearchResult
+    SimilaritySearchResult,
+    DuplicateCluster
 )
-from ....db.session import get_db
-import aiofiles
+from ....db.session import get_async_db
+from ..responses import RangeFileResponse
+from ..services import get_analysis_cache, get_analysis_executor, get_analyzer, get_enricher
 import os
+import json
 from pathlib import Path
 import shutil
 import asyncio
 from datetime import datetime
 
 router = APIRouter()
-analyzer = AudioAnalyzer()
-enricher = MetadataEnricher()
+feature_index = FeatureIndex()
+embedding_index = EmbeddingIndex(
+    path=settings.EMBEDDING_INDEX_PATH,
+    nprobe=settings.EMBEDDING_INDEX_NPROBE
+)
+duplicate_index = DuplicateIndex(max_bit_error_rate=settings.DUPLICATE_MAX_BIT_ERROR_RATE)
+waveform_store = WaveformStore()
 
 @router.post("/analyze", response_model=AudioAnalysisResult)
 async def analyze_audio(
     file: UploadFile = File(...),
     background_tasks: BackgroundTasks = None,
-    db: Session = Depends(get_db)
+    profile: bool = Query(False),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Analyze an audio file and extract features and metadata.
     The file will be processed in the background if background_tasks is provided.
+    The response's timings give per-stage wall/CPU time and memory; with
+    profile=true the file is analyzed even if cached, and profile lists the
+    functions feature extraction spent most time in.
     """
     # Create temporary file
-    temp_file = Path(settings.TEMP_DIR) / f"temp_{datetime.now().timestamp()}_{file.filename}"
+    temp_file = Path(settings.TEMP_DIR) / f"temp_{datetime.now().timestamp()}_{Path(file.filename).name}"
     temp_file.parent.mkdir(parents=True, exist_ok=True)
     
     try:
-        # Save uploaded file
-        async with aiofiles.open(temp_file, 'wb') as out_file:
-            content = await file.read()
-            await out_file.write(content)
+        # Save uploaded file without buffering it in memory, hashing it on the way
+        content_hash = await save_upload(file, temp_file)
         
-        # Start analysis
-        features = await analyzer.analyze_file(str(temp_file))
+        # Reuse a previous analysis of the same bytes if we have one
+        analyzer, analysis_cache = get_analyzer(), get_analysis_cache()
+        waveform_path = waveform_store.path_for_hash(content_hash)
+        features = None if profile else await analysis_cache.get(content_hash)
+        if features is None:
+            features = await analyzer.analyze_file(
+                str(temp_file),
+                waveform_path=None if waveform_path.exists() else str(waveform_path),
+                profile=profile
+            )
+            await analysis_cache.set(content_hash, features)
+            timings = features.get('timings', {})
+        elif not waveform_path.exists():
+            await analyzer.generate_waveform(str(temp_file), str(waveform_path))
+            timings = {'decodes': 1, 'cached': True}
+        else:
+            timings = {'decodes': 0, 'cached': True}
         
         # Get metadata based on analysis
-        metadata = await enricher.enrich_metadata(
+        metadata = await get_enricher().enrich_metadata(
             basic_metadata={'filename': file.filename},
             genre_prediction=features.get('genre')
         )
         
         # Create database entries
-        audio_file = AudioFile(
-            path=str(temp_file),
-            filename=file.filename,
-            duration=features['duration'],
-            sample_rate=features['sample_rate'],
-            channels=2,  # TODO: Get from file
-            bit_depth=16,  # TODO: Get from file
-            format=file.filename.split('.')[-1].lower()
-        )
+        audio_file = build_audio_file(str(temp_file), file.filename, features)
         db.add(audio_file)
-        db.flush()
+        await db.flush()
         
         # Create features entry
-        audio_features = AudioFeatures(
-            audio_file_id=audio_file.id,
-            tempo=features['tempo']['tempo'],
-            tempo_confidence=features['tempo']['confidence'],
-            beat_positions=features['tempo']['beat_frames'],
-            spectral_centroid=features['spectral_features']['centroid_mean'],
-            spectral_rolloff=features['spectral_features']['rolloff_mean'],
-            spectral_bandwidth=features['spectral_features']['bandwidth_mean'],
-            mfcc_mean=features['mfcc']['mean'],
-            mfcc_var=features['mfcc']['var'],
-            key=features['key']['key'],
-            key_confidence=features['key']['confidence'],
-            acoustid_fingerprint=features['fingerprint'],
-            embedding=features.get('embedding')
-        )
+        audio_features = build_audio_features(audio_file.id, features)
         db.add(audio_features)
         
         # Create metadata entry
-        audio_metadata = Metadata(
-            audio_file_id=audio_file.id,
-            **metadata
-        )
+        audio_metadata = build_metadata(audio_file.id, metadata)
         db.add(audio_metadata)
         
         # Commit changes
-        db.commit()
+        await db.commit()
+        waveform_store.link(content_hash, audio_file.id)
+        
+        # Keep the in-memory similarity index in sync
+        if feature_index.loaded:
+            feature_index.add(audio_file.id, audio_features)
+        if embedding_index.loaded and audio_features.embedding is not None:
+            embedding_index.add(audio_file.id, audio_features.embedding)
+        if duplicate_index.loaded and audio_features.acoustid_fingerprint:
+            duplicate_index.add(audio_file.id, audio_features.acoustid_fingerprint)
         
         # Schedule cleanup in background
         if background_tasks:
@@ -99,191 +117,262 @@ async def analyze_audio(
         return AudioAnalysisResult(
             features=audio_features,
             metadata=audio_metadata,
-            suggested_tags=[]  # TODO: Implement tag suggestions
+            suggested_tags=[],  # TODO: Implement tag suggestions
+            timings=timings,
+            profile=features.get('profile')
         )
         
     except Exception as e:
         # Clean up temp file
         if temp_file.exists():
             temp_file.unlink()
+        if isinstance(e, UploadRejectedError):
+            raise HTTPException(status_code=e.status_code, detail=str(e))
+        if isinstance(e, AnalysisQueueFullError):
+            raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "10"})
+        if isinstance(e, AnalysisTimeoutError):
+            raise HTTPException(status_code=504, detail=str(e))
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/files", response_model=List[AudioFileSummary])
+async def list_audio_files(
+    limit: int = Query(100, ge=1, le=1000),
+    after_id: Optional[int] = Query(None, ge=0),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    List audio files with their metadata and tags, in id order.
+    Pass the last id of a page as after_id to get the next one. Features are not
+    included; fetch them per file when needed.
+    """
+    query = select(AudioFile).options(
+        load_only(
+            AudioFile.id, AudioFile.path, AudioFile.filename, AudioFile.duration,
+            AudioFile.format, AudioFile.created_at
+        ),
+        joinedload(AudioFile.track_metadata),
+        selectinload(AudioFile.tags)
+    )
+    if after_id is not None:
+        query = query.where(AudioFile.id > after_id)
+    result = await db.execute(query.order_by(AudioFile.id).limit(limit))
+    return result.scalars().all()
+
 @router.get("/similar/{file_id}", response_model=List[SimilaritySearchResult])
 async def find_similar(
     file_id: int,
     limit: int = Query(10, ge=1, le=100),
     threshold: float = Query(0.5, ge=0, le=1),
-    db: Session = Depends(get_db)
+    mode: str = Query("features", pattern="^(features|embedding)$"),
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Find similar audio files based on the features of the given file.
+    With mode=embedding, rank by cosine similarity of the neural embeddings
+    using the approximate nearest-neighbour index instead.
     """
     # Get source file features
-    source_file = db.query(AudioFile).filter(AudioFile.id == file_id).first()
+    source_file = (await db.execute(
+        select(AudioFile).options(joinedload(AudioFile.features)).where(AudioFile.id == file_id)
+    )).scalars().first()
     if not source_file or not source_file.features:
         raise HTTPException(status_code=404, detail="File not found or not analyzed")
     
-    # Get all other files with features
-    candidates = db.query(AudioFile).join(AudioFeatures).filter(
-        AudioFile.id != file_id
-    ).all()
+    if mode == "embedding":
+        matches = await search_embedding_index(source_file, limit, threshold, db)
+    else:
+        # Score all candidates in one pass over the in-memory feature index
+        await db.run_sync(feature_index.ensure_loaded)
+        if file_id not in feature_index:
+            feature_index.add(file_id, source_file.features)
+        matches = feature_index.search(file_id, limit=limit, threshold=threshold)
+    if not matches:
+        return []
     
-    # Calculate similarity scores
-    results = []
-    for candidate in candidates:
-        score = calculate_similarity(
-            source_file.features,
-            candidate.features
+    # Only hydrate the files that made it into the top results, with everything the
+    # response serializes loaded up front (one query per relationship, not per file)
+    result = await db.execute(
+        select(AudioFile).options(
+            joinedload(AudioFile.features),
+            joinedload(AudioFile.track_metadata),
+            selectinload(AudioFile.tags)
+        ).where(
+            AudioFile.id.in_([match_id for match_id, _, _ in matches])
         )
-        
-        if score >= threshold:
-            results.append(SimilaritySearchResult(
-                audio_file=candidate,
-                similarity_score=score,
-                matching_features=get_matching_features(
-                    source_file.features,
-                    candidate.features
-                )
-            ))
+    )
+    candidates = {candidate.id: candidate for candidate in result.scalars().all()}
     
-    # Sort by similarity score and return top results
-    results.sort(key=lambda x: x.similarity_score, reverse=True)
-    return results[:limit]
+    return [
+        SimilaritySearchResult(
+            audio_file=candidates[match_id],
+            similarity_score=score,
+            matching_features=matching_features
+        )
+        for match_id, score, matching_features in matches
+        if match_id in candidates
+    ]
 
-@router.get("/stream/{file_id}")
-async def stream_audio(file_id: int, db: Session = Depends(get_db)):
+@router.get("/duplicates", response_model=List[DuplicateCluster])
+async def find_duplicates(
+    file_id: Optional[int] = Query(None),
+    max_bit_error_rate: Optional[float] = Query(None, ge=0, le=0.5),
+    db: AsyncSession = Depends(get_async_db)
+):
     """
-    Stream an audio file.
+    Find clusters of near-identical recordings (re-encodes, different bitrates,
+    trimmed copies) by comparing their Chromaprint fingerprints. Pairs are scored
+    by the bit error rate of the aligned fingerprints, lower being closer; pass
+    file_id to only get the cluster of that file.
     """
-    audio_file = db.query(AudioFile).filter(AudioFile.id == file_id).first()
-    if not audio_file:
-        raise HTTPException(status_code=404, detail="File not found")
-    
-    if not os.path.exists(audio_file.path):
-        raise HTTPException(status_code=404, detail="File not found on disk")
-    
-    def iterfile():
-        with open(audio_file.path, 'rb') as f:
-            while chunk := f.read(8192):
-                yield chunk
+    await db.run_sync(duplicate_index.ensure_loaded)
+    if file_id is not None and file_id not in duplicate_index:
+        raise HTTPException(status_code=404, detail="File not found or not fingerprinted")
+    clusters = await db.run_sync(
+        lambda session: duplicate_index.duplicates(session, file_id=file_id, max_bit_error_rate=max_bit_error_rate)
+    )
+    if not clusters:
+        return []
     
-    return StreamingResponse(
-        iterfile(),
-        media_type=f"audio/{audio_file.format}"
+    result = await db.execute(
+        select(AudioFile).options(
+            load_only(
+                AudioFile.id, AudioFile.path, AudioFile.filename, AudioFile.duration,
+                AudioFile.format, AudioFile.created_at
+            ),
+            joinedload(AudioFile.track_metadata),
+            selectinload(AudioFile.tags)
+        ).where(
+            AudioFile.id.in_([f for cluster in clusters for f in cluster['file_ids']])
+        )
     )
+    files = {audio_file.id: audio_file for audio_file in result.scalars().all()}
+    
+    return [
+        DuplicateCluster(
+            files=[files[f] for f in cluster['file_ids'] if f in files],
+            pairs=cluster['pairs']
+        )
+        for cluster in clusters
+    ]
 
-def calculate_similarity(source_features: AudioFeatures, candidate_features: AudioFeatures) -> float:
+@router.get("/duplicate-index/stats")
+async def duplicate_index_stats():
     """
-    Calculate similarity score between two audio files based on their features.
-    Returns a score between 0 and 1, where 1 is most similar.
+    Get the size of the fingerprint duplicate index.
     """
-    weights = {
-        'tempo': 0.2,
-        'spectral': 0.3,
-        'mfcc': 0.4,
-        'key': 0.1
-    }
-    
-    scores = {
-        'tempo': compare_tempo(
-            source_features.tempo,
-            candidate_features.tempo,
-            source_features.tempo_confidence,
-            candidate_features.tempo_confidence
-        ),
-        'spectral': compare_spectral(
-            source_features,
-            candidate_features
-        ),
-        'mfcc': compare_mfcc(
-            source_features.mfcc_mean,
-            candidate_features.mfcc_mean
-        ),
-        'key': compare_key(
-            source_features.key,
-            candidate_features.key,
-            source_features.key_confidence,
-            candidate_features.key_confidence
-        )
-    }
-    
-    return sum(score * weights[feature] for feature, score in scores.items())
+    return duplicate_index.stats()
 
-def compare_tempo(tempo1: float, tempo2: float, conf1: float, conf2: float) -> float:
-    """Compare tempos with confidence weighting"""
-    diff = abs(tempo1 - tempo2)
-    max_diff = 20  # Maximum tempo difference to consider
-    base_score = max(0, 1 - (diff / max_diff))
-    confidence = (conf1 + conf2) / 2
-    return base_score * confidence
+@router.get("/analysis-executor/stats")
+async def analysis_executor_stats():
+    """
+    Get queue depth and job counters of the analysis worker pool.
+    """
+    return get_analysis_executor().stats()
 
-def compare_spectral(features1: AudioFeatures, features2: AudioFeatures) -> float:
-    """Compare spectral features"""
-    centroid_diff = abs(features1.spectral_centroid - features2.spectral_centroid)
-    rolloff_diff = abs(features1.spectral_rolloff - features2.spectral_rolloff)
-    bandwidth_diff = abs(features1.spectral_bandwidth - features2.spectral_bandwidth)
-    
-    # Normalize differences
-    max_diffs = {
-        'centroid': 5000,
-        'rolloff': 5000,
-        'bandwidth': 2000
-    }
-    
-    scores = {
-        'centroid': max(0, 1 - (centroid_diff / max_diffs['centroid'])),
-        'rolloff': max(0, 1 - (rolloff_diff / max_diffs['rolloff'])),
-        'bandwidth': max(0, 1 - (bandwidth_diff / max_diffs['bandwidth']))
-    }
-    
-    return sum(scores.values()) / len(scores)
+@router.get("/analysis-cache/stats")
+async def analysis_cache_stats():
+    """
+    Get hit/miss counters of the content-hash analysis cache.
+    """
+    return get_analysis_cache().stats()
 
-def compare_mfcc(mfcc1: List[float], mfcc2: List[float]) -> float:
-    """Compare MFCC features using cosine similarity"""
-    import numpy as np
-    from scipy.spatial.distance import cosine
-    
-    return 1 - cosine(mfcc1, mfcc2)
+@router.get("/inference/stats")
+async def inference_stats():
+    """
+    Get batch counters and timings of the genre/embedding model.
+    """
+    analyzer = get_analyzer()
+    if not analyzer.inference:
+        return {'enabled': False}
+    return {'enabled': True, **analyzer.inference.stats()}
 
-def compare_key(key1: str, key2: str, conf1: float, conf2: float) -> float:
-    """Compare musical keys with confidence weighting"""
-    # Convert keys to numerical values (0-11 for C through B)
-    key_map = {'C': 0, 'C#': 1, 'D': 2, 'D#': 3, 'E': 4, 'F': 5,
-               'F#': 6, 'G': 7, 'G#': 8, 'A': 9, 'A#': 10, 'B': 11}
+@router.get("/embedding-index/report")
+async def embedding_index_report(
+    k: int = Query(10, ge=1, le=100),
+    queries: int = Query(100, ge=1, le=1000),
+    nprobe: Optional[int] = Query(None, ge=1),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Report recall@k and query latency of the embedding index against an exact scan.
+    """
+    await db.run_sync(embedding_index.ensure_loaded)
+    return embedding_index.recall_report(k=k, n_queries=queries, nprobe=nprobe)
+
+async def search_embedding_index(source_file: AudioFile, limit: int, threshold: float, db: AsyncSession) -> List[tuple]:
+    """Look up nearest neighbours of a file's embedding in the ANN index"""
+    if source_file.features.embedding is None:
+        raise HTTPException(status_code=404, detail="File has no embedding")
     
-    key1_val = key_map[key1.split()[0]]
-    key2_val = key_map[key2.split()[0]]
+    await db.run_sync(embedding_index.ensure_loaded)
+    if source_file.id not in embedding_index:
+        embedding_index.add(source_file.id, source_file.features.embedding)
     
-    # Calculate minimum distance between keys (considering circle of fifths)
-    diff = min((key1_val - key2_val) % 12, (key2_val - key1_val) % 12)
-    max_diff = 6  # Maximum difference in semitones
+    return [
+        (match_id, score, {'embedding': score})
+        for match_id, score in embedding_index.search(
+            source_file.features.embedding,
+            limit=limit,
+            exclude=source_file.id
+        )
+        if score >= threshold
+    ]
+
+@router.api_route("/stream/{file_id}", methods=["GET", "HEAD"])
+async def stream_audio(file_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
+    """
+    Stream an audio file.
+    Supports byte ranges (for seeking) and conditional requests via ETag/Last-Modified.
+    """
+    audio_file = (await db.execute(
+        select(AudioFile).options(load_only(AudioFile.path, AudioFile.format)).where(AudioFile.id == file_id)
+    )).scalars().first()
+    if not audio_file:
+        raise HTTPException(status_code=404, detail="File not found")
     
-    base_score = 1 - (diff / max_diff)
-    confidence = (conf1 + conf2) / 2
+    try:
+        stat_result = os.stat(audio_file.path)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="File not found on disk")
     
-    return base_score * confidence
+    return RangeFileResponse(
+        audio_file.path,
+        request.headers,
+        media_type=f"audio/{audio_file.format}",
+        stat_result=stat_result
+    )
 
-def get_matching_features(features1: AudioFeatures, features2: AudioFeatures) -> Dict[str, Any]:
+@router.get("/waveform/{file_id}")
+async def get_waveform(
+    file_id: int,
+    level: Optional[int] = Query(None, ge=0),
+    width: Optional[int] = Query(None, ge=1),
+    format: str = Query("dat", pattern="^(dat|json)$")
+):
     """
-    Identify which features are most similar between two audio files.
-    Returns a dictionary of feature names and their similarity scores.
+    Get precomputed waveform peaks for an audio file.
+    Returns one zoom level (0 is the finest), or with `width` the coarsest level with
+    at least that many peaks, in audiowaveform's binary .dat or JSON format.
     """
-    return {
-        'tempo': compare_tempo(
-            features1.tempo,
-            features2.tempo,
-            features1.tempo_confidence,
-            features2.tempo_confidence
-        ),
-        'spectral': compare_spectral(features1, features2),
-        'mfcc': compare_mfcc(features1.mfcc_mean, features2.mfcc_mean),
-        'key': compare_key(
-            features1.key,
-            features2.key,
-            features1.key_confidence,
-            features2.key_confidence
-        )
-    }
+    try:
+        waveform = waveform_store.open(file_id)
+        if waveform is None:
+            raise HTTPException(status_code=404, detail="Waveform not found")
+        
+        index = level if level is not None else waveform.level_for_width(width) if width else 0
+        headers = {
+            "X-Waveform-Level": str(index),
+            "X-Waveform-Levels": ",".join(str(entry['samples_per_peak']) for entry in waveform.levels)
+        }
+        if format == "json":
+            return Response(
+                content=json.dumps(waveform.to_json(index)),
+                media_type="application/json",
+                headers=headers
+            )
+        return Response(content=waveform.to_dat(index), media_type="application/octet-stream", headers=headers)
+    except WaveformError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 async def cleanup_temp_file(file_path: Path):
     """Clean up temporary file after processing"""
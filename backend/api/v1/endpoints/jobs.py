@@ -0,0 +1,109 @@
+from fastapi import APIRouter, HTTPException, Depends, Query
+from sqlalchemy.orm import Session
+from typing import Any, Dict, List
+from datetime import datetime
+from pathlib import Path
+from ....config import settings
+from ....models.jobs import IngestJob, IngestJobFailure
+from ....schemas.jobs import (
+    IngestJob as IngestJobSchema,
+    IngestJobCreate
+)
+from ....tasks.ingest import discover_audio_files, dispatch_ingest_job
+from ....db.session import get_db
+
+router = APIRouter()
+
+@router.post("", response_model=IngestJobSchema, status_code=202)
+def create_ingest_job(request: IngestJobCreate, db: Session = Depends(get_db)):
+    """
+    Start ingesting a directory or a list of files.
+    Files are analyzed, enriched and stored by Celery workers in batches of BATCH_SIZE.
+    """
+    if request.directory:
+        if not Path(request.directory).is_dir():
+            raise HTTPException(status_code=400, detail=f"Not a directory: {request.directory}")
+        paths = discover_audio_files(request.directory, recursive=request.recursive)
+        source = request.directory
+    else:
+        formats = {fmt.lower() for fmt in settings.AUDIO_FORMATS}
+        paths = [
+            path for path in dict.fromkeys(request.paths)
+            if Path(path).suffix.lstrip('.').lower() in formats and Path(path).is_file()
+        ]
+        source = "paths"
+    
+    if not paths:
+        raise HTTPException(status_code=400, detail="No audio files found")
+    
+    job = IngestJob(source=source, total=len(paths))
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    
+    dispatch_ingest_job(job.id, paths)
+    return job_status(job, [])
+
+@router.get("", response_model=List[IngestJobSchema])
+def list_ingest_jobs(
+    limit: int = Query(20, ge=1, le=100),
+    db: Session = Depends(get_db)
+):
+    """List the most recent ingestion jobs"""
+    jobs = db.query(IngestJob).order_by(IngestJob.id.desc()).limit(limit).all()
+    return [job_status(job, []) for job in jobs]
+
+@router.get("/{job_id}", response_model=IngestJobSchema)
+def get_ingest_job(
+    job_id: int,
+    failures: int = Query(100, ge=0, le=10000),
+    db: Session = Depends(get_db)
+):
+    """Get progress, throughput and failures of an ingestion job"""
+    job = db.query(IngestJob).filter(IngestJob.id == job_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    job_failures = db.query(IngestJobFailure).filter(
+        IngestJobFailure.job_id == job_id
+    ).order_by(IngestJobFailure.id).limit(failures).all()
+    
+    return job_status(job, job_failures)
+
+def progress_stats(job, processed: int) -> Dict[str, Any]:
+    """Progress percentage, throughput and ETA of a job with total/started_at/finished_at columns"""
+    throughput = 0.0
+    eta_seconds = None
+    if job.started_at:
+        elapsed = ((job.finished_at or datetime.utcnow()) - job.started_at).total_seconds()
+        if elapsed > 0:
+            throughput = processed / elapsed
+        if throughput > 0 and not job.finished_at:
+            eta_seconds = round(max(0, job.total - processed) / throughput, 1)
+    
+    return {
+        'progress': round(min(processed, job.total) / job.total * 100, 2) if job.total else 0.0,
+        'throughput': round(throughput, 3),
+        'eta_seconds': eta_seconds
+    }
+
+def job_status(job: IngestJob, failures: List[IngestJobFailure]) -> IngestJobSchema:
+    """Derive progress, throughput and ETA from a job's counters"""
+    completed = job.completed or 0
+    failed = job.failed or 0
+    skipped = job.skipped or 0
+    
+    return IngestJobSchema(
+        id=job.id,
+        status=job.status or "pending",
+        source=job.source,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at,
+        total=job.total,
+        completed=completed,
+        failed=failed,
+        skipped=skipped,
+        failures=failures,
+        **progress_stats(job, completed + failed + skipped)
+    )
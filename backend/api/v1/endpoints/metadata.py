@@ -1,24 +1,38 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
 from typing import List, Optional
-from ....models.audio import AudioFile, Metadata, Tag
+from ....models.audio import AudioFile, Metadata, Tag, audio_tags
 from ....schemas.audio import (
     Metadata as MetadataSchema,
     MetadataCreate,
     Tag as TagSchema,
+    TagBulkUpdate,
     TagCreate
 )
-from ....core.metadata.enricher import MetadataEnricher
-from ....db.session import get_db
-from sqlalchemy import or_
+from ....models.jobs import MetadataRefreshJob
+from ....schemas.jobs import (
+    MetadataRefreshJob as MetadataRefreshJobSchema,
+    MetadataRefreshJobCreate
+)
+from ....core.metadata.stats import aggregate_counts, format_stats, rebuild_summary, summary_counts
+from ....core.search.metadata_search import MetadataSearch, SearchQueryError
+from ....tasks.refresh import REFRESH_FIELDS, dispatch_refresh_job, metadata_filter
+from ....db.session import get_async_db
+from sqlalchemy import delete, func, select, true
+from ..services import get_enricher
+from .jobs import progress_stats
 
 router = APIRouter()
-enricher = MetadataEnricher()
+metadata_search = MetadataSearch()
 
 @router.get("/files/{file_id}", response_model=MetadataSchema)
-async def get_file_metadata(file_id: int, db: Session = Depends(get_db)):
+async def get_file_metadata(file_id: int, db: AsyncSession = Depends(get_async_db)):
     """Get metadata for a specific file"""
-    metadata = db.query(Metadata).filter(Metadata.audio_file_id == file_id).first()
+    metadata = (await db.execute(
+        select(Metadata).where(Metadata.audio_file_id == file_id)
+    )).scalars().first()
     if not metadata:
         raise HTTPException(status_code=404, detail="Metadata not found")
     return metadata
@@ -27,10 +41,12 @@ async def get_file_metadata(file_id: int, db: Session = Depends(get_db)):
 async def update_file_metadata(
     file_id: int,
     metadata: MetadataCreate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Update metadata for a specific file"""
-    db_metadata = db.query(Metadata).filter(Metadata.audio_file_id == file_id).first()
+    db_metadata = (await db.execute(
+        select(Metadata).where(Metadata.audio_file_id == file_id)
+    )).scalars().first()
     if not db_metadata:
         raise HTTPException(status_code=404, detail="Metadata not found")
     
@@ -38,181 +54,274 @@ async def update_file_metadata(
     for field, value in metadata.dict(exclude_unset=True).items():
         setattr(db_metadata, field, value)
     
-    db.commit()
-    db.refresh(db_metadata)
+    await db.commit()
+    await db.refresh(db_metadata)
     return db_metadata
 
 @router.post("/files/{file_id}/refresh", response_model=MetadataSchema)
 async def refresh_metadata(
     file_id: int,
     force: bool = False,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Refresh metadata from external sources.
     If force=True, overwrites all fields; otherwise, only fills empty fields.
+    Cached provider answers are used immediately and refreshed in the background,
+    so a later refresh picks up any changes.
     """
-    audio_file = db.query(AudioFile).filter(AudioFile.id == file_id).first()
+    audio_file = (await db.execute(
+        select(AudioFile).options(joinedload(AudioFile.track_metadata)).where(AudioFile.id == file_id)
+    )).scalars().first()
     if not audio_file:
         raise HTTPException(status_code=404, detail="File not found")
     
     # Get current metadata
-    current_metadata = audio_file.metadata
+    current_metadata = audio_file.track_metadata
     if not current_metadata:
         raise HTTPException(status_code=404, detail="Metadata not found")
     
     # Get fresh metadata from sources
     try:
-        new_metadata = await enricher.enrich_metadata({
+        new_metadata = await get_enricher().enrich_metadata({
             'title': current_metadata.title,
             'artist': current_metadata.artist,
             'album': current_metadata.album
-        })
+        }, revalidate=True)
         
         # Update fields
         for field, value in new_metadata.items():
             if force or not getattr(current_metadata, field):
                 setattr(current_metadata, field, value)
         
-        db.commit()
-        db.refresh(current_metadata)
+        await db.commit()
+        await db.refresh(current_metadata)
         return current_metadata
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/refresh", response_model=MetadataRefreshJobSchema, status_code=202)
+async def create_refresh_job(request: MetadataRefreshJobCreate, db: AsyncSession = Depends(get_async_db)):
+    """
+    Refresh metadata of every file matching a filter from external sources.
+    Rows are enriched by a Celery worker in id order, METADATA_REFRESH_BATCH_SIZE at a
+    time with up to METADATA_REFRESH_CONCURRENCY lookups in flight, and written with
+    one bulk UPDATE per batch. Poll GET /metadata/refresh/{job_id} for progress.
+    """
+    invalid = [field for field in request.filter.missing if field not in REFRESH_FIELDS]
+    if invalid:
+        raise HTTPException(status_code=400, detail=f"Invalid field: {', '.join(invalid)}")
+    
+    total = (await db.execute(
+        select(func.count(Metadata.id)).where(*metadata_filter(request.filter))
+    )).scalar()
+    if not total:
+        raise HTTPException(status_code=400, detail="No metadata matches the filter")
+    
+    job = MetadataRefreshJob(
+        criteria=request.filter.model_dump(mode="json", exclude_defaults=True),
+        force=request.force,
+        total=total
+    )
+    db.add(job)
+    await db.commit()
+    await db.refresh(job)
+    
+    # Queuing the task is a blocking broker round trip
+    await run_in_threadpool(dispatch_refresh_job, job.id)
+    return refresh_job_status(job)
+
+@router.get("/refresh/{job_id}", response_model=MetadataRefreshJobSchema)
+async def get_refresh_job(job_id: int, db: AsyncSession = Depends(get_async_db)):
+    """Get progress, throughput and ETA of a metadata refresh job"""
+    job = await db.get(MetadataRefreshJob, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return refresh_job_status(job)
+
+def refresh_job_status(job: MetadataRefreshJob) -> MetadataRefreshJobSchema:
+    updated = job.updated or 0
+    unchanged = job.unchanged or 0
+    failed = job.failed or 0
+    return MetadataRefreshJobSchema(
+        id=job.id,
+        status=job.status or "pending",
+        criteria=job.criteria or {},
+        force=bool(job.force),
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at,
+        total=job.total,
+        updated=updated,
+        unchanged=unchanged,
+        failed=failed,
+        **progress_stats(job, updated + unchanged + failed)
+    )
+
 @router.get("/search", response_model=List[MetadataSchema])
 async def search_metadata(
     query: str,
+    response: Response,
     field: Optional[str] = None,
     limit: int = Query(10, ge=1, le=100),
-    db: Session = Depends(get_db)
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
-    Search metadata across all files.
+    Search metadata across all files, best matches first.
     If field is specified, search only that field; otherwise, search all text fields.
+    The last word matches as a prefix, so partial input works for typeahead. If there
+    are more results, the X-Next-Cursor header holds the cursor for the next page.
     """
-    base_query = db.query(Metadata)
-    
-    if field:
-        # Search specific field
-        if not hasattr(Metadata, field):
-            raise HTTPException(status_code=400, detail=f"Invalid field: {field}")
-        base_query = base_query.filter(getattr(Metadata, field).ilike(f"%{query}%"))
-    else:
-        # Search all text fields
-        text_fields = [
-            Metadata.title,
-            Metadata.artist,
-            Metadata.album,
-            Metadata.genre,
-            Metadata.style,
-            Metadata.label
-        ]
-        base_query = base_query.filter(
-            or_(*[field.ilike(f"%{query}%") for field in text_fields])
+    try:
+        results, next_cursor = await db.run_sync(
+            metadata_search.search, query, field=field, limit=limit, cursor=cursor
         )
+    except SearchQueryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     
-    results = base_query.limit(limit).all()
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return results
 
 @router.get("/tags", response_model=List[TagSchema])
 async def get_tags(
     category: Optional[str] = None,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Get all tags, optionally filtered by category"""
-    query = db.query(Tag)
+    query = select(Tag)
     if category:
-        query = query.filter(Tag.category == category)
-    return query.all()
+        query = query.where(Tag.category == category)
+    return (await db.execute(query)).scalars().all()
 
 @router.post("/tags", response_model=TagSchema)
-async def create_tag(tag: TagCreate, db: Session = Depends(get_db)):
+async def create_tag(tag: TagCreate, db: AsyncSession = Depends(get_async_db)):
     """Create a new tag"""
     db_tag = Tag(**tag.dict())
     db.add(db_tag)
-    db.commit()
-    db.refresh(db_tag)
+    await db.commit()
+    await db.refresh(db_tag)
     return db_tag
 
+@router.post("/tags/bulk")
+async def bulk_update_tags(update: TagBulkUpdate, db: AsyncSession = Depends(get_async_db)):
+    """
+    Add (or remove) every tag in tag_ids on every file in file_ids with a single
+    INSERT ... ON CONFLICT DO NOTHING (or DELETE). Pairs that are already
+    present, or already absent, are skipped.
+    """
+    for column, ids, label in ((AudioFile.id, update.file_ids, "Files"), (Tag.id, update.tag_ids, "Tags")):
+        missing = await _missing_ids(db, column, ids)
+        if missing:
+            shown = ", ".join(str(i) for i in missing[:20]) + (", ..." if len(missing) > 20 else "")
+            raise HTTPException(status_code=404, detail=f"{label} not found: {shown}")
+
+    if update.action == 'add':
+        result = await db.execute(_add_tags_statement(db, update.file_ids, update.tag_ids))
+    else:
+        result = await db.execute(_remove_tags_statement(update.file_ids, update.tag_ids))
+    await db.commit()
+    return {
+        "action": update.action,
+        "files": len(set(update.file_ids)),
+        "tags": len(set(update.tag_ids)),
+        "changed": result.rowcount
+    }
+
 @router.post("/files/{file_id}/tags/{tag_id}")
 async def add_tag_to_file(
     file_id: int,
     tag_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Add a tag to a file"""
-    audio_file = db.query(AudioFile).filter(AudioFile.id == file_id).first()
-    if not audio_file:
+    if not await db.get(AudioFile, file_id):
         raise HTTPException(status_code=404, detail="File not found")
-        
-    tag = db.query(Tag).filter(Tag.id == tag_id).first()
-    if not tag:
+    if not await db.get(Tag, tag_id):
         raise HTTPException(status_code=404, detail="Tag not found")
         
-    audio_file.tags.append(tag)
-    db.commit()
+    await db.execute(_add_tags_statement(db, [file_id], [tag_id]))
+    await db.commit()
     return {"message": "Tag added successfully"}
 
 @router.delete("/files/{file_id}/tags/{tag_id}")
 async def remove_tag_from_file(
     file_id: int,
     tag_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """Remove a tag from a file"""
-    audio_file = db.query(AudioFile).filter(AudioFile.id == file_id).first()
-    if not audio_file:
+    if not await db.get(AudioFile, file_id):
         raise HTTPException(status_code=404, detail="File not found")
-        
-    tag = db.query(Tag).filter(Tag.id == tag_id).first()
-    if not tag:
+    if not await db.get(Tag, tag_id):
         raise HTTPException(status_code=404, detail="Tag not found")
         
-    audio_file.tags.remove(tag)
-    db.commit()
+    await db.execute(_remove_tags_statement([file_id], [tag_id]))
+    await db.commit()
     return {"message": "Tag removed successfully"}
 
 @router.get("/stats")
-async def get_metadata_stats(db: Session = Depends(get_db)):
-    """Get statistics about metadata coverage and quality"""
-    total_files = db.query(AudioFile).count()
-    
-    stats = {
-        "total_files": total_files,
-        "coverage": {},
-        "sources": {},
-        "tags": {
-            "total": db.query(Tag).count(),
-            "by_category": {}
-        }
-    }
-    
-    # Calculate metadata coverage
-    for field in [
-        "title", "artist", "album", "year",
-        "genre", "label", "key", "bpm"
-    ]:
-        filled = db.query(Metadata).filter(
-            getattr(Metadata, field).isnot(None)
-        ).count()
-        stats["coverage"][field] = round(filled / total_files * 100, 2) if total_files > 0 else 0
-    
-    # Count metadata sources
-    sources = db.query(Metadata.primary_source).distinct().all()
-    for source in sources:
-        if source[0]:  # source is a tuple
-            count = db.query(Metadata).filter(
-                Metadata.primary_source == source[0]
-            ).count()
-            stats["sources"][source[0]] = count
-    
-    # Count tags by category
-    categories = db.query(Tag.category).distinct().all()
-    for category in categories:
-        if category[0]:
-            count = db.query(Tag).filter(Tag.category == category[0]).count()
-            stats["tags"]["by_category"][category[0]] = count
-    
-    return stats
\ No newline at end of file
+async def get_metadata_stats(
+    exact: bool = False,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Get statistics about metadata coverage and quality.
+    Served from counters that the database keeps up to date on every write; with
+    exact=True they are recounted from the tables in one aggregate pass instead.
+    """
+    counts = await db.run_sync(aggregate_counts if exact else summary_counts)
+    return format_stats(counts)
+
+@router.post("/stats/rebuild")
+async def rebuild_metadata_stats(db: AsyncSession = Depends(get_async_db)):
+    """
+    Recount the /stats counters from the tables, e.g. after writes that bypass the
+    triggers such as a TRUNCATE or a restore.
+    """
+    counts = await db.run_sync(rebuild_summary)
+    await db.commit()
+    return format_stats(counts)
+
+@router.get("/enrichment/stats")
+async def enrichment_stats():
+    """
+    Get per-provider request counts, coalesced requests, throughput and latency.
+    """
+    return get_enricher().stats()
+
+@router.get("/cache/stats")
+async def metadata_cache_stats():
+    """
+    Get hit/miss counters of the provider lookup cache.
+    """
+    return get_enricher().cache.stats()
+
+async def _missing_ids(db: AsyncSession, column, ids: List[int]) -> List[int]:
+    """The ids that have no row in column's table"""
+    found = set((await db.execute(select(column).where(column.in_(set(ids))))).scalars())
+    return sorted(set(ids) - found)
+
+def _add_tags_statement(db: AsyncSession, file_ids: List[int], tag_ids: List[int]):
+    """INSERT of every (file, tag) pair that skips pairs already tagged"""
+    # Imported here, the PostgreSQL dialect is slow to import and unused on SQLite
+    from sqlalchemy.dialects import postgresql, sqlite
+    insert = postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+    pairs = (
+        select(AudioFile.id, Tag.id)
+        .join(Tag, true())
+        .where(AudioFile.id.in_(set(file_ids)), Tag.id.in_(set(tag_ids)))
+    )
+    return (
+        insert(audio_tags)
+        .from_select(["audio_file_id", "tag_id"], pairs)
+        .on_conflict_do_nothing()
+    )
+
+def _remove_tags_statement(file_ids: List[int], tag_ids: List[int]):
+    return delete(audio_tags).where(
+        audio_tags.c.audio_file_id.in_(set(file_ids)),
+        audio_tags.c.tag_id.in_(set(tag_ids))
+    )
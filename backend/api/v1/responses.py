@@ -0,0 +1,193 @@
+import os
+import secrets
+from email.utils import formatdate, parsedate_to_datetime
+from typing import List, Mapping, Optional, Tuple
+import anyio
+from starlette.responses import Response
+from starlette.types import Receive, Scope, Send
+
+class RangeFileResponse(Response):
+    """
+    File response with HTTP range and conditional request support (RFC 9110).
+
+    Handles single and multiple byte ranges (206, multipart/byteranges), If-Range,
+    If-None-Match / If-Modified-Since (304) and unsatisfiable ranges (416). Bodies
+    are sent with the server's zero-copy extension when available, otherwise with
+    large positional reads in a worker thread.
+    """
+
+    chunk_size = 1024 * 1024
+    max_ranges = 16
+
+    def __init__(self, path: str, request_headers: Mapping[str, str], media_type: Optional[str] = None,
+                 stat_result: Optional[os.stat_result] = None):
+        self.path = path
+        self.media_type = media_type
+        self.part_media_type = media_type or "application/octet-stream"
+        self.background = None
+
+        stat_result = stat_result or os.stat(path)
+        self.file_size = stat_result.st_size
+        self.mtime = int(stat_result.st_mtime)
+        self.etag = f'"{stat_result.st_mtime_ns:x}-{self.file_size:x}"'
+
+        headers = {
+            "accept-ranges": "bytes",
+            "etag": self.etag,
+            "last-modified": formatdate(self.mtime, usegmt=True)
+        }
+        self.ranges: List[Tuple[int, int]] = []
+        self.boundary: Optional[str] = None
+
+        if self._not_modified(request_headers):
+            self.status_code = 304
+        else:
+            ranges = None
+            if "range" in request_headers and self._if_range_matches(request_headers.get("if-range")):
+                ranges = parse_range_header(request_headers["range"], self.file_size)
+
+            if ranges is None:
+                self.status_code = 200
+                self.ranges = [(0, self.file_size - 1)] if self.file_size else []
+                headers["content-length"] = str(self.file_size)
+            elif not ranges or len(ranges) > self.max_ranges:
+                self.status_code = 416
+                headers["content-range"] = f"bytes */{self.file_size}"
+                headers["content-length"] = "0"
+            elif len(ranges) == 1:
+                start, end = ranges[0]
+                self.status_code = 206
+                self.ranges = ranges
+                headers["content-range"] = f"bytes {start}-{end}/{self.file_size}"
+                headers["content-length"] = str(end - start + 1)
+            else:
+                self.status_code = 206
+                self.ranges = ranges
+                self.boundary = secrets.token_hex(16)
+                headers["content-length"] = str(
+                    sum(len(self._part_header(start, end)) + end - start + 1 for start, end in ranges)
+                    + len(self._closing_boundary())
+                )
+                self.media_type = f"multipart/byteranges; boundary={self.boundary}"
+
+        self.init_headers(headers)
+
+    def _not_modified(self, request_headers: Mapping[str, str]) -> bool:
+        """Evaluate If-None-Match, falling back to If-Modified-Since"""
+        if_none_match = request_headers.get("if-none-match")
+        if if_none_match is not None:
+            if if_none_match.strip() == "*":
+                return True
+            tags = {tag.strip()[2:] if tag.strip().startswith("W/") else tag.strip() for tag in if_none_match.split(",")}
+            return self.etag in tags
+
+        if_modified_since = request_headers.get("if-modified-since")
+        if if_modified_since:
+            try:
+                return self.mtime <= parsedate_to_datetime(if_modified_since).timestamp()
+            except (TypeError, ValueError):
+                return False
+        return False
+
+    def _if_range_matches(self, if_range: Optional[str]) -> bool:
+        """A Range request only applies if the If-Range validator still matches"""
+        if if_range is None:
+            return True
+        if_range = if_range.strip()
+        if if_range.startswith(('"', 'W/')):
+            return if_range == self.etag
+        try:
+            return int(parsedate_to_datetime(if_range).timestamp()) == self.mtime
+        except (TypeError, ValueError):
+            return False
+
+    def _part_header(self, start: int, end: int) -> bytes:
+        return (
+            f"\r\n--{self.boundary}\r\n"
+            f"Content-Type: {self.part_media_type}\r\n"
+            f"Content-Range: bytes {start}-{end}/{self.file_size}\r\n\r\n"
+        ).encode("latin-1")
+
+    def _closing_boundary(self) -> bytes:
+        return f"\r\n--{self.boundary}--\r\n".encode("latin-1")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({
+            "type": "http.response.start",
+            "status": self.status_code,
+            "headers": self.raw_headers
+        })
+        if scope["method"] == "HEAD" or not self.ranges:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        zerocopy = "http.response.zerocopysend" in scope.get("extensions", {})
+        with open(self.path, "rb") as f:
+            for start, end in self.ranges:
+                if self.boundary:
+                    await send({"type": "http.response.body", "body": self._part_header(start, end), "more_body": True})
+                if zerocopy:
+                    await send({
+                        "type": "http.response.zerocopysend",
+                        "file": f,
+                        "offset": start,
+                        "count": end - start + 1,
+                        "more_body": True
+                    })
+                    continue
+                position = start
+                while position <= end:
+                    size = min(self.chunk_size, end - position + 1)
+                    chunk = await anyio.to_thread.run_sync(os.pread, f.fileno(), size, position)
+                    if not chunk:
+                        break
+                    position += len(chunk)
+                    await send({"type": "http.response.body", "body": chunk, "more_body": True})
+            if self.boundary:
+                await send({"type": "http.response.body", "body": self._closing_boundary(), "more_body": True})
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+def parse_range_header(header: str, file_size: int) -> Optional[List[Tuple[int, int]]]:
+    """
+    Parse a 'bytes=' Range header into sorted, merged inclusive (start, end) pairs.
+    Returns None if the header is malformed (the range is then ignored) and an empty
+    list if no range is satisfiable.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or not spec.strip():
+        return None
+
+    ranges = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        first, sep, last = part.partition("-")
+        if not sep:
+            return None
+        try:
+            if not first:
+                # Suffix range: the last N bytes
+                length = int(last)
+                if length <= 0:
+                    continue
+                start, end = max(0, file_size - length), file_size - 1
+            else:
+                start = int(first)
+                end = int(last) if last else file_size - 1
+                if end < start:
+                    return None
+                end = min(end, file_size - 1)
+        except ValueError:
+            return None
+        if start < file_size and start >= 0:
+            ranges.append((start, end))
+
+    # Merge overlapping or adjacent ranges
+    merged: List[Tuple[int, int]] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
@@ -1,8 +1,11 @@
 from fastapi import APIRouter
-from .endpoints import audio, metadata, settings
+from .endpoints import audio, jobs, metadata, settings
+from .services import shutdown as shutdown_services
 
 api_router = APIRouter()
+api_router.add_event_handler("shutdown", shutdown_services)
 
 api_router.include_router(audio.router, prefix="/audio", tags=["audio"])
+api_router.include_router(jobs.router, prefix="/audio/jobs", tags=["jobs"])
 api_router.include_router(metadata.router, prefix="/metadata", tags=["metadata"])
 api_router.include_router(settings.router, prefix="/settings", tags=["settings"])
@@ -0,0 +1,60 @@
+"""
+Per-process service objects behind the API endpoints, created on first use.
+
+Importing the routers stays cheap: the analyzer (librosa, scipy, soundfile),
+the metadata enricher (provider clients, aiohttp) and the analysis cache
+(redis) are only imported and constructed when a request needs them, so a
+worker that only serves metadata never loads the audio stack. shutdown()
+closes whatever was created; the API router runs it on shutdown.
+"""
+from typing import TYPE_CHECKING
+from ...core.audio.executor import AnalysisExecutor
+
+if TYPE_CHECKING:
+    from ...core.audio.analyzer import AudioAnalyzer
+    from ...core.cache.analysis_cache import AnalysisCache
+    from ...core.metadata.enricher import MetadataEnricher
+
+_analysis_executor = None
+_analyzer = None
+_analysis_cache = None
+_enricher = None
+
+def get_analysis_executor() -> AnalysisExecutor:
+    """Worker pool for feature extraction; its processes start on the first submitted job"""
+    global _analysis_executor
+    if _analysis_executor is None:
+        _analysis_executor = AnalysisExecutor()
+    return _analysis_executor
+
+def get_analyzer() -> "AudioAnalyzer":
+    global _analyzer
+    if _analyzer is None:
+        from ...core.audio.analyzer import AudioAnalyzer
+        _analyzer = AudioAnalyzer(executor=get_analysis_executor())
+    return _analyzer
+
+def get_analysis_cache() -> "AnalysisCache":
+    global _analysis_cache
+    if _analysis_cache is None:
+        from ...core.cache.analysis_cache import AnalysisCache
+        _analysis_cache = AnalysisCache(analyzer_version=get_analyzer().version)
+    return _analysis_cache
+
+def get_enricher() -> "MetadataEnricher":
+    global _enricher
+    if _enricher is None:
+        from ...core.metadata.enricher import MetadataEnricher
+        _enricher = MetadataEnricher()
+    return _enricher
+
+async def shutdown():
+    """Stop the analysis workers and inference thread and close provider sessions, if they were started"""
+    global _analysis_executor, _analyzer, _analysis_cache, _enricher
+    if _analysis_executor is not None:
+        _analysis_executor.shutdown()
+    if _analyzer is not None and _analyzer.inference:
+        _analyzer.inference.close()
+    if _enricher is not None:
+        await _enricher.close()
+    _analysis_executor = _analyzer = _analysis_cache = _enricher = None
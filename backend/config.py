@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import List
+from typing import List, Optional
 
 class Settings(BaseSettings):
     # Database
@@ -9,12 +9,22 @@ class Settings(BaseSettings):
     DB_NAME: str
     DB_USER: str
     DB_PASSWORD: str
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
 
     # Redis
     REDIS_HOST: str
     REDIS_PORT: int
     REDIS_DB: int
 
+    # Task queue (defaults to the Redis instance above)
+    CELERY_BROKER_URL: Optional[str] = None
+    CELERY_RESULT_BACKEND: Optional[str] = None
+    CELERY_TASK_ALWAYS_EAGER: bool = False
+
     # API Keys
     ACOUSTID_API_KEY: str
     MUSICBRAINZ_APP_NAME: str
@@ -25,6 +35,21 @@ class Settings(BaseSettings):
     LASTFM_API_KEY: str
     LASTFM_API_SECRET: str
 
+    # Metadata providers (URLs can point at local stub servers for testing)
+    MUSICBRAINZ_API_URL: Optional[str] = None
+    DISCOGS_API_URL: Optional[str] = None
+    BEATPORT_API_URL: str = "https://api.beatport.com/v4/catalog/search"
+    LASTFM_API_URL: str = "http://ws.audioscrobbler.com/2.0/"
+    MUSICBRAINZ_RATE_LIMIT: float = 1.0
+    DISCOGS_RATE_LIMIT: float = 1.0
+    BEATPORT_RATE_LIMIT: float = 10.0
+    LASTFM_RATE_LIMIT: float = 5.0
+    METADATA_HTTP_POOL_SIZE: int = 20
+    METADATA_HTTP_TIMEOUT: float = 10.0
+    METADATA_SDK_THREADS: int = 8
+    METADATA_REFRESH_BATCH_SIZE: int = 200
+    METADATA_REFRESH_CONCURRENCY: int = 8
+
     # Application
     APP_NAME: str
     APP_ENV: str
@@ -43,14 +68,39 @@ class Settings(BaseSettings):
     ENABLE_NEURAL_PROCESSING: bool
     BATCH_SIZE: int
     NUM_WORKERS: int
+    ANALYSIS_QUEUE_SIZE: int = 16
+    ANALYSIS_TIMEOUT: int = 300
+    ANALYSIS_MAX_JOBS_PER_WORKER: int = 50
+    STREAMING_ANALYSIS_MIN_DURATION: int = 900
+
+    # Neural inference (genre probabilities and embeddings)
+    INFERENCE_MODEL_PATH: str = "ml_models/audio_tagger"
+    INFERENCE_MAX_WAIT_MS: float = 10.0
+    INFERENCE_MAX_WINDOWS: int = 8
+    INFERENCE_THREADS: int = 0
+
+    # Waveform peaks
+    WAVEFORM_DIR: str = "waveforms"
+    WAVEFORM_SAMPLES_PER_PEAK: int = 256
+    WAVEFORM_BITS: int = 8
+
+    # Similarity search
+    EMBEDDING_INDEX_PATH: str = "indexes/embeddings.npz"
+    EMBEDDING_INDEX_NPROBE: int = 8
+    DUPLICATE_MAX_BIT_ERROR_RATE: float = 0.15
 
     # Cache
     CACHE_TTL: int
     METADATA_CACHE_TTL: int
+    METADATA_NEGATIVE_CACHE_TTL: int = 3600
+    METADATA_CACHE_STALE_TTL: int = 604800
+    METADATA_CACHE_MAX_ENTRIES: int = 10000
+    ANALYSIS_CACHE_DIR: str = "cache/analysis"
 
     # Logging
     LOG_LEVEL: str
     LOG_FILE: str
+    QUERY_COUNT_WARN_THRESHOLD: int = 25
 
     class Config:
         env_file = ".env"
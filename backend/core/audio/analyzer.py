@@ -1,60 +1,232 @@
+import asyncio
+import time
 import librosa
 import numpy as np
+import soundfile as sf
 from typing import Dict, Any, Optional
-import tensorflow as tf
 from pathlib import Path
-import acoustid
 from ..config import settings
+from .feature_plan import FeaturePlan
+from .estimators import estimate_key, tempo_confidence
+from .streaming import StreamingFeatureExtractor, iter_audio_blocks
+from .fingerprint import MAX_SECONDS, FingerprintError, fingerprint_file, fingerprint_pcm
+from .instrumentation import StageTimer, profile_call, record_analysis, record_failure
+from .executor import AnalysisExecutor, AnalysisQueueFullError, AnalysisTimeoutError
+from .inference import InferenceService, shared_inference_service
+from .waveform import PeakBuilder, write_peaks_file
+
+# Bump whenever the extracted features change so cached analyses are invalidated
+ANALYZER_VERSION = "1.2"
 
 class AudioAnalyzer:
-    def __init__(self):
-        self.model = self._load_model()
+    def __init__(self, executor: Optional[AnalysisExecutor] = None, load_model: bool = True):
+        self.executor = executor
+        self.inference = self._get_inference() if load_model else None
+        
+    @property
+    def version(self) -> str:
+        """Identifies the feature set this analyzer produces"""
+        if self.inference:
+            return f"{ANALYZER_VERSION}+nn.{self.inference.version}"
+        return ANALYZER_VERSION
         
-    def _load_model(self) -> tf.keras.Model:
-        """Load the audio classification model"""
-        # TODO: Implement model loading from saved model
-        # For now, return None as we'll implement this later
-        return None
+    def _get_inference(self) -> Optional[InferenceService]:
+        """The process's inference service; the model itself loads on the first prediction"""
+        if not settings.ENABLE_NEURAL_PROCESSING:
+            return None
+        service = shared_inference_service()
+        if not service.available:
+            print(f"Warning: No model at {service.model_path}, genre and embedding prediction disabled")
+            return None
+        return service
         
-    async def analyze_file(self, file_path: str) -> Dict[str, Any]:
-        """Analyze an audio file and extract features"""
+    async def analyze_file(self, file_path: str, waveform_path: Optional[str] = None,
+                           profile: bool = False) -> Dict[str, Any]:
+        """
+        Analyze an audio file and extract features.
+        If waveform_path is given, waveform peaks are written there from the same decode.
+        features['timings'] holds the number of decodes and per-stage wall/CPU time
+        and memory, which also feed the Prometheus metrics. With profile=True,
+        feature extraction runs under cProfile and features['profile'] lists the
+        functions it spent most time in.
+        """
+        start = time.perf_counter()
         try:
-            # Load the audio file
-            y, sr = librosa.load(file_path)
+            # Decoding and feature extraction are CPU-bound, so they run in the
+            # executor's worker processes when one is configured
+            with_mel = self.inference is not None
+            if self.executor:
+                features = await self.executor.submit(_extract_in_worker, file_path, with_mel, waveform_path, profile)
+            else:
+                features = _extract(self, file_path, with_mel, waveform_path, profile)
             
-            # Extract basic features
-            features = {
-                'duration': float(librosa.get_duration(y=y, sr=sr)),
-                'sample_rate': sr,
-                'tempo': self._get_tempo(y, sr),
-                'spectral_features': self._get_spectral_features(y, sr),
-                'mfcc': self._get_mfcc(y, sr),
-                'fingerprint': await self._get_fingerprint(file_path),
-                'key': self._get_key(y, sr),
-                'genre': await self._predict_genre(y, sr) if settings.ENABLE_NEURAL_PROCESSING else None
-            }
+            timings = features['timings']
+            mel_spec_db = features.pop('mel_spectrogram', None)
+            prediction = None
+            if mel_spec_db is not None:
+                timer = StageTimer()
+                # Inference runs batched on its own thread, so only wall time is meaningful
+                with timer.stage('genre', cpu=False):
+                    prediction = await self._predict(mel_spec_db, timer)
+                timings['stages'].update(timer.to_dict())
+            features['genre'] = prediction['genre'] if prediction else None
+            features['embedding'] = prediction['embedding'] if prediction else None
             
+            record_analysis(timings, time.perf_counter() - start)
             return features
             
+        except (AnalysisQueueFullError, AnalysisTimeoutError) as e:
+            record_failure(e)
+            raise
         except Exception as e:
+            record_failure(e)
             raise AudioAnalysisError(f"Error analyzing file: {str(e)}")
     
-    def _get_tempo(self, y: np.ndarray, sr: int) -> Dict[str, float]:
+    def extract_features(self, file_path: str, with_mel: bool = False,
+                         waveform_path: Optional[str] = None) -> Dict[str, Any]:
+        """Decode an audio file and extract its signal features (CPU-bound)"""
+        if self._use_streaming(file_path):
+            return self.extract_features_streaming(file_path, with_mel, waveform_path)
+        
+        timer = StageTimer()
+        timings = {'decodes': 1}
+        
+        # Load the audio file
+        with timer.stage('load'):
+            y, sr = librosa.load(file_path)
+        
+        if waveform_path:
+            with timer.stage('waveform'):
+                peaks = PeakBuilder(sr=sr)
+                peaks.feed(y)
+                self._write_waveform(peaks, waveform_path, timer)
+        
+        # Transform once; every extractor reads from the shared spectrograms
+        plan = FeaturePlan(y, sr)
+        try:
+            with timer.stage('transforms'):
+                # Computed on first use otherwise, which would bill them to whichever stage comes first
+                plan.stft_magnitude, plan.mel_db, plan.onset_envelope
+            features = {
+                'duration': float(librosa.get_duration(y=y, sr=sr)),
+                'sample_rate': sr
+            }
+            with timer.stage('tempo'):
+                features['tempo'] = self._get_tempo(plan)
+            with timer.stage('spectral'):
+                features['spectral_features'] = self._get_spectral_features(plan)
+            with timer.stage('mfcc'):
+                features['mfcc'] = self._get_mfcc(plan)
+            with timer.stage('key'):
+                features['key'] = self._get_key(plan)
+            
+            if with_mel:
+                with timer.stage('mel'):
+                    features['mel_spectrogram'] = self._get_mel_spectrogram(plan)
+        finally:
+            plan.release()
+        
+        features['fingerprint'] = self._get_fingerprint(y, sr, file_path, timings, timer)
+        features['timings'] = {**timings, 'stages': timer.to_dict()}
+        return features
+    
+    def extract_features_streaming(self, file_path: str, with_mel: bool = False,
+                                   waveform_path: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Extract the same features block by block, with memory bounded regardless of
+        duration. See core/audio/streaming.py for the tolerance against extract_features.
+        """
+        timer = StageTimer()
+        timings = {'decodes': 1}
+        info = sf.info(file_path)
+        extractor = StreamingFeatureExtractor(
+            mel_columns=1024 if with_mel else None,
+            expected_samples=int(info.duration * 22050)
+        )
+        peaks = PeakBuilder(sr=extractor.sr) if waveform_path else None
+        # Keep the fingerprinted opening of the track
+        head, head_samples = [], 0
+        # Decoding and every per-frame feature are interleaved block by block
+        with timer.stage('stream'):
+            for block in iter_audio_blocks(file_path, sr=extractor.sr):
+                extractor.feed(block)
+                if peaks:
+                    peaks.feed(block)
+                if head_samples < MAX_SECONDS * extractor.sr:
+                    head.append(block)
+                    head_samples += len(block)
+        if peaks:
+            with timer.stage('waveform'):
+                self._write_waveform(peaks, waveform_path, timer)
+        
+        with timer.stage('finish'):
+            features = extractor.finish()
+        y = np.concatenate(head) if head else np.zeros(0, dtype=np.float32)
+        features['fingerprint'] = self._get_fingerprint(y, extractor.sr, file_path, timings, timer)
+        features['timings'] = {**timings, 'stages': timer.to_dict()}
+        return features
+    
+    def extract_waveform(self, file_path: str, waveform_path: str) -> None:
+        """Decode an audio file only to write its waveform peaks (e.g. for a cached analysis)"""
+        peaks = PeakBuilder()
+        if self._use_streaming(file_path):
+            for block in iter_audio_blocks(file_path, sr=peaks.sr):
+                peaks.feed(block)
+        else:
+            y, _ = librosa.load(file_path, sr=peaks.sr)
+            peaks.feed(y)
+        self._write_waveform(peaks, waveform_path)
+    
+    async def generate_waveform(self, file_path: str, waveform_path: str) -> None:
+        """Write waveform peaks for a file without extracting features"""
+        try:
+            if self.executor:
+                await self.executor.submit(_waveform_in_worker, file_path, waveform_path)
+            else:
+                await asyncio.to_thread(self.extract_waveform, file_path, waveform_path)
+        except Exception as e:
+            print(f"Warning: Could not generate waveform: {str(e)}")
+    
+    def _write_waveform(self, peaks: PeakBuilder, waveform_path: str, timer: Optional[StageTimer] = None) -> None:
+        """Write the peak pyramid; a failure here never fails the analysis"""
+        try:
+            write_peaks_file(waveform_path, peaks.finish(), peaks.sr, peaks.samples_per_peak)
+        except Exception as e:
+            print(f"Warning: Could not write waveform peaks: {str(e)}")
+            if timer:
+                timer.failed('waveform', e)
+    
+    def _use_streaming(self, file_path: str) -> bool:
+        """Stream files longer than STREAMING_ANALYSIS_MIN_DURATION seconds (0 disables streaming)"""
+        if settings.STREAMING_ANALYSIS_MIN_DURATION <= 0:
+            return False
+        try:
+            return sf.info(file_path).duration >= settings.STREAMING_ANALYSIS_MIN_DURATION
+        except Exception:
+            # Formats libsndfile cannot read (e.g. m4a) are decoded in one go via audioread
+            return False
+    
+    def _get_tempo(self, plan: FeaturePlan) -> Dict[str, float]:
         """Extract tempo and beat information"""
-        tempo, beats = librosa.beat.beat_track(y=y, sr=sr)
-        beat_frames = librosa.frames_to_time(beats, sr=sr)
+        tempo, beats = librosa.beat.beat_track(
+            onset_envelope=plan.onset_envelope,
+            sr=plan.sr,
+            hop_length=plan.hop_length
+        )
+        beat_frames = librosa.frames_to_time(beats, sr=plan.sr, hop_length=plan.hop_length)
         
         return {
             'tempo': float(tempo),
             'beat_frames': beat_frames.tolist(),
-            'confidence': float(librosa.beat.tempo_confidence(y, sr=sr))
+            'confidence': tempo_confidence(plan.onset_envelope, plan.sr, plan.hop_length, float(tempo))
         }
     
-    def _get_spectral_features(self, y: np.ndarray, sr: int) -> Dict[str, float]:
+    def _get_spectral_features(self, plan: FeaturePlan) -> Dict[str, float]:
         """Extract spectral features"""
-        spectral_centroids = librosa.feature.spectral_centroid(y=y, sr=sr)[0]
-        spectral_rolloff = librosa.feature.spectral_rolloff(y=y, sr=sr)[0]
-        spectral_bandwidth = librosa.feature.spectral_bandwidth(y=y, sr=sr)[0]
+        S, sr = plan.stft_magnitude, plan.sr
+        spectral_centroids = librosa.feature.spectral_centroid(S=S, sr=sr)[0]
+        spectral_rolloff = librosa.feature.spectral_rolloff(S=S, sr=sr)[0]
+        spectral_bandwidth = librosa.feature.spectral_bandwidth(S=S, sr=sr)[0]
         
         return {
             'centroid_mean': float(np.mean(spectral_centroids)),
@@ -62,63 +234,82 @@ class AudioAnalyzer:
             'bandwidth_mean': float(np.mean(spectral_bandwidth))
         }
     
-    def _get_mfcc(self, y: np.ndarray, sr: int) -> Dict[str, Any]:
+    def _get_mfcc(self, plan: FeaturePlan) -> Dict[str, Any]:
         """Extract MFCC features"""
-        mfcc = librosa.feature.mfcc(y=y, sr=sr, n_mfcc=13)
+        mfcc = librosa.feature.mfcc(S=plan.mel_db, n_mfcc=13)
         
+        # The per-frame matrix stays a packed array: it is neither stored nor cached,
+        # and pickling it back from a worker is far cheaper than a nested list
         return {
-            'coefficients': mfcc.tolist(),
+            'coefficients': mfcc.astype(np.float32),
             'mean': np.mean(mfcc, axis=1).tolist(),
             'var': np.var(mfcc, axis=1).tolist()
         }
     
-    async def _get_fingerprint(self, file_path: str) -> Optional[str]:
-        """Generate acoustic fingerprint"""
-        try:
-            duration, fp = acoustid.fingerprint_file(file_path)
-            return fp
-        except Exception as e:
-            print(f"Warning: Could not generate fingerprint: {str(e)}")
-            return None
+    def _get_fingerprint(self, y: np.ndarray, sr: int, file_path: str, timings: Dict[str, Any],
+                         timer: StageTimer) -> Optional[str]:
+        """Generate acoustic fingerprint from the decoded signal, or from the file if that fails"""
+        # fpcalc runs as a child process, whose CPU time process_time() does not see
+        with timer.stage('fingerprint', cpu=False) as stage:
+            try:
+                try:
+                    fingerprint, stage['backend'] = fingerprint_pcm(y, sr)
+                except FingerprintError:
+                    # e.g. an fpcalc too old to read raw PCM from stdin; it decodes the file again
+                    fingerprint, stage['backend'] = fingerprint_file(file_path), 'fpcalc-file'
+                    timings['decodes'] += 1
+                return fingerprint
+            except Exception as e:
+                print(f"Warning: Could not generate fingerprint: {str(e)}")
+                stage['error'] = str(e)
+                return None
     
-    def _get_key(self, y: np.ndarray, sr: int) -> Dict[str, Any]:
+    def _get_key(self, plan: FeaturePlan) -> Dict[str, Any]:
         """Detect musical key"""
-        chroma = librosa.feature.chroma_cqt(y=y, sr=sr)
-        key = librosa.feature.key_detect(chroma)
-        
-        return {
-            'key': int(key),
-            'confidence': float(np.max(key))
-        }
+        # Chroma uses a constant-Q transform, which has no STFT equivalent to share
+        chroma = librosa.feature.chroma_cqt(y=plan.y, sr=plan.sr, hop_length=plan.hop_length)
+        return estimate_key(np.mean(chroma, axis=1))
     
-    async def _predict_genre(self, y: np.ndarray, sr: int) -> Optional[Dict[str, float]]:
-        """Predict genre using the neural network model"""
-        if not self.model:
-            return None
-            
+    def _get_mel_spectrogram(self, plan: FeaturePlan) -> np.ndarray:
+        """Compute the log-scaled mel spectrogram used as model input"""
+        # Same as power_to_db(mel, ref=np.max): both clip at 80 dB below the peak
+        return (plan.mel_db - plan.mel_db.max()).astype(np.float32)
+    
+    async def _predict(self, mel_spec_db: np.ndarray, timer: StageTimer) -> Optional[Dict[str, Any]]:
+        """Predict genre probabilities and the embedding using the neural network model"""
         try:
-            # Preprocess audio for model input
-            mel_spec = librosa.feature.melspectrogram(y=y, sr=sr)
-            mel_spec_db = librosa.power_to_db(mel_spec, ref=np.max)
-            
-            # Resize to expected input shape
-            mel_spec_db = tf.image.resize(mel_spec_db[np.newaxis, ..., np.newaxis], 
-                                        (128, 128))
-            
-            # Make prediction
-            predictions = self.model.predict(mel_spec_db)
-            
-            # Get top 3 genres
-            top_indices = np.argsort(predictions[0])[-3:][::-1]
-            
-            return {
-                self.genre_labels[idx]: float(predictions[0][idx])
-                for idx in top_indices
-            }
-            
+            return await self.inference.predict(mel_spec_db)
         except Exception as e:
             print(f"Warning: Genre prediction failed: {str(e)}")
+            timer.failed('genre', e)
             return None
 
+# Per-process analyzer used by executor workers
+_worker_analyzer: Optional[AudioAnalyzer] = None
+
+def _get_worker_analyzer() -> AudioAnalyzer:
+    global _worker_analyzer
+    if _worker_analyzer is None:
+        _worker_analyzer = AudioAnalyzer(load_model=False)
+    return _worker_analyzer
+
+def _extract(analyzer: AudioAnalyzer, file_path: str, with_mel: bool, waveform_path: Optional[str],
+             profile: bool) -> Dict[str, Any]:
+    """extract_features, under cProfile if asked to"""
+    if not profile:
+        return analyzer.extract_features(file_path, with_mel, waveform_path)
+    features, functions = profile_call(analyzer.extract_features, file_path, with_mel, waveform_path)
+    features['profile'] = functions
+    return features
+
+def _extract_in_worker(file_path: str, with_mel: bool, waveform_path: Optional[str] = None,
+                       profile: bool = False) -> Dict[str, Any]:
+    """Entry point for analysis worker processes"""
+    return _extract(_get_worker_analyzer(), file_path, with_mel, waveform_path, profile)
+
+def _waveform_in_worker(file_path: str, waveform_path: str) -> None:
+    """Entry point for waveform-only jobs in analysis worker processes"""
+    _get_worker_analyzer().extract_waveform(file_path, waveform_path)
+
 class AudioAnalysisError(Exception):
     pass
\ No newline at end of file
@@ -0,0 +1,45 @@
+import librosa
+import numpy as np
+from typing import Dict, Any
+
+PITCH_CLASSES = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
+
+# Krumhansl-Kessler key profiles, tonic first
+MAJOR_PROFILE = np.array([6.35, 2.23, 3.48, 2.33, 4.38, 4.09, 2.52, 5.19, 2.39, 3.66, 2.29, 2.88])
+MINOR_PROFILE = np.array([6.33, 2.68, 3.52, 5.38, 2.60, 3.53, 2.54, 4.75, 3.98, 2.69, 3.34, 3.17])
+
+def estimate_key(chroma_profile: np.ndarray) -> Dict[str, Any]:
+    """
+    Estimate the key from a 12-bin chroma profile (e.g. chroma averaged over time)
+    by correlating it with every rotation of the major and minor key profiles.
+    """
+    best_key, best_score = None, -1.0
+    for tonic in range(12):
+        for mode, profile in (('major', MAJOR_PROFILE), ('minor', MINOR_PROFILE)):
+            score = np.corrcoef(chroma_profile, np.roll(profile, tonic))[0, 1]
+            if np.isfinite(score) and score > best_score:
+                best_key, best_score = f"{PITCH_CLASSES[tonic]} {mode}", float(score)
+
+    return {
+        'key': best_key or 'C major',
+        'confidence': max(0.0, best_score)
+    }
+
+def tempo_confidence(onset_envelope: np.ndarray, sr: int, hop_length: int, tempo: float) -> float:
+    """
+    Confidence of a tempo estimate: the normalized autocorrelation of the onset
+    envelope at the beat period (1.0 = perfectly periodic).
+    """
+    if tempo <= 0 or len(onset_envelope) < 2:
+        return 0.0
+    envelope = onset_envelope - np.mean(onset_envelope)
+    autocorr = librosa.autocorrelate(envelope)
+    if autocorr[0] <= 0:
+        return 0.0
+    autocorr = autocorr / autocorr[0]
+
+    lag = int(round(60.0 * sr / (hop_length * tempo)))
+    if lag >= len(autocorr):
+        return 0.0
+    window = autocorr[max(1, lag - 1):lag + 2]
+    return float(np.clip(window.max(), 0.0, 1.0))
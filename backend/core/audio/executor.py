@@ -0,0 +1,119 @@
+import asyncio
+import multiprocessing
+import signal
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional
+from ..config import settings
+
+class AnalysisExecutor:
+    """
+    Runs CPU-bound analysis jobs in a pool of worker processes.
+
+    Submissions beyond the running workers wait in a bounded queue; once that is
+    full, submit() raises AnalysisQueueFullError immediately so the API can shed
+    load instead of piling up uploads. Workers are replaced after a fixed number
+    of jobs to cap memory growth from librosa/numba caches.
+    """
+
+    def __init__(self, max_workers: int = None, max_queue: int = None,
+                 timeout: float = None, max_jobs_per_worker: int = None):
+        self.max_workers = max_workers or settings.NUM_WORKERS
+        self.max_queue = max_queue if max_queue is not None else settings.ANALYSIS_QUEUE_SIZE
+        self.timeout = timeout or settings.ANALYSIS_TIMEOUT
+        self.max_jobs_per_worker = max_jobs_per_worker or settings.ANALYSIS_MAX_JOBS_PER_WORKER
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pending = 0
+        self.counters = {
+            'submitted': 0,
+            'completed': 0,
+            'failed': 0,
+            'rejected': 0,
+            'timed_out': 0
+        }
+
+    @property
+    def capacity(self) -> int:
+        """Maximum number of jobs that may be running or queued at once"""
+        return self.max_workers + self.max_queue
+
+    @property
+    def saturated(self) -> bool:
+        return self._pending >= self.capacity
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        """Create the worker pool on first use"""
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                # Worker recycling is not supported with fork; spawn also avoids
+                # inheriting the API process's sockets and threads
+                mp_context=multiprocessing.get_context('spawn'),
+                max_tasks_per_child=self.max_jobs_per_worker
+            )
+        return self._pool
+
+    async def submit(self, fn: Callable, *args) -> Any:
+        """Run fn(*args) in a worker process and return its result"""
+        if self.saturated:
+            self.counters['rejected'] += 1
+            raise AnalysisQueueFullError(
+                f"Analysis queue is full ({self._pending} jobs pending)"
+            )
+
+        self._pending += 1
+        self.counters['submitted'] += 1
+        try:
+            loop = asyncio.get_running_loop()
+            future = loop.run_in_executor(self._get_pool(), _run_with_timeout, self.timeout, fn, *args)
+            # The worker enforces the timeout itself; the grace period covers
+            # jobs stuck in native code that cannot be interrupted
+            result = await asyncio.wait_for(future, timeout=self.timeout + 5)
+            self.counters['completed'] += 1
+            return result
+        except (asyncio.TimeoutError, TimeoutError):
+            self.counters['timed_out'] += 1
+            raise AnalysisTimeoutError(f"Analysis did not finish within {self.timeout}s")
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM-killed); start over with a fresh pool
+            self.counters['failed'] += 1
+            self._pool = None
+            raise
+        except Exception:
+            self.counters['failed'] += 1
+            raise
+        finally:
+            self._pending -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Return queue depth and job counters"""
+        return {
+            **self.counters,
+            'pending': self._pending,
+            'capacity': self.capacity,
+            'workers': self.max_workers
+        }
+
+    def shutdown(self):
+        """Stop the worker processes"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+def _raise_timeout(signum, frame):
+    raise TimeoutError("Analysis job timed out")
+
+def _run_with_timeout(timeout: float, fn: Callable, *args) -> Any:
+    """Worker-side wrapper that interrupts fn after `timeout` seconds so the worker is freed"""
+    signal.signal(signal.SIGALRM, _raise_timeout)
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        return fn(*args)
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+
+class AnalysisQueueFullError(Exception):
+    pass
+
+class AnalysisTimeoutError(Exception):
+    pass
@@ -0,0 +1,50 @@
+import librosa
+import numpy as np
+from functools import cached_property
+
+class FeaturePlan:
+    """
+    Shared intermediate representations for one decoded track.
+
+    Each transform is computed at most once, on first access, and every extractor
+    reads from the cached arrays instead of re-running the STFT on the raw signal.
+    Parameters match librosa's defaults, so features are identical to calling the
+    extractors with y=... directly.
+    """
+
+    def __init__(self, y: np.ndarray, sr: int, n_fft: int = 2048, hop_length: int = 512):
+        self.y = y
+        self.sr = sr
+        self.n_fft = n_fft
+        self.hop_length = hop_length
+
+    @cached_property
+    def stft_magnitude(self) -> np.ndarray:
+        """Magnitude STFT, shape (1 + n_fft/2, frames)"""
+        return np.abs(librosa.stft(self.y, n_fft=self.n_fft, hop_length=self.hop_length))
+
+    @cached_property
+    def power(self) -> np.ndarray:
+        """Power STFT"""
+        return self.stft_magnitude ** 2
+
+    @cached_property
+    def mel(self) -> np.ndarray:
+        """Mel power spectrogram (128 bands)"""
+        return librosa.feature.melspectrogram(S=self.power, sr=self.sr)
+
+    @cached_property
+    def mel_db(self) -> np.ndarray:
+        """Mel spectrogram in dB (ref=1.0), the input to MFCC and onset detection"""
+        return librosa.power_to_db(self.mel)
+
+    @cached_property
+    def onset_envelope(self) -> np.ndarray:
+        """Onset strength envelope used for beat tracking (median-aggregated, as beat_track does)"""
+        return librosa.onset.onset_strength(S=self.mel_db, sr=self.sr, aggregate=np.median)
+
+    def release(self):
+        """Drop all cached arrays so their memory can be reclaimed"""
+        for name in ('stft_magnitude', 'power', 'mel', 'mel_db', 'onset_envelope'):
+            self.__dict__.pop(name, None)
+        self.y = None
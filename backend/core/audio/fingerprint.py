@@ -0,0 +1,156 @@
+import base64
+import os
+import subprocess
+from typing import List, Optional, Tuple, Union
+import numpy as np
+
+# Seconds of audio per Chromaprint sub-fingerprint (4096-sample frames, 1/3 overlap at 11025 Hz)
+ITEM_SECONDS = 4096 / 3 / 11025
+MAX_NORMAL_VALUE = 7  # Largest bit delta stored in the 3-bit stream; larger ones continue in the 5-bit stream
+MAX_SECONDS = 120  # Audio fingerprinted, as acoustid.fingerprint_file (AcoustID lookups use the first two minutes)
+FPCALC_TIMEOUT = 60
+
+def fingerprint_pcm(y: np.ndarray, sr: int) -> Tuple[str, str]:
+    """
+    Chromaprint fingerprint of decoded mono samples (floats in [-1, 1]), so the
+    file is not decoded a second time. Returns (fingerprint, backend): libchromaprint
+    in-process through pyacoustid's binding when it can be loaded, otherwise fpcalc
+    reading the samples from stdin.
+    """
+    pcm = (np.clip(y[:MAX_SECONDS * sr], -1.0, 1.0) * 32767).astype('<i2').tobytes()
+    binding = _chromaprint_binding()
+    if binding is not None:
+        try:
+            fingerprinter = binding.Fingerprinter()
+            fingerprinter.start(sr, 1)
+            fingerprinter.feed(pcm)
+            return fingerprinter.finish().decode('ascii'), 'chromaprint'
+        except binding.FingerprintError:
+            raise FingerprintError("libchromaprint could not fingerprint the audio")
+    return _fpcalc(['-format', 's16le', '-rate', str(sr), '-channels', '1', '-'], pcm), 'fpcalc'
+
+def fingerprint_file(file_path: str) -> str:
+    """Fingerprint a file with fpcalc, which decodes it itself"""
+    return _fpcalc([file_path])
+
+def decode_fingerprint(encoded: Union[str, bytes]) -> Tuple[np.ndarray, int]:
+    """
+    Decode a compressed, base64 Chromaprint fingerprint (as stored in
+    AudioFeatures.acoustid_fingerprint) to its raw uint32 sub-fingerprints.
+    Returns (sub-fingerprints, algorithm).
+
+    Same format as chromaprint_decode_fingerprint: a 4 byte header (algorithm,
+    24-bit count), then for each sub-fingerprint XORed with the previous one the
+    gaps between its set bits as 3-bit values terminated by 0, gaps of 7 or more
+    being completed from a trailing 5-bit stream.
+    """
+    if isinstance(encoded, str):
+        encoded = encoded.encode('ascii')
+    encoded = encoded.strip()
+    try:
+        data = np.frombuffer(base64.urlsafe_b64decode(encoded + b'=' * (-len(encoded) % 4)), dtype=np.uint8)
+    except ValueError as e:
+        raise FingerprintError(f"Invalid fingerprint encoding: {str(e)}")
+    if len(data) < 4:
+        raise FingerprintError("Fingerprint is too short")
+
+    algorithm = int(data[0])
+    count = (int(data[1]) << 16) | (int(data[2]) << 8) | int(data[3])
+    if count == 0:
+        return np.zeros(0, dtype=np.uint32), algorithm
+
+    normal = _unpack(data[4:], 3)
+    ends = np.flatnonzero(normal == 0)
+    if len(ends) < count:
+        raise FingerprintError("Fingerprint is truncated")
+    normal = normal[:ends[count - 1] + 1]
+
+    exceptional_at = np.flatnonzero(normal == MAX_NORMAL_VALUE)
+    if len(exceptional_at):
+        offset = 4 + (len(normal) * 3 + 7) // 8
+        exceptional = _unpack(data[offset:], 5)
+        if len(exceptional) < len(exceptional_at):
+            raise FingerprintError("Fingerprint is truncated")
+        normal[exceptional_at] += exceptional[:len(exceptional_at)]
+
+    # Within each sub-fingerprint the gaps accumulate to 1-based bit positions
+    group = np.concatenate([[0], np.cumsum(normal == 0)[:-1]])
+    totals = np.cumsum(normal)
+    starts = np.concatenate([[0], totals[ends[:count - 1]]])
+    set_bits = normal != 0
+    positions = totals[set_bits] - starts[group[set_bits]]
+    if len(positions) and positions.max() > 32:
+        raise FingerprintError("Fingerprint has a bit position past 32")
+    # Bits within a sub-fingerprint are distinct, so summing them is exact (below 2**53) and ORs them
+    deltas = np.bincount(group[set_bits], weights=np.exp2(positions - 1), minlength=count)
+    return np.bitwise_xor.accumulate(deltas.astype(np.uint32)), algorithm
+
+def encode_fingerprint(values: np.ndarray, algorithm: int = 1) -> str:
+    """Compress and base64-encode raw sub-fingerprints; the inverse of decode_fingerprint"""
+    values = np.asarray(values, dtype=np.uint32)
+    deltas = values.copy()
+    deltas[1:] ^= values[:-1]
+
+    normal, exceptional = [], []
+    for x in deltas.tolist():
+        bit, last_bit = 1, 0
+        while x:
+            if x & 1:
+                gap = bit - last_bit
+                if gap >= MAX_NORMAL_VALUE:
+                    normal.append(MAX_NORMAL_VALUE)
+                    exceptional.append(gap - MAX_NORMAL_VALUE)
+                else:
+                    normal.append(gap)
+                last_bit = bit
+            x >>= 1
+            bit += 1
+        normal.append(0)
+
+    header = bytes([algorithm & 0xFF, (len(values) >> 16) & 0xFF, (len(values) >> 8) & 0xFF, len(values) & 0xFF])
+    data = header + _pack(normal, 3) + _pack(exceptional, 5)
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+def _unpack(data: np.ndarray, width: int) -> np.ndarray:
+    """Little-endian bit stream to `width`-bit unsigned values"""
+    bits = np.unpackbits(data, bitorder='little')
+    bits = bits[:len(bits) - len(bits) % width].reshape(-1, width)
+    return (bits @ (1 << np.arange(width, dtype=np.uint8))).astype(np.int64)
+
+def _pack(values, width: int) -> bytes:
+    if not values:
+        return b''
+    values = np.asarray(values, dtype=np.int64)
+    bits = ((values[:, np.newaxis] >> np.arange(width)) & 1).astype(np.uint8).ravel()
+    return np.packbits(bits, bitorder='little').tobytes()
+
+def _fpcalc(args: List[str], stdin: Optional[bytes] = None) -> str:
+    command = [os.environ.get('FPCALC', 'fpcalc'), '-length', str(MAX_SECONDS), *args]
+    try:
+        result = subprocess.run(command, input=stdin, capture_output=True, timeout=FPCALC_TIMEOUT)
+    except FileNotFoundError:
+        raise FingerprintError("Neither libchromaprint nor fpcalc is available")
+    except subprocess.TimeoutExpired:
+        raise FingerprintError(f"fpcalc timed out after {FPCALC_TIMEOUT} s")
+    if result.returncode != 0:
+        raise FingerprintError(f"fpcalc exited with status {result.returncode}: {result.stderr.decode(errors='replace').strip()}")
+    for line in result.stdout.decode(errors='replace').splitlines():
+        if line.startswith('FINGERPRINT='):
+            return line[len('FINGERPRINT='):].strip()
+    raise FingerprintError("fpcalc printed no fingerprint")
+
+# pyacoustid's ctypes binding; None when libchromaprint is not installed
+_binding = False
+
+def _chromaprint_binding():
+    global _binding
+    if _binding is False:
+        try:
+            import chromaprint
+            _binding = chromaprint
+        except ImportError:
+            _binding = None
+    return _binding
+
+class FingerprintError(Exception):
+    pass
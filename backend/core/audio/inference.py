@@ -0,0 +1,210 @@
+import asyncio
+import hashlib
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from ..config import settings
+
+N_MELS = 128         # Mel bands the model expects (the analyzer's default)
+WINDOW_FRAMES = 128  # Frames per model input window, ~3 s at 22050 Hz / hop 512
+TOP_GENRES = 3
+
+class InferenceService:
+    """
+    Genre and embedding inference with a TensorFlow SavedModel, micro-batched.
+
+    The model takes `mel` windows of shape (batch, N_MELS, WINDOW_FRAMES, 1) in dB
+    relative to the track's peak and returns `genre` probabilities and an
+    `embedding` per window; genre labels are read from assets/labels.txt, one per
+    line. TensorFlow is imported and the model loaded on the first prediction, in
+    the inference thread, so importing this module or starting a worker with
+    neural processing disabled costs nothing.
+
+    Windows from concurrent predict() calls share a queue: a batch is run once it
+    holds `batch_size` windows or `max_wait` seconds after its first window
+    arrived, whichever comes first. Batches run one at a time on a single thread,
+    on the CPU only.
+    """
+
+    def __init__(self, model_path: str = None, batch_size: int = None, max_wait: float = None,
+                 max_windows: int = None, threads: int = None):
+        self.model_path = Path(model_path or settings.INFERENCE_MODEL_PATH)
+        self.batch_size = max(1, batch_size or settings.BATCH_SIZE)
+        self.max_wait = max_wait if max_wait is not None else settings.INFERENCE_MAX_WAIT_MS / 1000
+        self.max_windows = max_windows or settings.INFERENCE_MAX_WINDOWS
+        self.threads = threads if threads is not None else settings.INFERENCE_THREADS
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="inference")
+        self._load_lock = threading.Lock()
+        self._saved_model = None
+        self._model = None
+        self._labels: List[str] = []
+        self._queue: Optional[asyncio.Queue] = None
+        self._queue_loop = None
+        self._batcher: Optional[asyncio.Task] = None
+        self.counters = {
+            'requests': 0,
+            'windows': 0,
+            'batches': 0,
+            'errors': 0
+        }
+        self._batched_windows = 0
+        self._inference_seconds = 0.0
+        self._load_seconds: Optional[float] = None
+
+    @property
+    def available(self) -> bool:
+        """Whether a SavedModel exists at model_path (checked without importing TensorFlow)"""
+        return (self.model_path / "saved_model.pb").is_file()
+
+    @property
+    def loaded(self) -> bool:
+        return self._model is not None
+
+    @property
+    def version(self) -> str:
+        """Short digest of the model graph and weights, so cached predictions follow model changes"""
+        digest = hashlib.sha1()
+        for name in ("saved_model.pb", "variables/variables.index"):
+            path = self.model_path / name
+            if path.is_file():
+                digest.update(path.read_bytes())
+        return digest.hexdigest()[:8]
+
+    async def predict(self, mel_spec_db: np.ndarray) -> Dict[str, Any]:
+        """Top genres and the mean embedding over a track's windows"""
+        windows = spectrogram_windows(mel_spec_db, self.max_windows)
+        self.counters['requests'] += 1
+        self.counters['windows'] += len(windows)
+
+        queue = self._get_queue()
+        loop = asyncio.get_running_loop()
+        futures = []
+        for window in windows:
+            future = loop.create_future()
+            queue.put_nowait((window, future))
+            futures.append(future)
+        outputs = await asyncio.gather(*futures)
+
+        genre = np.mean([probabilities for probabilities, _ in outputs], axis=0)
+        embedding = np.mean([vector for _, vector in outputs], axis=0)
+        top = np.argsort(genre)[-TOP_GENRES:][::-1]
+        return {
+            'genre': {self._labels[i]: float(genre[i]) for i in top},
+            'embedding': embedding.astype(np.float32).tolist()
+        }
+
+    def _get_queue(self) -> asyncio.Queue:
+        """The window queue and its batcher task, recreated if they belong to another event loop"""
+        loop = asyncio.get_running_loop()
+        if self._queue is None or self._queue_loop is not loop or self._batcher.done():
+            self._queue = asyncio.Queue()
+            self._queue_loop = loop
+            self._batcher = loop.create_task(self._run_batches(self._queue))
+        return self._queue
+
+    async def _run_batches(self, queue: asyncio.Queue) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.batch_size:
+                if queue.empty():
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(queue.get(), remaining))
+                    except asyncio.TimeoutError:
+                        break
+                else:
+                    batch.append(queue.get_nowait())
+
+            windows = np.stack([window for window, _ in batch])
+            try:
+                genre, embedding = await loop.run_in_executor(self._executor, self._infer, windows)
+            except Exception as e:
+                self.counters['errors'] += 1
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            for i, (_, future) in enumerate(batch):
+                if not future.done():
+                    future.set_result((genre[i], embedding[i]))
+
+    def _infer(self, windows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Run one batch through the model (inference thread)"""
+        self._ensure_loaded()
+        import tensorflow as tf
+        start = time.perf_counter()
+        outputs = self._model(mel=tf.constant(windows[..., np.newaxis]))
+        self._inference_seconds += time.perf_counter() - start
+        self._batched_windows += len(windows)
+        self.counters['batches'] += 1
+        return outputs['genre'].numpy(), outputs['embedding'].numpy()
+
+    def _ensure_loaded(self) -> None:
+        with self._load_lock:
+            if self._model is not None:
+                return
+            start = time.perf_counter()
+            # Deferred: importing TensorFlow takes seconds and hundreds of MB
+            import tensorflow as tf
+            tf.config.set_visible_devices([], 'GPU')
+            if self.threads:
+                tf.config.threading.set_intra_op_parallelism_threads(self.threads)
+            model = tf.saved_model.load(str(self.model_path))
+            labels_path = self.model_path / "assets" / "labels.txt"
+            self._labels = [line.strip() for line in labels_path.read_text().splitlines() if line.strip()]
+            # The signature's variables live only as long as the loaded object
+            self._saved_model = model
+            self._model = model.signatures['serving_default']
+            self._load_seconds = time.perf_counter() - start
+
+    def stats(self) -> Dict[str, Any]:
+        batches = self.counters['batches']
+        return {
+            **self.counters,
+            'loaded': self.loaded,
+            'batch_size': self.batch_size,
+            'mean_batch_size': self._batched_windows / batches if batches else None,
+            'mean_batch_ms': 1000 * self._inference_seconds / batches if batches else None,
+            'load_seconds': self._load_seconds
+        }
+
+    def close(self) -> None:
+        if self._batcher is not None and not self._batcher.done():
+            self._batcher.cancel()
+        self._executor.shutdown(wait=False)
+
+def spectrogram_windows(mel_spec_db: np.ndarray, max_windows: int) -> List[np.ndarray]:
+    """Up to max_windows evenly spaced (N_MELS, WINDOW_FRAMES) windows; short tracks are padded"""
+    if mel_spec_db.shape[0] != N_MELS:
+        raise InferenceError(f"Expected {N_MELS} mel bands, got {mel_spec_db.shape[0]}")
+    mel_spec_db = mel_spec_db.astype(np.float32)
+    frames = mel_spec_db.shape[1]
+    if frames < WINDOW_FRAMES:
+        # Pad with the spectrogram's floor, i.e. silence
+        floor = float(mel_spec_db.min()) if frames else -80.0
+        padding = np.full((N_MELS, WINDOW_FRAMES - frames), floor, dtype=np.float32)
+        return [np.concatenate([mel_spec_db, padding], axis=1)]
+
+    count = min(max_windows, math.ceil(frames / WINDOW_FRAMES))
+    starts = np.linspace(0, frames - WINDOW_FRAMES, count).astype(int)
+    return [mel_spec_db[:, start:start + WINDOW_FRAMES] for start in starts]
+
+# Shared by every analyzer in the process, so requests batch together and the model loads once
+_shared_service: Optional[InferenceService] = None
+
+def shared_inference_service() -> InferenceService:
+    global _shared_service
+    if _shared_service is None:
+        _shared_service = InferenceService()
+    return _shared_service
+
+class InferenceError(Exception):
+    pass
@@ -0,0 +1,126 @@
+import cProfile
+import os
+import pstats
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from prometheus_client import Counter, Histogram
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+STAGE_SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+RSS_BYTES_BUCKETS = tuple(2 ** n * 1024 * 1024 for n in range(5, 14))  # 32 MB to 8 GB
+
+ANALYSIS_SECONDS = Histogram(
+    'analysis_seconds', "Wall time of a whole file analysis", buckets=STAGE_SECONDS_BUCKETS
+)
+STAGE_SECONDS = Histogram(
+    'analysis_stage_seconds', "Wall time per analysis stage", ['stage'], buckets=STAGE_SECONDS_BUCKETS
+)
+STAGE_CPU_SECONDS = Histogram(
+    'analysis_stage_cpu_seconds', "CPU time per analysis stage (all threads of the process running it)",
+    ['stage'], buckets=STAGE_SECONDS_BUCKETS
+)
+STAGE_RSS_BYTES = Histogram(
+    'analysis_stage_rss_bytes', "Resident memory of the process running a stage, sampled at its end",
+    ['stage'], buckets=RSS_BYTES_BUCKETS
+)
+FILE_DECODES = Histogram(
+    'analysis_file_decodes', "Times a file was decoded during its analysis", buckets=(0, 1, 2, 3)
+)
+STAGE_FAILURES = Counter(
+    'analysis_stage_failures', "Analysis stages that failed without failing the analysis", ['stage']
+)
+ANALYSIS_FAILURES = Counter(
+    'analysis_failures', "Analyses that raised", ['error']
+)
+
+class StageTimer:
+    """
+    Wall time, CPU time and a resident memory sample for each stage of one analysis.
+    Created in whichever process runs the stages; to_dict() is picklable so worker
+    processes can send their stages back with the features.
+    """
+
+    def __init__(self):
+        self.stages: Dict[str, Dict[str, Any]] = {}
+
+    @contextmanager
+    def stage(self, name: str, cpu: bool = True) -> Iterator[Dict[str, Any]]:
+        """
+        Time the block as `name`. Pass cpu=False for stages that wait on other
+        threads (e.g. batched inference), whose process CPU time would include
+        unrelated work. The yielded dict takes extra fields, e.g. the backend used.
+        """
+        entry = self.stages.setdefault(name, {})
+        wall, process = time.perf_counter(), time.process_time()
+        try:
+            yield entry
+        finally:
+            entry['wall_ms'] = round(1000 * (time.perf_counter() - wall), 2)
+            if cpu:
+                entry['cpu_ms'] = round(1000 * (time.process_time() - process), 2)
+            rss = current_rss_bytes()
+            if rss is not None:
+                entry['rss_mb'] = round(rss / 2 ** 20, 1)
+
+    def failed(self, name: str, error: Exception) -> None:
+        """Note a stage that failed without failing the analysis"""
+        self.stages.setdefault(name, {})['error'] = str(error)
+
+    def to_dict(self) -> Dict[str, Dict[str, Any]]:
+        return dict(self.stages)
+
+def current_rss_bytes() -> Optional[int]:
+    """Resident set size of this process, from /proc where available"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        pass
+    if resource is not None:
+        # Peak rather than current, in KB on Linux and bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+    return None
+
+def record_analysis(timings: Dict[str, Any], seconds: float) -> None:
+    """Feed one analysis' timings (as returned in features['timings']) into the Prometheus metrics"""
+    ANALYSIS_SECONDS.observe(seconds)
+    if 'decodes' in timings:
+        FILE_DECODES.observe(timings['decodes'])
+    for name, stage in timings.get('stages', {}).items():
+        if 'wall_ms' in stage:
+            STAGE_SECONDS.labels(stage=name).observe(stage['wall_ms'] / 1000)
+        if 'cpu_ms' in stage:
+            STAGE_CPU_SECONDS.labels(stage=name).observe(stage['cpu_ms'] / 1000)
+        if 'rss_mb' in stage:
+            STAGE_RSS_BYTES.labels(stage=name).observe(stage['rss_mb'] * 2 ** 20)
+        if 'error' in stage:
+            STAGE_FAILURES.labels(stage=name).inc()
+
+def record_failure(error: Exception) -> None:
+    ANALYSIS_FAILURES.labels(error=type(error).__name__).inc()
+
+def profile_call(fn: Callable, *args, limit: int = 40) -> Tuple[Any, List[Dict[str, Any]]]:
+    """
+    Run fn(*args) under cProfile. Returns its result and the `limit` functions
+    with the highest cumulative time.
+    """
+    profiler = cProfile.Profile()
+    result = profiler.runcall(fn, *args)
+    rows = sorted(pstats.Stats(profiler).stats.items(), key=lambda item: item[1][3], reverse=True)
+    return result, [
+        {
+            'function': f"{Path(filename).name}:{line}({name})" if line else name,
+            'calls': calls,
+            'own_ms': round(1000 * own, 2),
+            'cumulative_ms': round(1000 * cumulative, 2)
+        }
+        for (filename, line, name), (_, calls, own, cumulative, _) in rows[:limit]
+    ]
@@ -0,0 +1,42 @@
+from pathlib import Path
+from typing import Dict, Any
+from ...models.audio import AudioFile, AudioFeatures, Metadata
+
+METADATA_COLUMNS = {column.name for column in Metadata.__table__.columns} - {'id', 'audio_file_id'}
+
+def build_audio_file(path: str, filename: str, features: Dict[str, Any]) -> AudioFile:
+    """Create an AudioFile row from analyzer output"""
+    return AudioFile(
+        path=path,
+        filename=filename,
+        duration=features['duration'],
+        sample_rate=features['sample_rate'],
+        channels=2,  # TODO: Get from file
+        bit_depth=16,  # TODO: Get from file
+        format=Path(filename).suffix.lstrip('.').lower()
+    )
+
+def build_audio_features(audio_file_id: int, features: Dict[str, Any]) -> AudioFeatures:
+    """Create an AudioFeatures row from analyzer output"""
+    return AudioFeatures(
+        audio_file_id=audio_file_id,
+        tempo=features['tempo']['tempo'],
+        tempo_confidence=features['tempo']['confidence'],
+        beat_positions=features['tempo']['beat_frames'],
+        spectral_centroid=features['spectral_features']['centroid_mean'],
+        spectral_rolloff=features['spectral_features']['rolloff_mean'],
+        spectral_bandwidth=features['spectral_features']['bandwidth_mean'],
+        mfcc_mean=features['mfcc']['mean'],
+        mfcc_var=features['mfcc']['var'],
+        key=features['key']['key'],
+        key_confidence=features['key']['confidence'],
+        acoustid_fingerprint=features['fingerprint'],
+        embedding=features.get('embedding')
+    )
+
+def build_metadata(audio_file_id: int, metadata: Dict[str, Any]) -> Metadata:
+    """Create a Metadata row from enricher output, ignoring fields the table does not store"""
+    return Metadata(
+        audio_file_id=audio_file_id,
+        **{field: value for field, value in metadata.items() if field in METADATA_COLUMNS}
+    )
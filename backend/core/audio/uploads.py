@@ -0,0 +1,47 @@
+import asyncio
+import hashlib
+from pathlib import Path
+from typing import BinaryIO
+from fastapi import UploadFile
+from ..config import settings
+
+CHUNK_SIZE = 1024 * 1024
+
+async def save_upload(upload: UploadFile, destination: Path) -> str:
+    """
+    Persist an upload to `destination` and return the SHA-256 of its contents.
+
+    Uploads are never read into memory as a whole: the spooled body is copied in
+    fixed-size chunks while being hashed. Uploads with a disallowed extension or
+    over MAX_UPLOAD_SIZE are rejected before or during the copy.
+    """
+    extension = Path(upload.filename or '').suffix.lstrip('.').lower()
+    if extension not in {fmt.lower() for fmt in settings.AUDIO_FORMATS}:
+        raise UploadRejectedError(415, f"Unsupported audio format: {extension or 'unknown'}")
+    if upload.size is not None and upload.size > settings.MAX_UPLOAD_SIZE:
+        raise UploadRejectedError(413, f"File exceeds maximum upload size of {settings.MAX_UPLOAD_SIZE} bytes")
+
+    try:
+        return await asyncio.to_thread(_copy_and_hash, upload.file, destination)
+    except BaseException:
+        destination.unlink(missing_ok=True)
+        raise
+
+def _copy_and_hash(source: BinaryIO, destination: Path) -> str:
+    """Copy a file object in chunks, hashing as we go and enforcing MAX_UPLOAD_SIZE"""
+    digest = hashlib.sha256()
+    written = 0
+    source.seek(0)
+    with open(destination, 'wb') as out_file:
+        while chunk := source.read(CHUNK_SIZE):
+            written += len(chunk)
+            if written > settings.MAX_UPLOAD_SIZE:
+                raise UploadRejectedError(413, f"File exceeds maximum upload size of {settings.MAX_UPLOAD_SIZE} bytes")
+            digest.update(chunk)
+            out_file.write(chunk)
+    return digest.hexdigest()
+
+class UploadRejectedError(Exception):
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
@@ -0,0 +1,222 @@
+"""
+Precomputed waveform peaks.
+
+During analysis the decoded mono signal is reduced to min/max pairs per
+`samples_per_peak` samples (level 0), and each further level halves the
+resolution of the previous one until it is shorter than MIN_PEAKS. All levels
+are quantized to int8 or int16 and stored in a single sidecar file:
+
+    header   b"AMWF", version (u16), bits (u8), reserved (u8),
+             sample_rate (u32), level count (u32)
+    levels   per level: samples_per_peak (u32), length (u32), offset (u64)
+    data     per level: `length` interleaved (min, max) pairs, 8-byte aligned
+
+Levels are read back through a memory map, so serving one only touches its pages.
+"""
+import os
+import shutil
+import struct
+import tempfile
+import uuid
+import numpy as np
+from pathlib import Path
+from typing import Dict, List, Optional
+from ..config import settings
+
+MAGIC = b"AMWF"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sHBBII")
+LEVEL_ENTRY = struct.Struct("<IIQ")
+MIN_PEAKS = 1024  # Stop adding coarser levels below this many peaks
+MAX_LEVELS = 12
+
+# Header of a single level in audiowaveform's binary .dat format (version 1)
+DAT_HEADER = struct.Struct("<iIiiI")
+
+class PeakBuilder:
+    """Accumulates level-0 peaks over a signal fed in arbitrary-sized blocks"""
+
+    def __init__(self, sr: int = 22050, samples_per_peak: int = None, bits: int = None):
+        self.sr = sr
+        self.samples_per_peak = samples_per_peak or settings.WAVEFORM_SAMPLES_PER_PEAK
+        self.bits = bits or settings.WAVEFORM_BITS
+        if self.bits not in (8, 16):
+            raise WaveformError(f"Unsupported peak resolution: {self.bits} bits")
+        self._remainder = np.zeros(0, dtype=np.float32)
+        self._mins: List[np.ndarray] = []
+        self._maxs: List[np.ndarray] = []
+
+    def feed(self, samples: np.ndarray) -> None:
+        """Add the next block of mono samples"""
+        samples = np.concatenate([self._remainder, samples.astype(np.float32, copy=False)])
+        whole = len(samples) // self.samples_per_peak * self.samples_per_peak
+        if whole:
+            frames = samples[:whole].reshape(-1, self.samples_per_peak)
+            self._mins.append(frames.min(axis=1))
+            self._maxs.append(frames.max(axis=1))
+        self._remainder = samples[whole:]
+
+    def finish(self) -> List[np.ndarray]:
+        """Return every level as an (n, 2) array of quantized (min, max) pairs, finest first"""
+        if len(self._remainder):
+            self._mins.append(self._remainder.min(keepdims=True))
+            self._maxs.append(self._remainder.max(keepdims=True))
+            self._remainder = np.zeros(0, dtype=np.float32)
+
+        if self._mins:
+            mins, maxs = np.concatenate(self._mins), np.concatenate(self._maxs)
+        else:
+            mins = maxs = np.zeros(0, dtype=np.float32)
+        self._mins, self._maxs = [], []
+
+        # Round outwards so quantization never makes a peak look quieter
+        scale = 2 ** (self.bits - 1) - 1
+        dtype = np.int8 if self.bits == 8 else np.int16
+        level = np.stack([
+            np.clip(np.floor(mins * scale), -scale, scale),
+            np.clip(np.ceil(maxs * scale), -scale, scale)
+        ], axis=1).astype(dtype)
+
+        levels = [level]
+        while len(level) >= 2 * MIN_PEAKS and len(levels) < MAX_LEVELS:
+            if len(level) % 2:
+                level = np.concatenate([level, level[-1:]])
+            pairs = level.reshape(-1, 2, 2)
+            level = np.stack([pairs[:, :, 0].min(axis=1), pairs[:, :, 1].max(axis=1)], axis=1)
+            levels.append(level)
+        return levels
+
+def write_peaks_file(path: str, levels: List[np.ndarray], sr: int, samples_per_peak: int) -> None:
+    """Write peak levels to a sidecar file atomically"""
+    bits = levels[0].dtype.itemsize * 8
+    offset = HEADER.size + LEVEL_ENTRY.size * len(levels)
+    entries = []
+    for index, level in enumerate(levels):
+        offset += -offset % 8
+        entries.append((samples_per_peak * 2 ** index, len(level), offset))
+        offset += level.nbytes
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Unique per write: threads of one process can write the same peaks at once
+    with tempfile.NamedTemporaryFile(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp", delete=False) as f:
+        temp_path = f.name
+        try:
+            f.write(HEADER.pack(MAGIC, FORMAT_VERSION, bits, 0, sr, len(levels)))
+            for entry in entries:
+                f.write(LEVEL_ENTRY.pack(*entry))
+            for (_, _, level_offset), level in zip(entries, levels):
+                f.write(b"\0" * (level_offset - f.tell()))
+                f.write(np.ascontiguousarray(level).astype(level.dtype.newbyteorder('<'), copy=False).tobytes())
+        except BaseException:
+            f.close()
+            os.unlink(temp_path)
+            raise
+    os.replace(temp_path, path)
+
+class WaveformFile:
+    """Read-only, memory-mapped view of a peaks sidecar file"""
+
+    def __init__(self, path: str):
+        self.path = str(path)
+        with open(self.path, 'rb') as f:
+            magic, version, bits, _, sample_rate, level_count = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC or version != FORMAT_VERSION:
+                raise WaveformError(f"Not a waveform peaks file: {self.path}")
+            entries = [LEVEL_ENTRY.unpack(f.read(LEVEL_ENTRY.size)) for _ in range(level_count)]
+
+        self.bits = bits
+        self.sample_rate = sample_rate
+        self.dtype = np.dtype('<i1' if bits == 8 else '<i2')
+        self.levels = [
+            {'samples_per_peak': samples_per_peak, 'length': length, 'offset': offset}
+            for samples_per_peak, length, offset in entries
+        ]
+        self._mmap = np.memmap(self.path, dtype=np.uint8, mode='r')
+
+    def level(self, index: int) -> np.ndarray:
+        """(length, 2) array of (min, max) pairs for a level, backed by the memory map"""
+        if not 0 <= index < len(self.levels):
+            raise WaveformError(f"Waveform level {index} does not exist (0-{len(self.levels) - 1})")
+        entry = self.levels[index]
+        size = entry['length'] * 2 * self.dtype.itemsize
+        data = self._mmap[entry['offset']:entry['offset'] + size]
+        return data.view(self.dtype).reshape(-1, 2)
+
+    def level_for_width(self, pixels: int) -> int:
+        """Coarsest level that still has at least `pixels` peaks"""
+        for index in range(len(self.levels) - 1, -1, -1):
+            if self.levels[index]['length'] >= pixels:
+                return index
+        return 0
+
+    def to_dat(self, index: int) -> bytes:
+        """Encode a level in audiowaveform's .dat format, as read by peaks.js"""
+        data = self.level(index)
+        entry = self.levels[index]
+        header = DAT_HEADER.pack(1, 1 if self.bits == 8 else 0, self.sample_rate,
+                                 entry['samples_per_peak'], entry['length'])
+        return header + data.tobytes()
+
+    def to_json(self, index: int) -> Dict:
+        """Encode a level in audiowaveform's JSON format"""
+        data = self.level(index)
+        entry = self.levels[index]
+        return {
+            'version': 2,
+            'channels': 1,
+            'sample_rate': self.sample_rate,
+            'samples_per_pixel': entry['samples_per_peak'],
+            'bits': self.bits,
+            'length': entry['length'],
+            'data': data.ravel().tolist()
+        }
+
+class WaveformStore:
+    """
+    Sidecar files on disk. Peaks are stored by content hash, so re-imports of the
+    same audio reuse them, and hard-linked under the audio file id for lookup.
+    """
+
+    def __init__(self, directory: str = None):
+        self.directory = Path(directory or settings.WAVEFORM_DIR)
+
+    def path_for_hash(self, content_hash: str) -> Path:
+        return self.directory / "peaks" / content_hash[:2] / f"{content_hash}.peaks"
+
+    def path_for_file(self, file_id: int) -> Path:
+        return self.directory / "files" / f"{file_id}.peaks"
+
+    def link(self, content_hash: str, file_id: int) -> bool:
+        """Make the peaks of `content_hash` available under `file_id`; False if there are none"""
+        source = self.path_for_hash(content_hash)
+        if not source.exists():
+            return False
+        target = self.path_for_file(file_id)
+        # os.link() needs a name that does not exist yet, so this cannot be a mkstemp() file
+        temp_target = target.with_name(f".{target.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                os.link(source, temp_target)
+            except OSError:
+                # Different filesystem or no hard link support
+                shutil.copyfile(source, temp_target)
+            os.replace(temp_target, target)
+            return True
+        except OSError as e:
+            print(f"Warning: Could not link waveform for file {file_id}: {str(e)}")
+            return False
+        finally:
+            # rename() is a no-op when target is already a link to the same peaks, leaving temp_target behind
+            temp_target.unlink(missing_ok=True)
+
+    def open(self, file_id: int) -> Optional[WaveformFile]:
+        """Open the peaks of an audio file, or None if they were never generated"""
+        path = self.path_for_file(file_id)
+        if not path.exists():
+            return None
+        return WaveformFile(path)
+
+class WaveformError(Exception):
+    pass
@@ -0,0 +1,143 @@
+import hashlib
+import json
+import time
+import uuid
+import aiofiles
+from pathlib import Path
+from typing import Dict, Any, Optional
+from redis import asyncio as aioredis
+from redis.exceptions import RedisError
+from ..config import settings
+
+HASH_BLOCK_SIZE = 1024 * 1024
+
+def hash_file(file_path: str) -> str:
+    """Compute the SHA-256 of a file, reading it in fixed-size blocks"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        while block := f.read(HASH_BLOCK_SIZE):
+            digest.update(block)
+    return digest.hexdigest()
+
+class AnalysisCache:
+    """
+    Content-addressed cache of AudioAnalyzer results.
+
+    Entries are keyed by the SHA-256 of the uploaded bytes plus the analyzer
+    version, so re-importing the same file skips decoding and feature extraction
+    entirely. Redis is the primary store; when it is unreachable, entries are
+    read from and written to JSON files on local disk instead. A ttl of 0 or
+    less keeps entries until they are evicted or the analyzer version changes.
+    """
+
+    KEY_PREFIX = "ammms:analysis"
+    REDIS_RETRY_INTERVAL = 30  # Seconds to wait before trying Redis again after a failure
+
+    def __init__(self, analyzer_version: str, ttl: int = None, directory: str = None):
+        self.analyzer_version = analyzer_version
+        self.ttl = ttl if ttl is not None else settings.CACHE_TTL
+        self.directory = Path(directory or settings.ANALYSIS_CACHE_DIR)
+        self.redis = aioredis.Redis(
+            host=settings.REDIS_HOST,
+            port=settings.REDIS_PORT,
+            db=settings.REDIS_DB,
+            socket_connect_timeout=1,
+            socket_timeout=1
+        )
+        self._redis_down_until = 0.0
+        self.counters = {
+            'hits': 0,
+            'misses': 0,
+            'redis_hits': 0,
+            'disk_hits': 0,
+            'writes': 0,
+            'redis_errors': 0
+        }
+
+    def key(self, content_hash: str) -> str:
+        return f"{self.KEY_PREFIX}:{self.analyzer_version}:{content_hash}"
+
+    def _disk_path(self, content_hash: str) -> Path:
+        return self.directory / self.analyzer_version / content_hash[:2] / f"{content_hash}.json"
+
+    def _redis_available(self) -> bool:
+        return time.monotonic() >= self._redis_down_until
+
+    def _redis_failed(self, error: Exception):
+        self.counters['redis_errors'] += 1
+        self._redis_down_until = time.monotonic() + self.REDIS_RETRY_INTERVAL
+        print(f"Warning: Analysis cache falling back to disk: {str(error)}")
+
+    async def get(self, content_hash: str) -> Optional[Dict[str, Any]]:
+        """Return the cached analysis for the given content hash, or None"""
+        features = None
+
+        if self._redis_available():
+            try:
+                raw = await self.redis.get(self.key(content_hash))
+                if raw is not None:
+                    features = json.loads(raw)
+                    self.counters['redis_hits'] += 1
+            except RedisError as e:
+                self._redis_failed(e)
+
+        if features is None:
+            features = await self._disk_get(content_hash)
+            if features is not None:
+                self.counters['disk_hits'] += 1
+
+        self.counters['hits' if features is not None else 'misses'] += 1
+        return features
+
+    async def set(self, content_hash: str, features: Dict[str, Any]) -> None:
+        """Store an analysis result; the per-frame MFCC matrix and the run's timings and profile are not cached"""
+        entry = {k: v for k, v in features.items() if k not in ('timings', 'profile')}
+        if isinstance(entry.get('mfcc'), dict):
+            entry['mfcc'] = {k: v for k, v in entry['mfcc'].items() if k != 'coefficients'}
+        raw = json.dumps(entry)
+
+        stored = False
+        if self._redis_available():
+            try:
+                await self.redis.set(self.key(content_hash), raw, ex=self.ttl if self.ttl > 0 else None)
+                stored = True
+            except RedisError as e:
+                self._redis_failed(e)
+
+        if not stored:
+            await self._disk_set(content_hash, raw)
+        self.counters['writes'] += 1
+
+    async def _disk_get(self, content_hash: str) -> Optional[Dict[str, Any]]:
+        path = self._disk_path(content_hash)
+        try:
+            if self.ttl > 0 and time.time() - path.stat().st_mtime > self.ttl:
+                path.unlink(missing_ok=True)
+                return None
+            async with aiofiles.open(path, 'r') as f:
+                return json.loads(await f.read())
+        except (OSError, ValueError):
+            return None
+
+    async def _disk_set(self, content_hash: str, raw: str) -> None:
+        path = self._disk_path(content_hash)
+        # Unique per write, since several workers can store the same analysis at once
+        tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            async with aiofiles.open(tmp_path, 'w') as f:
+                await f.write(raw)
+            tmp_path.replace(path)
+        except OSError as e:
+            tmp_path.unlink(missing_ok=True)
+            print(f"Warning: Could not write analysis cache entry {path}: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the current hit ratio"""
+        lookups = self.counters['hits'] + self.counters['misses']
+        return {
+            **self.counters,
+            'hit_ratio': round(self.counters['hits'] / lookups, 4) if lookups else 0.0,
+            'backend': 'redis' if self._redis_available() else 'disk',
+            'analyzer_version': self.analyzer_version
+        }
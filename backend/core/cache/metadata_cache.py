@@ -0,0 +1,202 @@
+import asyncio
+import hashlib
+import json
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+from redis import asyncio as aioredis
+from redis.exceptions import RedisError
+from ..config import settings
+
+class MetadataCache:
+    """
+    Two-tier cache of metadata provider lookups.
+
+    Entries are keyed by provider and a normalized (artist, title) pair and live
+    in a size-bounded in-process LRU backed by Redis, which shares them between
+    API and worker processes. Empty provider results are cached as well, with the
+    shorter METADATA_NEGATIVE_CACHE_TTL. Once an entry expires it is still served
+    for up to METADATA_CACHE_STALE_TTL while a background task fetches a fresh copy
+    (stale-while-revalidate). As in the analysis cache, a TTL of 0 or less means
+    entries never expire.
+    """
+
+    KEY_PREFIX = "ammms:metadata"
+    REDIS_RETRY_INTERVAL = 30  # Seconds to wait before trying Redis again after a failure
+
+    def __init__(self, ttl: int = None, negative_ttl: int = None, stale_ttl: int = None, max_entries: int = None):
+        self.ttl = ttl if ttl is not None else settings.METADATA_CACHE_TTL
+        self.negative_ttl = negative_ttl if negative_ttl is not None else settings.METADATA_NEGATIVE_CACHE_TTL
+        self.stale_ttl = stale_ttl if stale_ttl is not None else settings.METADATA_CACHE_STALE_TTL
+        self.max_entries = max_entries or settings.METADATA_CACHE_MAX_ENTRIES
+        self.redis = aioredis.Redis(
+            host=settings.REDIS_HOST,
+            port=settings.REDIS_PORT,
+            db=settings.REDIS_DB,
+            socket_connect_timeout=1,
+            socket_timeout=1
+        )
+        self._redis_down_until = 0.0
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._refreshing: Set[str] = set()
+        self._background: Set[asyncio.Future] = set()
+        self.counters = {
+            'hits': 0,
+            'misses': 0,
+            'memory_hits': 0,
+            'redis_hits': 0,
+            'stale_hits': 0,
+            'negative_hits': 0,
+            'writes': 0,
+            'revalidations': 0,
+            'revalidation_errors': 0,
+            'evictions': 0,
+            'redis_errors': 0
+        }
+
+    def key(self, provider: str, artist: Optional[str], title: Optional[str]) -> str:
+        digest = hashlib.sha1(f"{normalize(artist)}\x1f{normalize(title)}".encode()).hexdigest()
+        return f"{self.KEY_PREFIX}:{provider}:{digest}"
+
+    def _redis_available(self) -> bool:
+        return time.monotonic() >= self._redis_down_until
+
+    def _redis_failed(self, error: Exception):
+        self.counters['redis_errors'] += 1
+        self._redis_down_until = time.monotonic() + self.REDIS_RETRY_INTERVAL
+        print(f"Warning: Metadata cache falling back to memory only: {str(error)}")
+
+    async def fetch(self, provider: str, artist: Optional[str], title: Optional[str],
+                    loader: Callable[[], Awaitable[Dict[str, Any]]], revalidate: bool = False) -> Dict[str, Any]:
+        """
+        Return the provider result for (artist, title), calling loader() on a miss.
+        Stale entries are returned immediately and refreshed in the background; with
+        revalidate=True even a fresh entry is refreshed in the background.
+        """
+        if not normalize(artist) and not normalize(title):
+            # Nothing to key on (e.g. an untagged upload); every such lookup would collide
+            return await loader()
+
+        key = self.key(provider, artist, title)
+        entry = await self._get(key)
+        if entry is None:
+            self.counters['misses'] += 1
+            value = await loader()
+            await self._set(key, value)
+            return value
+
+        self.counters['hits'] += 1
+        if not entry['value']:
+            self.counters['negative_hits'] += 1
+        if not _before(time.time(), entry['fresh_until']):
+            self.counters['stale_hits'] += 1
+            self._revalidate(key, loader)
+        elif revalidate:
+            self._revalidate(key, loader)
+        return entry['value']
+
+    async def _get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Look up an entry in memory, then Redis; None if absent or past its stale window"""
+        now = time.time()
+        entry = self._memory.get(key)
+        if entry is not None:
+            if _before(now, entry['stale_until']):
+                self._memory.move_to_end(key)
+                self.counters['memory_hits'] += 1
+                return entry
+            del self._memory[key]
+
+        if self._redis_available():
+            try:
+                raw = await self.redis.get(key)
+                if raw is not None:
+                    entry = json.loads(raw)
+                    if _before(now, entry['stale_until']):
+                        self.counters['redis_hits'] += 1
+                        self._remember(key, entry)
+                        return entry
+            except RedisError as e:
+                self._redis_failed(e)
+            except (ValueError, KeyError):
+                pass
+        return None
+
+    async def _set(self, key: str, value: Dict[str, Any]) -> None:
+        ttl = self.ttl if value else self.negative_ttl
+        lifetime = ttl + max(self.stale_ttl, 0) if ttl > 0 else None
+        now = time.time()
+        entry = {
+            'value': value,
+            'fresh_until': now + ttl if lifetime else None,
+            'stale_until': now + lifetime if lifetime else None
+        }
+        self._remember(key, entry)
+        self.counters['writes'] += 1
+
+        if self._redis_available():
+            try:
+                await self.redis.set(key, json.dumps(entry), ex=int(lifetime) if lifetime else None)
+            except RedisError as e:
+                self._redis_failed(e)
+
+    def _remember(self, key: str, entry: Dict[str, Any]) -> None:
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.counters['evictions'] += 1
+
+    def _revalidate(self, key: str, loader: Callable[[], Awaitable[Dict[str, Any]]]) -> None:
+        """Refresh an entry in the background, at most once at a time per key"""
+        if key in self._refreshing:
+            return
+        self._refreshing.add(key)
+
+        async def refresh():
+            try:
+                await self._set(key, await loader())
+                self.counters['revalidations'] += 1
+            except Exception as e:
+                # Keep serving the stale entry; the next lookup tries again
+                self.counters['revalidation_errors'] += 1
+                print(f"Warning: Metadata cache revalidation failed: {str(e)}")
+            finally:
+                self._refreshing.discard(key)
+
+        task = asyncio.ensure_future(refresh())
+        # Hold a reference until done so the task is not garbage collected mid-flight
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and the current hit ratio"""
+        lookups = self.counters['hits'] + self.counters['misses']
+        return {
+            **self.counters,
+            'hit_ratio': round(self.counters['hits'] / lookups, 4) if lookups else 0.0,
+            'memory_entries': len(self._memory),
+            'refreshing': len(self._refreshing),
+            'backend': 'redis' if self._redis_available() else 'memory'
+        }
+
+def _before(now: float, deadline: Optional[float]) -> bool:
+    """Whether a fresh_until/stale_until deadline is still ahead; None never passes"""
+    return deadline is None or deadline > now
+
+def normalize(value: Optional[str]) -> str:
+    """Case-, Unicode-form- and whitespace-insensitive form of an artist or title"""
+    if not value:
+        return ''
+    value = unicodedata.normalize('NFKC', str(value)).casefold()
+    return re.sub(r'\s+', ' ', value).strip()
+
+# Shared by every enricher in the process
+_shared_cache: Optional[MetadataCache] = None
+
+def shared_metadata_cache() -> MetadataCache:
+    global _shared_cache
+    if _shared_cache is None:
+        _shared_cache = MetadataCache()
+    return _shared_cache
@@ -0,0 +1,226 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+import aiohttp
+from ..config import settings
+
+RETRY_STATUSES = {429, 503}
+
+class TokenBucket:
+    """
+    Asyncio token bucket: `rate` requests per second with bursts of up to `burst`.
+
+    Tokens may go negative, which queues callers in arrival order without a lock:
+    each acquire() reserves the next slot and sleeps until it comes up. A rate of
+    0 (or None) disables limiting.
+    """
+
+    def __init__(self, rate: Optional[float], burst: int = 1):
+        self.rate = rate or 0.0
+        self.burst = max(1, burst)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self) -> float:
+        """Wait for a token; returns the seconds spent waiting"""
+        if self.rate <= 0:
+            return 0.0
+        self._refill()
+        self._tokens -= 1
+        wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait:
+            await asyncio.sleep(wait)
+        return wait
+
+    def penalize(self, seconds: float) -> None:
+        """Hold back every caller for `seconds`, e.g. after a 429 with Retry-After"""
+        if self.rate <= 0:
+            return
+        self._refill()
+        self._tokens = min(self._tokens, 0.0) - seconds * self.rate
+
+class Provider:
+    """Rate limiter, in-flight request coalescing and throughput counters for one metadata source"""
+
+    def __init__(self, name: str, rate: Optional[float], burst: int = 1, max_retries: int = 2):
+        self.name = name
+        self.limiter = TokenBucket(rate, burst)
+        self.max_retries = max_retries
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self._started = time.monotonic()
+        self.counters = {
+            'calls': 0,
+            'requests': 0,
+            'coalesced': 0,
+            'retries': 0,
+            'errors': 0
+        }
+        self._request_seconds = 0.0
+        self._wait_seconds = 0.0
+
+    async def call(self, key: Hashable, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run factory() under the rate limit. Concurrent calls with the same key share
+        a single request instead of each spending a token.
+        """
+        self.counters['calls'] += 1
+        future = self._inflight.get(key)
+        if future is not None:
+            self.counters['coalesced'] += 1
+        else:
+            future = asyncio.ensure_future(self._request(factory))
+            self._inflight[key] = future
+            future.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # Shielded so one caller going away does not cancel the request for the others
+        return await asyncio.shield(future)
+
+    async def _request(self, factory: Callable[[], Awaitable[Any]]) -> Any:
+        attempt = 0
+        while True:
+            self._wait_seconds += await self.limiter.acquire()
+            self.counters['requests'] += 1
+            start = time.monotonic()
+            try:
+                return await factory()
+            except Exception as e:
+                retry_after = _retry_after(e)
+                if retry_after is None or attempt >= self.max_retries:
+                    self.counters['errors'] += 1
+                    raise
+                attempt += 1
+                self.counters['retries'] += 1
+                self.limiter.penalize(retry_after)
+            finally:
+                self._request_seconds += time.monotonic() - start
+
+    def stats(self) -> Dict[str, Any]:
+        elapsed = max(time.monotonic() - self._started, 1e-9)
+        requests = self.counters['requests']
+        return {
+            **self.counters,
+            'rate_limit': self.limiter.rate or None,
+            'requests_per_second': requests / elapsed,
+            'mean_latency_ms': 1000 * self._request_seconds / requests if requests else None,
+            'rate_limited_seconds': self._wait_seconds
+        }
+
+class MetadataClients:
+    """
+    Connection-pooled access to the metadata providers.
+
+    HTTP providers share one aiohttp session (per event loop) with keep-alive
+    connections; blocking SDKs (musicbrainzngs, discogs_client) run in a bounded
+    thread pool so they never stall the event loop. Rate limits are enforced per
+    process.
+    """
+
+    def __init__(self, pool_size: int = None, timeout: float = None, sdk_threads: int = None):
+        self.pool_size = pool_size or settings.METADATA_HTTP_POOL_SIZE
+        self.timeout = timeout or settings.METADATA_HTTP_TIMEOUT
+        self.providers = {
+            'musicbrainz': Provider('musicbrainz', settings.MUSICBRAINZ_RATE_LIMIT),
+            'discogs': Provider('discogs', settings.DISCOGS_RATE_LIMIT),
+            'beatport': Provider('beatport', settings.BEATPORT_RATE_LIMIT, burst=5),
+            'lastfm': Provider('lastfm', settings.LASTFM_RATE_LIMIT, burst=5)
+        }
+        self._executor = ThreadPoolExecutor(
+            max_workers=sdk_threads or settings.METADATA_SDK_THREADS,
+            thread_name_prefix="metadata-sdk"
+        )
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_loop = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """The shared session, recreated if it was closed or belongs to another event loop"""
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            self._release_session()
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.pool_size, ttl_dns_cache=300),
+                timeout=aiohttp.ClientTimeout(total=self.timeout)
+            )
+            self._session_loop = loop
+        return self._session
+
+    def _release_session(self) -> None:
+        """Close a session left behind on another event loop, on that loop"""
+        session, loop = self._session, self._session_loop
+        self._session = self._session_loop = None
+        if session is None or session.closed or loop.is_closed():
+            # A closed loop cannot close its transports any more; they release their sockets when collected
+            return
+        if loop.is_running():
+            # Serving another thread; close the session there
+            asyncio.run_coroutine_threadsafe(session.close(), loop)
+        else:
+            # Idle (e.g. a worker's loop between tasks), and this thread is running another loop
+            closer = threading.Thread(target=loop.run_until_complete, args=(session.close(),))
+            closer.start()
+            closer.join()
+
+    async def get_json(self, provider: str, url: str, params: Dict[str, Any] = None,
+                       headers: Dict[str, str] = None) -> Optional[Any]:
+        """GET a JSON document; returns None for non-200 responses other than rate limiting"""
+        params = {name: str(value) for name, value in (params or {}).items() if value is not None}
+
+        async def fetch():
+            async with self._get_session().get(url, params=params, headers=headers) as response:
+                if response.status in RETRY_STATUSES:
+                    raise ProviderRateLimitedError(response.status, response.headers.get('Retry-After'))
+                if response.status != 200:
+                    return None
+                return await response.json(content_type=None)
+
+        key = (url, tuple(sorted(params.items())))
+        return await self.providers[provider].call(key, fetch)
+
+    async def run_blocking(self, provider: str, key: Hashable, fn: Callable, *args) -> Any:
+        """Run a blocking SDK call in the thread pool under the provider's rate limit"""
+        loop = asyncio.get_running_loop()
+        return await self.providers[provider].call(
+            key,
+            lambda: loop.run_in_executor(self._executor, fn, *args)
+        )
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: provider.stats() for name, provider in self.providers.items()}
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """Seconds to back off if `error` is a rate-limit response from any provider, else None"""
+    if isinstance(error, ProviderRateLimitedError):
+        return error.retry_after
+    # discogs_client.exceptions.HTTPError has status_code; musicbrainzngs wraps urllib's HTTPError in cause
+    status = getattr(error, 'status_code', None) or getattr(getattr(error, 'cause', None), 'code', None)
+    if status in RETRY_STATUSES:
+        return 1.0
+    return None
+
+# Shared by every enricher in the process, so rate limits hold across API modules
+_shared_clients: Optional[MetadataClients] = None
+
+def shared_clients() -> MetadataClients:
+    global _shared_clients
+    if _shared_clients is None:
+        _shared_clients = MetadataClients()
+    return _shared_clients
+
+class ProviderRateLimitedError(Exception):
+    def __init__(self, status: int, retry_after: Optional[str] = None):
+        super().__init__(f"Rate limited by provider (HTTP {status})")
+        self.status = status
+        try:
+            self.retry_after = max(0.0, float(retry_after)) if retry_after else 1.0
+        except ValueError:
+            self.retry_after = 1.0
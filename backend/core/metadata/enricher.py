@@ -1,14 +1,19 @@
 import musicbrainzngs
 import discogs_client
-import requests
+import re
+from pathlib import Path
 from typing import Dict, Any, List, Optional
+from urllib.parse import urlparse
 from ..config import settings
+from .clients import MetadataClients, shared_clients
+from ..cache.metadata_cache import MetadataCache, shared_metadata_cache
 import asyncio
-import aiohttp
 from datetime import datetime
 
 class MetadataEnricher:
-    def __init__(self):
+    def __init__(self, clients: Optional[MetadataClients] = None, cache: Optional[MetadataCache] = None):
+        self.clients = clients or shared_clients()
+        self.cache = cache or shared_metadata_cache()
         self._setup_clients()
         
     def _setup_clients(self):
@@ -18,27 +23,50 @@ class MetadataEnricher:
             settings.MUSICBRAINZ_APP_NAME,
             settings.MUSICBRAINZ_VERSION
         )
+        # Requests are paced by our own limiter, which waits without holding an SDK thread
+        musicbrainzngs.set_rate_limit(False)
+        if settings.MUSICBRAINZ_API_URL:
+            url = urlparse(settings.MUSICBRAINZ_API_URL)
+            musicbrainzngs.set_hostname(url.netloc, use_https=url.scheme == 'https')
         
         # Discogs
         self.discogs = discogs_client.Client(
             'AMMMS',
             user_token=settings.DISCOGS_TOKEN
         )
+        if settings.DISCOGS_API_URL:
+            self.discogs._base_url = settings.DISCOGS_API_URL.rstrip('/')
+        
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-provider request counters and throughput"""
+        return self.clients.stats()
+        
+    async def close(self):
+        await self.clients.close()
         
     async def enrich_metadata(self, basic_metadata: Dict[str, Any], 
-                            genre_prediction: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
-        """Enrich metadata from multiple sources"""
+                            genre_prediction: Optional[Dict[str, float]] = None,
+                            revalidate: bool = False) -> Dict[str, Any]:
+        """
+        Enrich metadata from multiple sources.
+        Provider lookups are cached; with revalidate=True cached answers are still
+        returned, but refreshed in the background for the next call.
+        """
+        if not basic_metadata.get('artist') and not basic_metadata.get('title') and basic_metadata.get('filename'):
+            # Untagged files are looked up, and cached, by what their filename says
+            basic_metadata = {**basic_metadata, **parse_filename(basic_metadata['filename'])}
+
         tasks = [
-            self._query_musicbrainz(basic_metadata),
-            self._query_discogs(basic_metadata)
+            self._cached('musicbrainz', self._query_musicbrainz, basic_metadata, revalidate),
+            self._cached('discogs', self._query_discogs, basic_metadata, revalidate)
         ]
         
         # Add Beatport query for electronic music
         if genre_prediction and self._is_electronic(genre_prediction):
-            tasks.append(self._query_beatport(basic_metadata))
+            tasks.append(self._cached('beatport', self._query_beatport, basic_metadata, revalidate))
             
         # Add Last.fm query
-        tasks.append(self._query_lastfm(basic_metadata))
+        tasks.append(self._cached('lastfm', self._query_lastfm, basic_metadata, revalidate))
         
         # Gather results
         results = await asyncio.gather(*tasks, return_exceptions=True)
@@ -49,15 +77,26 @@ class MetadataEnricher:
             if isinstance(result, Exception):
                 print(f"Warning: Metadata source error: {str(result)}")
                 continue
-            processed_results.update(result)
+            if result:
+                processed_results[result['source']] = result
             
         return self._reconcile_metadata(processed_results)
         
+    async def _cached(self, provider: str, query, metadata: Dict[str, Any], revalidate: bool) -> Dict[str, Any]:
+        """Run a provider query through the metadata cache"""
+        return await self.cache.fetch(
+            provider,
+            metadata.get('artist'),
+            metadata.get('title'),
+            lambda: query(metadata),
+            revalidate=revalidate
+        )
+        
     async def _query_musicbrainz(self, metadata: Dict[str, Any]) -> Dict[str, Any]:
         """Query MusicBrainz API"""
         try:
             query = self._build_musicbrainz_query(metadata)
-            result = musicbrainzngs.search_recordings(query)
+            result = await self.clients.run_blocking('musicbrainz', query, musicbrainzngs.search_recordings, query)
             
             if result['recording-list']:
                 recording = result['recording-list'][0]
@@ -77,92 +116,90 @@ class MetadataEnricher:
     async def _query_discogs(self, metadata: Dict[str, Any]) -> Dict[str, Any]:
         """Query Discogs API"""
         try:
-            results = self.discogs.search(
-                type='release',
-                artist=metadata.get('artist'),
-                track=metadata.get('title')
-            )
-            
-            if results:
-                release = results[0]
-                return {
-                    'title': release.title,
-                    'artist': release.artists[0].name if release.artists else None,
-                    'label': release.labels[0].name if release.labels else None,
-                    'year': release.year,
-                    'genre': release.genres[0] if release.genres else None,
-                    'style': release.styles[0] if release.styles else None,
-                    'source': 'discogs',
-                    'confidence': 0.7  # Example confidence score
-                }
+            artist, title = metadata.get('artist'), metadata.get('title')
+            return await self.clients.run_blocking('discogs', (artist, title), self._search_discogs, artist, title)
         except Exception as e:
             raise MetadataError(f"Discogs query failed: {str(e)}")
-            
+        
+    def _search_discogs(self, artist: Optional[str], title: Optional[str]) -> Dict[str, Any]:
+        """Blocking Discogs lookup; results are fetched lazily, so all attribute access happens here"""
+        results = self.discogs.search(
+            type='release',
+            artist=artist,
+            track=title
+        )
+        
+        if results:
+            release = results[0]
+            return {
+                'title': release.title,
+                'artist': release.artists[0].name if release.artists else None,
+                'label': release.labels[0].name if release.labels else None,
+                'year': release.year,
+                'genre': release.genres[0] if release.genres else None,
+                'style': release.styles[0] if release.styles else None,
+                'source': 'discogs',
+                'confidence': 0.7  # Example confidence score
+            }
+        
         return {}
         
     async def _query_beatport(self, metadata: Dict[str, Any]) -> Dict[str, Any]:
         """Query Beatport API"""
-        async with aiohttp.ClientSession() as session:
-            try:
-                # Note: This is a simplified example. Real Beatport API integration
-                # would require OAuth2 authentication and proper API endpoints
-                url = 'https://api.beatport.com/v4/catalog/search'
-                params = {
-                    'q': f"{metadata.get('artist')} {metadata.get('title')}",
-                    'type': 'tracks'
-                }
-                headers = {
-                    'Authorization': f"Bearer {settings.BEATPORT_CLIENT_ID}"
+        try:
+            # Note: This is a simplified example. Real Beatport API integration
+            # would require OAuth2 authentication and proper API endpoints
+            params = {
+                'q': f"{metadata.get('artist')} {metadata.get('title')}",
+                'type': 'tracks'
+            }
+            headers = {
+                'Authorization': f"Bearer {settings.BEATPORT_CLIENT_ID}"
+            }
+            
+            data = await self.clients.get_json('beatport', settings.BEATPORT_API_URL, params, headers)
+            if data and data.get('results'):
+                track = data['results'][0]
+                return {
+                    'title': track.get('name'),
+                    'artist': track.get('artists', [{}])[0].get('name'),
+                    'label': track.get('label', {}).get('name'),
+                    'genre': track.get('genre', {}).get('name'),
+                    'key': track.get('key', {}).get('name'),
+                    'bpm': track.get('bpm'),
+                    'source': 'beatport',
+                    'confidence': 0.9  # Example confidence score
                 }
-                
-                async with session.get(url, params=params, headers=headers) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        if data['results']:
-                            track = data['results'][0]
-                            return {
-                                'title': track.get('name'),
-                                'artist': track.get('artists', [{}])[0].get('name'),
-                                'label': track.get('label', {}).get('name'),
-                                'genre': track.get('genre', {}).get('name'),
-                                'key': track.get('key', {}).get('name'),
-                                'bpm': track.get('bpm'),
-                                'source': 'beatport',
-                                'confidence': 0.9  # Example confidence score
-                            }
-            except Exception as e:
-                raise MetadataError(f"Beatport query failed: {str(e)}")
-                
+        except Exception as e:
+            raise MetadataError(f"Beatport query failed: {str(e)}")
+            
         return {}
         
     async def _query_lastfm(self, metadata: Dict[str, Any]) -> Dict[str, Any]:
         """Query Last.fm API"""
-        async with aiohttp.ClientSession() as session:
-            try:
-                url = 'http://ws.audioscrobbler.com/2.0/'
-                params = {
-                    'method': 'track.getInfo',
-                    'api_key': settings.LASTFM_API_KEY,
-                    'artist': metadata.get('artist'),
-                    'track': metadata.get('title'),
-                    'format': 'json'
+        try:
+            params = {
+                'method': 'track.getInfo',
+                'api_key': settings.LASTFM_API_KEY,
+                'artist': metadata.get('artist'),
+                'track': metadata.get('title'),
+                'format': 'json'
+            }
+            
+            data = await self.clients.get_json('lastfm', settings.LASTFM_API_URL, params)
+            if data and data.get('track'):
+                track = data['track']
+                return {
+                    'title': track.get('name'),
+                    'artist': track.get('artist', {}).get('name'),
+                    'album': track.get('album', {}).get('title'),
+                    'tags': [tag['name'] for tag in track.get('toptags', {}).get('tag', [])],
+                    'source': 'lastfm',
+                    'confidence': 0.6  # Example confidence score
                 }
-                
-                async with session.get(url, params=params) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        track = data.get('track', {})
-                        return {
-                            'title': track.get('name'),
-                            'artist': track.get('artist', {}).get('name'),
-                            'album': track.get('album', {}).get('title'),
-                            'tags': [tag['name'] for tag in track.get('toptags', {}).get('tag', [])],
-                            'source': 'lastfm',
-                            'confidence': 0.6  # Example confidence score
-                        }
-            except Exception as e:
-                raise MetadataError(f"Last.fm query failed: {str(e)}")
-                
+        except Exception as e:
+            raise MetadataError(f"Last.fm query failed: {str(e)}")
+            
         return {}
         
     def _build_musicbrainz_query(self, metadata: Dict[str, Any]) -> str:
@@ -218,5 +255,14 @@ class MetadataEnricher:
             
         return reconciled
 
+def parse_filename(filename: str) -> Dict[str, str]:
+    """Artist and title from an "[NN - ]Artist - Title.ext" filename; otherwise the whole name is the title"""
+    stem = Path(filename).stem.replace('_', ' ')
+    stem = re.sub(r'^\d{1,2}\s*[-.)]?\s+', '', stem).strip()
+    artist, separator, title = stem.partition(' - ')
+    if separator and artist.strip() and title.strip():
+        return {'artist': artist.strip(), 'title': title.strip()}
+    return {'title': stem or filename}
+
 class MetadataError(Exception):
     pass
\ No newline at end of file
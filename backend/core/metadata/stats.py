@@ -0,0 +1,73 @@
+from typing import Any, Dict
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+from ...models.audio import AudioFile, Metadata, MetadataSummary, Tag
+
+# Fields whose fill rate /metadata/stats reports; keep in step with migration 0005
+COVERAGE_FIELDS = ("title", "artist", "album", "year", "genre", "label", "key", "bpm")
+
+def summary_counts(db: Session) -> Dict[str, int]:
+    """Read the trigger-maintained counters from metadata_summary"""
+    return {name: value for name, value in db.execute(select(MetadataSummary.name, MetadataSummary.value))}
+
+def aggregate_counts(db: Session) -> Dict[str, int]:
+    """
+    Count everything from the base tables: one grouped pass over metadata, plus
+    a count of audio_files and a grouped pass over the (small) tags table.
+    """
+    counts = {'files': db.execute(select(func.count()).select_from(AudioFile)).scalar() or 0}
+    for field in COVERAGE_FIELDS:
+        counts[f"coverage:{field}"] = 0
+
+    rows = db.execute(
+        select(
+            Metadata.primary_source,
+            func.count(),
+            *(func.count(getattr(Metadata, field)) for field in COVERAGE_FIELDS)
+        ).group_by(Metadata.primary_source)
+    )
+    for source, total, *filled in rows:
+        if source:
+            counts[f"source:{source}"] = total
+        for field, count in zip(COVERAGE_FIELDS, filled):
+            counts[f"coverage:{field}"] += count
+
+    counts['tags'] = 0
+    for category, total in db.execute(select(Tag.category, func.count()).group_by(Tag.category)):
+        counts['tags'] += total
+        if category:
+            counts[f"tag_category:{category}"] = total
+    return counts
+
+def rebuild_summary(db: Session) -> Dict[str, int]:
+    """Replace metadata_summary with fresh counts, e.g. to repair drift; the caller commits"""
+    counts = aggregate_counts(db)
+    db.execute(delete(MetadataSummary))
+    db.execute(insert(MetadataSummary), [{'name': name, 'value': value} for name, value in counts.items()])
+    return counts
+
+def format_stats(counts: Dict[str, int]) -> Dict[str, Any]:
+    """Shape counters into the /metadata/stats response"""
+    total_files = counts.get('files', 0)
+    stats = {
+        "total_files": total_files,
+        "coverage": {
+            field: round(counts.get(f"coverage:{field}", 0) / total_files * 100, 2) if total_files > 0 else 0
+            for field in COVERAGE_FIELDS
+        },
+        "sources": {},
+        "tags": {
+            "total": counts.get('tags', 0),
+            "by_category": {}
+        }
+    }
+    for name, value in sorted(counts.items()):
+        # Counters of sources or categories that no longer have rows stay behind at 0
+        if value <= 0:
+            continue
+        kind, _, key = name.partition(":")
+        if kind == "source":
+            stats["sources"][key] = value
+        elif kind == "tag_category":
+            stats["tags"]["by_category"][key] = value
+    return stats
@@ -0,0 +1,114 @@
+import base64
+import re
+from typing import List, Optional, Tuple
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from ...models.audio import Metadata
+
+# Text fields covered by the search index, in metadata_fts column order
+SEARCH_FIELDS = ('title', 'artist', 'album', 'genre', 'style', 'label')
+# bm25 column weights for SQLite; PostgreSQL weights the same fields via setweight() A-D
+FTS5_WEIGHTS = (10.0, 10.0, 5.0, 2.0, 2.0, 3.0)
+# Fields that have trigram indexes for fuzzy matching on PostgreSQL
+FUZZY_FIELDS = ('artist', 'title')
+
+class MetadataSearch:
+    """
+    Ranked full-text search over the metadata text fields.
+
+    PostgreSQL matches against the GIN-indexed metadata.search_vector column and,
+    when nothing matches, falls back to trigram similarity on artist and title so
+    that misspelled names still find something. SQLite uses the metadata_fts FTS5
+    table. Both are kept current by the database (a generated column, and
+    triggers), so every write path updates the index. The last query term is
+    matched as a prefix for typeahead, and pages are chained with an opaque
+    (rank, id) cursor rather than OFFSET.
+    """
+
+    def search(self, db: Session, query: str, field: Optional[str] = None, limit: int = 10,
+               cursor: Optional[str] = None) -> Tuple[List[Metadata], Optional[str]]:
+        """Return up to `limit` rows, best match first, and the cursor of the next page (None on the last)"""
+        if field is not None and field not in SEARCH_FIELDS:
+            raise SearchQueryError(f"Invalid field: {field}")
+        terms = tokenize(query)
+        if not terms:
+            return [], None
+        after = decode_cursor(cursor) if cursor else None
+
+        if db.get_bind().dialect.name == "postgresql":
+            ranked = self._search_postgres(db, terms, field, limit + 1, after)
+            if not ranked and (field is None or field in FUZZY_FIELDS):
+                ranked = self._search_trigram(db, " ".join(terms), field, limit + 1, after)
+        else:
+            ranked = self._search_sqlite(db, terms, field, limit + 1, after)
+
+        next_cursor = None
+        if len(ranked) > limit:
+            ranked = ranked[:limit]
+            last_id, last_rank = ranked[-1]
+            next_cursor = encode_cursor(last_rank, last_id)
+        rows = {row.id: row for row in db.query(Metadata).filter(Metadata.id.in_([id for id, _ in ranked]))}
+        return [rows[id] for id, _ in ranked if id in rows], next_cursor
+
+    def _search_postgres(self, db: Session, terms: List[str], field: Optional[str], limit: int, after):
+        # Quoted lexemes, AND-ed, with the last one as a prefix
+        tsquery = " & ".join(f"'{term}'" for term in terms) + ":*"
+        field_clause = f"AND to_tsvector('simple', coalesce(m.{field}, '')) @@ q" if field else ""
+        return self._ranked(db, f"""
+            SELECT m.id AS id, ts_rank_cd(m.search_vector, q)::float8 AS rank
+            FROM metadata m, to_tsquery('simple', :tsquery) q
+            WHERE m.search_vector @@ q {field_clause}
+        """, {'tsquery': tsquery}, limit, after)
+
+    def _search_trigram(self, db: Session, query: str, field: Optional[str], limit: int, after):
+        fields = [field] if field else list(FUZZY_FIELDS)
+        similarity = ", ".join(f"similarity(coalesce(m.{name}, ''), :query)" for name in fields)
+        matches = " OR ".join(f"m.{name} % :query" for name in fields)
+        return self._ranked(db, f"""
+            SELECT m.id AS id, greatest({similarity})::float8 AS rank
+            FROM metadata m
+            WHERE {matches}
+        """, {'query': query}, limit, after)
+
+    def _search_sqlite(self, db: Session, terms: List[str], field: Optional[str], limit: int, after):
+        match = " ".join(f'"{term}"' for term in terms) + "*"
+        if field:
+            match = f"{field} : ({match})"
+        weights = ", ".join(str(weight) for weight in FTS5_WEIGHTS)
+        # bm25() is lower-is-better; negate it so both backends sort by rank descending
+        return self._ranked(db, f"""
+            SELECT rowid AS id, -bm25(metadata_fts, {weights}) AS rank
+            FROM metadata_fts
+            WHERE metadata_fts MATCH :match
+        """, {'match': match}, limit, after)
+
+    def _ranked(self, db: Session, candidates: str, params: dict, limit: int, after) -> List[Tuple[int, float]]:
+        """Order a (id, rank) subquery by rank, then id, starting after the cursor position"""
+        cursor_clause = ""
+        if after is not None:
+            cursor_clause = "WHERE rank < :after_rank OR (rank = :after_rank AND id > :after_id)"
+            params = {**params, 'after_rank': after[0], 'after_id': after[1]}
+        rows = db.execute(text(f"""
+            SELECT id, rank FROM ({candidates}) ranked
+            {cursor_clause}
+            ORDER BY rank DESC, id
+            LIMIT :limit
+        """), {**params, 'limit': limit}).all()
+        return [(row.id, float(row.rank)) for row in rows]
+
+def tokenize(query: str) -> List[str]:
+    """Words of a search query; punctuation and query syntax are dropped"""
+    return re.findall(r"\w+", (query or "").lower())
+
+def encode_cursor(rank: float, id: int) -> str:
+    return base64.urlsafe_b64encode(f"{rank!r}:{id}".encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> Tuple[float, int]:
+    try:
+        rank, id = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode().split(":")
+        return float(rank), int(id)
+    except (ValueError, UnicodeDecodeError):
+        raise SearchQueryError("Invalid cursor")
+
+class SearchQueryError(Exception):
+    pass
@@ -0,0 +1,379 @@
+import numpy as np
+import threading
+from typing import Dict, Any, List, Optional, Tuple
+from ..audio.fingerprint import ITEM_SECONDS, FingerprintError, decode_fingerprint
+
+SAMPLE_BITS = 3       # Index about 1 in 2**SAMPLE_BITS sub-fingerprints
+MAX_POSTING = 64      # Hashes shared by more files than this (silence, clipping) are not used for matching
+MIN_VOTES = 4         # Sampled hashes two files must share at one alignment to be compared
+MIN_OVERLAP = 40      # Sub-fingerprints (~5 s) two files must overlap by to be scored
+MAX_SLOTS = 1 << 24   # Pair keys pack two slots and an offset into 64 bits
+MAX_OFFSET = 1 << 15
+MAX_DECODED = 20000   # Decoded fingerprints of candidate files kept for verification (~4 KB each)
+
+class DuplicateIndex:
+    """
+    Near-identical recordings found through their Chromaprint fingerprints.
+
+    Each file's fingerprint is decoded to raw sub-fingerprints, of which a sample
+    chosen by value (so every copy of a recording samples the same ones) goes
+    into an inverted index: one array of hashes sorted for binary search, with
+    the file slot and position of each. Two files become a candidate pair when
+    at least MIN_VOTES sampled hashes occur in both at the same time offset, and
+    a candidate is confirmed by the bit error rate of the full fingerprints
+    aligned at that offset. Pairs are only generated within a hash's posting
+    list, so the cost follows the number of shared hashes rather than N².
+    """
+
+    def __init__(self, max_bit_error_rate: float = 0.15):
+        self.max_bit_error_rate = max_bit_error_rate
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._last_feature_id = 0
+        self._reset()
+
+    def _reset(self):
+        self._positions: Dict[int, int] = {}
+        self._file_ids: List[int] = []
+        self._alive = np.zeros(1024, dtype=bool)
+        self._keys = np.zeros(0, dtype=np.uint32)
+        self._slots = np.zeros(0, dtype=np.int32)
+        self._offsets = np.zeros(0, dtype=np.int32)
+        self._pending: List[Tuple[np.ndarray, np.ndarray, np.ndarray]] = []
+        self._dead_entries = 0
+        self._decoded: Dict[int, np.ndarray] = {}
+        self.invalid_fingerprints = 0
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def __contains__(self, file_id: int) -> bool:
+        return file_id in self._positions
+
+    # Building
+
+    def _query_rows(self, db, after_id: int = 0):
+        from ...models.audio import AudioFeatures
+
+        return db.query(
+            AudioFeatures.id,
+            AudioFeatures.audio_file_id,
+            AudioFeatures.acoustid_fingerprint
+        ).filter(
+            AudioFeatures.id > after_id,
+            AudioFeatures.acoustid_fingerprint.isnot(None)
+        ).order_by(AudioFeatures.id)
+
+    def load(self, db) -> None:
+        """Build the index from every stored fingerprint"""
+        with self._lock:
+            self._reset()
+            self._last_feature_id = 0
+            self._load_rows(self._query_rows(db).yield_per(10000))
+            self._merge()
+            self._loaded = True
+
+    def sync(self, db) -> None:
+        """Pick up fingerprints written by other processes (e.g. bulk ingestion workers)"""
+        with self._lock:
+            self._load_rows(self._query_rows(db, after_id=self._last_feature_id))
+
+    def _load_rows(self, rows) -> None:
+        for feature_id, file_id, fingerprint in rows:
+            self._insert(file_id, fingerprint)
+            self._last_feature_id = max(self._last_feature_id, feature_id)
+
+    def ensure_loaded(self, db) -> None:
+        """Load the index on first use, then keep it in step with the database"""
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self.load(db)
+                    return
+        self.sync(db)
+
+    # Incremental updates
+
+    def add(self, file_id: int, fingerprint) -> None:
+        """Insert or replace the fingerprint of a single file"""
+        with self._lock:
+            self._insert(file_id, fingerprint)
+
+    def remove(self, file_id: int) -> None:
+        """Remove a file; its entries are dropped on the next compaction"""
+        with self._lock:
+            self._decoded.pop(file_id, None)
+            slot = self._positions.pop(file_id, None)
+            if slot is None:
+                return
+            self._alive[slot] = False
+            self._dead_entries += int(np.count_nonzero(self._slots == slot))
+            self._dead_entries += sum(int(np.count_nonzero(slots == slot)) for _, slots, _ in self._pending)
+
+    def _insert(self, file_id: int, fingerprint) -> None:
+        """Decode, sample and stage one fingerprint; caller must hold the lock"""
+        try:
+            values, _ = decode_fingerprint(fingerprint)
+        except FingerprintError:
+            self.invalid_fingerprints += 1
+            return
+        self.remove(file_id)
+        if len(self._file_ids) >= MAX_SLOTS:
+            raise DuplicateIndexError(f"Duplicate index is limited to {MAX_SLOTS} files")
+
+        slot = len(self._file_ids)
+        self._file_ids.append(file_id)
+        if slot >= len(self._alive):
+            self._alive = np.concatenate([self._alive, np.zeros(len(self._alive), dtype=bool)])
+        self._alive[slot] = True
+        self._positions[file_id] = slot
+
+        keys, offsets = sample_hashes(values)
+        self._pending.append((keys, np.full(len(keys), slot, dtype=np.int32), offsets))
+
+    def _merge(self) -> None:
+        """Fold pending entries into the sorted arrays, dropping removed files when many have piled up"""
+        if self._pending:
+            keys = np.concatenate([keys for keys, _, _ in self._pending])
+            slots = np.concatenate([slots for _, slots, _ in self._pending])
+            offsets = np.concatenate([offsets for _, _, offsets in self._pending])
+            order = np.argsort(keys, kind='stable')
+            keys, slots, offsets = keys[order], slots[order], offsets[order]
+            at = np.searchsorted(self._keys, keys, side='right')
+            self._keys = np.insert(self._keys, at, keys)
+            self._slots = np.insert(self._slots, at, slots)
+            self._offsets = np.insert(self._offsets, at, offsets)
+            self._pending = []
+
+        if self._dead_entries > len(self._keys) // 10:
+            live = self._alive[self._slots]
+            self._keys, self._slots, self._offsets = self._keys[live], self._slots[live], self._offsets[live]
+            self._dead_entries = 0
+
+    # Queries
+
+    def candidates(self, file_id: Optional[int] = None) -> List[Tuple[int, int, int, int]]:
+        """
+        (file_id_a, file_id_b, offset, votes) for file pairs sharing at least MIN_VOTES
+        sampled hashes at one alignment, where b's sub-fingerprint i + offset lines
+        up with a's i. Every indexed pair, or only pairs involving file_id.
+        """
+        with self._lock:
+            self._merge()
+            if file_id is None:
+                a, b, offsets = self._all_pairs()
+            else:
+                slot = self._positions.get(file_id)
+                if slot is None:
+                    return []
+                a, b, offsets = self._pairs_with(slot)
+
+            live = self._alive[a] & self._alive[b] & (a != b)
+            a, b, offsets = a[live], b[live], offsets[live]
+            # Orient every pair as (lower slot, higher slot)
+            swap = a > b
+            a, b = np.where(swap, b, a), np.where(swap, a, b)
+            offsets = np.where(swap, -offsets, offsets)
+            return [
+                (self._file_ids[slot_a], self._file_ids[slot_b], offset, votes)
+                for slot_a, slot_b, offset, votes in _count_votes(a, b, offsets)
+            ]
+
+    def _all_pairs(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Every (slot, slot, offset) pair sharing a hash, from posting lists of at most MAX_POSTING"""
+        keys = self._keys
+        if len(keys) < 2:
+            return (np.zeros(0, dtype=np.int64),) * 3
+        starts = np.flatnonzero(np.concatenate([[True], keys[1:] != keys[:-1]]))
+        sizes = np.diff(np.append(starts, len(keys)))
+        usable = np.repeat((sizes >= 2) & (sizes <= MAX_POSTING), sizes)
+        keys, slots, offsets = keys[usable], self._slots[usable].astype(np.int64), self._offsets[usable]
+
+        parts_a, parts_b, parts_offset = [], [], []
+        for distance in range(1, min(MAX_POSTING, len(keys))):
+            # Sorted by key, so entries `distance` apart with equal keys share a posting list
+            same = np.flatnonzero(keys[:-distance] == keys[distance:])
+            if len(same) == 0:
+                break
+            parts_a.append(slots[same])
+            parts_b.append(slots[same + distance])
+            parts_offset.append(offsets[same + distance] - offsets[same])
+        if not parts_a:
+            return (np.zeros(0, dtype=np.int64),) * 3
+        return np.concatenate(parts_a), np.concatenate(parts_b), np.concatenate(parts_offset).astype(np.int64)
+
+    def _pairs_with(self, slot: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(slot, other slot, offset) for every hash of one file"""
+        mine = np.flatnonzero(self._slots == slot)
+        lo = np.searchsorted(self._keys, self._keys[mine], side='left')
+        hi = np.searchsorted(self._keys, self._keys[mine], side='right')
+        usable = (hi - lo) <= MAX_POSTING
+        mine, lo, hi = mine[usable], lo[usable], hi[usable]
+        counts = hi - lo
+        # Positions lo..hi-1 of each posting list, flattened
+        entries = np.repeat(lo - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+        own = np.repeat(mine, counts)
+        return (
+            np.full(len(entries), slot, dtype=np.int64),
+            self._slots[entries].astype(np.int64),
+            (self._offsets[entries] - self._offsets[own]).astype(np.int64)
+        )
+
+    def duplicates(self, db, file_id: Optional[int] = None,
+                   max_bit_error_rate: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Clusters of near-identical recordings: every confirmed pair (bit error rate
+        at most max_bit_error_rate) joins its two files into one cluster.
+        """
+        max_bit_error_rate = self.max_bit_error_rate if max_bit_error_rate is None else max_bit_error_rate
+        candidates = self.candidates(file_id)
+        if not candidates:
+            return []
+
+        fingerprints = self._fingerprints(db, {f for a, b, _, _ in candidates for f in (a, b)})
+        pairs = []
+        for a, b, offset, votes in candidates:
+            if a not in fingerprints or b not in fingerprints:
+                continue
+            scored = best_alignment(fingerprints[a], fingerprints[b], offset)
+            if scored is not None and scored[1] <= max_bit_error_rate:
+                pairs.append({
+                    'file_ids': [a, b],
+                    'bit_error_rate': round(scored[1], 4),
+                    'offset_seconds': round(scored[0] * ITEM_SECONDS, 2)
+                })
+
+        return _cluster(pairs)
+
+    def _fingerprints(self, db, file_ids) -> Dict[int, np.ndarray]:
+        """Decoded fingerprints of candidate files, from the cache or the database"""
+        with self._lock:
+            cached = {f: self._decoded[f] for f in file_ids if f in self._decoded}
+            slots = {f: self._positions.get(f) for f in file_ids if f not in cached}
+        loaded = _load_fingerprints(db, list(slots))
+        with self._lock:
+            if len(self._decoded) + len(loaded) > MAX_DECODED:
+                self._decoded.clear()
+            # Skip files replaced or removed while loading
+            self._decoded.update({
+                f: values for f, values in loaded.items() if self._positions.get(f, -1) == slots[f]
+            })
+        return {**cached, **loaded}
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'files': len(self._positions),
+                'entries': len(self._keys) + sum(len(keys) for keys, _, _ in self._pending),
+                'pending_files': len(self._pending),
+                'decoded_cached': len(self._decoded),
+                'invalid_fingerprints': self.invalid_fingerprints,
+                'memory_mb': round((self._keys.nbytes + self._slots.nbytes + self._offsets.nbytes) / 1e6, 1)
+            }
+
+def sample_hashes(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    The sub-fingerprints of a file that go into the index, with their positions.
+    Selection depends only on the value, so copies keep the values they share;
+    repeats within a file (e.g. silence) count once.
+    """
+    mixed = (values.astype(np.uint64) * np.uint64(0x9E3779B1)) & np.uint64(0xFFFFFFFF)
+    chosen = np.flatnonzero((mixed >> np.uint64(32 - SAMPLE_BITS)) == 0)
+    chosen = chosen[chosen < MAX_OFFSET]
+    keys, first = np.unique(values[chosen], return_index=True)
+    return keys.astype(np.uint32), chosen[first].astype(np.int32)
+
+def bit_error_rate(a: np.ndarray, b: np.ndarray, offset: int) -> Optional[float]:
+    """Fraction of differing bits where b[i + offset] lines up with a[i]; None if the overlap is too short"""
+    start, end = max(0, -offset), min(len(a), len(b) - offset)
+    if end - start < MIN_OVERLAP:
+        return None
+    diff = np.bitwise_xor(a[start:end], b[start + offset:end + offset])
+    return float(np.unpackbits(diff.view(np.uint8)).sum()) / (32 * (end - start))
+
+def best_alignment(a: np.ndarray, b: np.ndarray, offset: int) -> Optional[Tuple[int, float]]:
+    """(offset, bit error rate) at the best of offset and its neighbours, which absorb frame jitter"""
+    scored = [(o, bit_error_rate(a, b, o)) for o in (offset - 1, offset, offset + 1)]
+    scored = [(o, ber) for o, ber in scored if ber is not None]
+    return min(scored, key=lambda item: item[1]) if scored else None
+
+def _count_votes(a: np.ndarray, b: np.ndarray, offsets: np.ndarray) -> List[Tuple[int, int, int, int]]:
+    """Per slot pair, the best offset and its votes (neighbouring offsets included); MIN_VOTES or more only"""
+    if len(a) == 0:
+        return []
+    packed = (a.astype(np.uint64) << np.uint64(40)) | (b.astype(np.uint64) << np.uint64(16)) \
+        | (offsets + MAX_OFFSET).astype(np.uint64)
+    packed, counts = np.unique(packed, return_counts=True)
+    pair = packed >> np.uint64(16)
+    offset = (packed & np.uint64(0xFFFF)).astype(np.int64) - MAX_OFFSET
+
+    # Sorted by pair, then offset, so adjacent offsets of a pair are adjacent rows
+    votes = counts.copy()
+    adjacent = (pair[1:] == pair[:-1]) & (offset[1:] == offset[:-1] + 1)
+    votes[:-1] += np.where(adjacent, counts[1:], 0)
+    votes[1:] += np.where(adjacent, counts[:-1], 0)
+
+    strong = np.flatnonzero(votes >= MIN_VOTES)
+    best: Dict[int, Tuple[int, int]] = {}
+    for row in strong.tolist():
+        key = int(pair[row])
+        if key not in best or votes[row] > best[key][1]:
+            best[key] = (int(offset[row]), int(votes[row]))
+    return [
+        (key >> 24, key & (MAX_SLOTS - 1), offset, count)
+        for key, (offset, count) in best.items()
+    ]
+
+def _load_fingerprints(db, file_ids) -> Dict[int, np.ndarray]:
+    """Decoded fingerprints of the given files"""
+    from ...models.audio import AudioFeatures
+
+    file_ids = list(file_ids)
+    fingerprints = {}
+    for start in range(0, len(file_ids), 10000):
+        rows = db.query(AudioFeatures.audio_file_id, AudioFeatures.acoustid_fingerprint).filter(
+            AudioFeatures.audio_file_id.in_(file_ids[start:start + 10000]),
+            AudioFeatures.acoustid_fingerprint.isnot(None)
+        )
+        for file_id, fingerprint in rows:
+            try:
+                fingerprints[file_id] = decode_fingerprint(fingerprint)[0]
+            except FingerprintError:
+                pass
+    return fingerprints
+
+def _cluster(pairs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Group confirmed pairs into connected components, largest and closest first"""
+    parent: Dict[int, int] = {}
+
+    def find(x: int) -> int:
+        parent.setdefault(x, x)
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for pair in pairs:
+        a, b = pair['file_ids']
+        parent[find(a)] = find(b)
+
+    clusters: Dict[int, Dict[str, Any]] = {}
+    for pair in pairs:
+        cluster = clusters.setdefault(find(pair['file_ids'][0]), {'file_ids': set(), 'pairs': []})
+        cluster['file_ids'].update(pair['file_ids'])
+        cluster['pairs'].append(pair)
+
+    result = [
+        {'file_ids': sorted(cluster['file_ids']),
+         'pairs': sorted(cluster['pairs'], key=lambda pair: pair['bit_error_rate'])}
+        for cluster in clusters.values()
+    ]
+    result.sort(key=lambda cluster: (-len(cluster['file_ids']), cluster['pairs'][0]['bit_error_rate']))
+    return result
+
+class DuplicateIndexError(Exception):
+    pass
@@ -0,0 +1,393 @@
+import numpy as np
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+class EmbeddingIndex:
+    """
+    Approximate nearest-neighbour index over AudioFeatures.embedding.
+
+    Implements an inverted-file (IVF) index: embeddings are L2-normalized and
+    assigned to the nearest of `nlist` k-means centroids, and a query only scores
+    the vectors in its `nprobe` closest lists. Until enough vectors exist to train
+    the coarse quantizer, queries fall back to an exact scan. As the index grows
+    the quantizer is retrained with more lists, so list lengths stay near sqrt(n).
+    """
+
+    MIN_TRAIN_SIZE = 4096
+    TRAIN_SAMPLES_PER_LIST = 64
+    # Retrain once there are more than RETRAIN_FACTOR * nlist**2 vectors, i.e. once
+    # the lists average RETRAIN_FACTOR times the length they were trained for
+    RETRAIN_FACTOR = 4
+
+    def __init__(self, path: Optional[str] = None, nprobe: int = 8, save_every: int = 1000):
+        self.path = Path(path) if path else None
+        self.nprobe = nprobe
+        self.save_every = save_every
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._last_feature_id = 0
+        self._reset(dim=0)
+
+    def _reset(self, dim: int, capacity: int = 1024):
+        """Drop all vectors and the trained quantizer"""
+        self.dim = dim
+        self._size = 0
+        self._positions: Dict[int, int] = {}
+        self._ids = np.zeros(capacity, dtype=np.int64)
+        self._alive = np.zeros(capacity, dtype=bool)
+        self._vectors = np.zeros((capacity, max(dim, 1)), dtype=np.float32)
+        self._centroids: Optional[np.ndarray] = None
+        self._lists: List[np.ndarray] = []
+        self._assignments = np.full(capacity, -1, dtype=np.int32)
+        self._dirty = 0
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    @property
+    def trained(self) -> bool:
+        return self._centroids is not None
+
+    def __len__(self) -> int:
+        return len(self._positions)
+
+    def __contains__(self, file_id: int) -> bool:
+        return file_id in self._positions
+
+    # Building and persistence
+
+    def build(self, ids: List[int], vectors: np.ndarray, nlist: Optional[int] = None) -> None:
+        """Replace the index contents with the given embeddings and train the quantizer"""
+        vectors = _normalize(np.asarray(vectors, dtype=np.float32).reshape(len(ids), -1))
+        with self._lock:
+            self._reset(dim=vectors.shape[1], capacity=max(1024, len(ids)))
+            self._append(np.asarray(ids, dtype=np.int64), vectors)
+            if len(ids) >= self.MIN_TRAIN_SIZE:
+                self.train(nlist)
+
+    def train(self, nlist: Optional[int] = None, iterations: int = 10, seed: int = 0) -> None:
+        """Run spherical k-means over (a sample of) the live vectors and rebuild the inverted lists"""
+        with self._lock:
+            live = np.flatnonzero(self._alive[:self._size])
+            if len(live) == 0:
+                return
+            nlist = nlist or max(1, int(np.sqrt(len(live))))
+            nlist = min(nlist, len(live))
+
+            rng = np.random.default_rng(seed)
+            sample_size = min(len(live), nlist * self.TRAIN_SAMPLES_PER_LIST)
+            sample = self._vectors[rng.choice(live, sample_size, replace=False)]
+            self._centroids = _kmeans(sample, nlist, iterations, rng)
+
+            self._assignments[live] = _nearest(self._vectors[live], self._centroids)
+            self._rebuild_lists()
+
+    def _needs_training(self) -> bool:
+        """Whether the quantizer is missing or too coarse for the current size; caller must hold the lock"""
+        if not self.trained:
+            return len(self) >= self.MIN_TRAIN_SIZE
+        return len(self) > self.RETRAIN_FACTOR * len(self._centroids) ** 2
+
+    def _rebuild_lists(self):
+        """Group live positions by their centroid assignment"""
+        live = np.flatnonzero(self._alive[:self._size])
+        assignments = self._assignments[live]
+        order = np.argsort(assignments, kind='stable')
+        bounds = np.searchsorted(assignments[order], np.arange(len(self._centroids) + 1))
+        self._lists = [live[order[bounds[i]:bounds[i + 1]]] for i in range(len(self._centroids))]
+
+    def save(self, path: Optional[str] = None) -> None:
+        """Write the live vectors and quantizer to disk atomically"""
+        path = Path(path) if path else self.path
+        if path is None:
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        with self._lock:
+            live = np.flatnonzero(self._alive[:self._size])
+            # A unique temp file per save, so concurrent writers never share one
+            with tempfile.NamedTemporaryFile(dir=path.parent, suffix='.npz', delete=False) as f:
+                tmp_path = f.name
+                try:
+                    np.savez(
+                        f,
+                        ids=self._ids[live],
+                        vectors=self._vectors[live],
+                        assignments=self._assignments[live],
+                        centroids=self._centroids if self.trained else np.zeros((0, self.dim), dtype=np.float32)
+                    )
+                except BaseException:
+                    f.close()
+                    os.unlink(tmp_path)
+                    raise
+            os.replace(tmp_path, path)
+            self._dirty = 0
+
+    def load_file(self, path: Optional[str] = None) -> bool:
+        """Load a previously saved index; returns False if there is nothing to load"""
+        path = Path(path) if path else self.path
+        if path is None or not path.exists():
+            return False
+
+        with np.load(path) as data:
+            ids, vectors = data['ids'], data['vectors']
+            with self._lock:
+                self._reset(dim=vectors.shape[1], capacity=max(1024, len(ids)))
+                self._append(ids, vectors)
+                if len(data['centroids']):
+                    self._centroids = data['centroids']
+                    self._assignments[:len(ids)] = data['assignments']
+                    self._rebuild_lists()
+                if self._needs_training():
+                    self.train()
+                    self._mark_dirty()
+        return True
+
+    def _query_rows(self, db, after_id: int = 0):
+        """Project stored embeddings, optionally only for feature rows newer than after_id"""
+        from ...models.audio import AudioFeatures
+
+        return db.query(
+            AudioFeatures.id,
+            AudioFeatures.audio_file_id,
+            AudioFeatures.embedding
+        ).filter(
+            AudioFeatures.id > after_id,
+            AudioFeatures.embedding.isnot(None)
+        ).order_by(AudioFeatures.id)
+
+    def load(self, db) -> None:
+        """Warm-start from the index file, then reconcile it against the database"""
+        from sqlalchemy import func
+        from ...models.audio import AudioFeatures
+
+        with self._lock:
+            # Taken first, so rows written during the reconcile are picked up by the next sync()
+            self._last_feature_id = db.query(func.max(AudioFeatures.id)).scalar() or 0
+            if not self.load_file():
+                rows = self._query_rows(db).all()
+                if rows:
+                    self.build([row[1] for row in rows], np.array([row[2] for row in rows], dtype=np.float32))
+                    self.save()
+            else:
+                db_ids = {
+                    row[0] for row in db.query(AudioFeatures.audio_file_id).filter(
+                        AudioFeatures.embedding.isnot(None)
+                    )
+                }
+                for file_id in set(self._positions) - db_ids:
+                    self.remove(file_id)
+                missing = list(db_ids - set(self._positions))
+                for start in range(0, len(missing), 10000):
+                    batch = missing[start:start + 10000]
+                    rows = db.query(AudioFeatures.audio_file_id, AudioFeatures.embedding).filter(
+                        AudioFeatures.audio_file_id.in_(batch)
+                    ).all()
+                    for file_id, embedding in rows:
+                        self.add(file_id, embedding)
+                if self._dirty:
+                    self.save()
+            self._loaded = True
+
+    def sync(self, db) -> None:
+        """Pick up embeddings written by other processes (e.g. bulk ingestion workers)"""
+        with self._lock:
+            for feature_id, file_id, embedding in self._query_rows(db, after_id=self._last_feature_id):
+                self.add(file_id, embedding)
+                self._last_feature_id = max(self._last_feature_id, feature_id)
+
+    def ensure_loaded(self, db) -> None:
+        """Load the index on first use, then keep it in step with the database"""
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self.load(db)
+                    return
+        self.sync(db)
+
+    # Incremental updates
+
+    def _append(self, ids: np.ndarray, vectors: np.ndarray) -> np.ndarray:
+        """Append already-normalized vectors and return their positions; caller must hold the lock"""
+        needed = self._size + len(ids)
+        if needed > len(self._ids):
+            capacity = max(needed, 2 * len(self._ids))
+            self._ids = np.resize(self._ids, capacity)
+            self._alive = np.concatenate([self._alive[:self._size], np.zeros(capacity - self._size, dtype=bool)])
+            self._assignments = np.concatenate([
+                self._assignments[:self._size], np.full(capacity - self._size, -1, dtype=np.int32)
+            ])
+            grown = np.zeros((capacity, self.dim), dtype=np.float32)
+            grown[:self._size] = self._vectors[:self._size]
+            self._vectors = grown
+
+        positions = np.arange(self._size, needed)
+        self._ids[positions] = ids
+        self._vectors[positions] = vectors
+        self._alive[positions] = True
+        self._size = needed
+        for file_id, pos in zip(ids.tolist(), positions.tolist()):
+            self._positions[file_id] = pos
+        return positions
+
+    def add(self, file_id: int, embedding: List[float]) -> None:
+        """Insert or replace the embedding of a single file"""
+        vector = _normalize(np.asarray(embedding, dtype=np.float32).reshape(1, -1))
+        with self._lock:
+            if self.dim == 0:
+                self._reset(dim=vector.shape[1])
+            if vector.shape[1] != self.dim:
+                raise EmbeddingIndexError(
+                    f"Embedding dimension {vector.shape[1]} does not match index dimension {self.dim}"
+                )
+            self.remove(file_id)
+            pos = self._append(np.array([file_id], dtype=np.int64), vector)
+
+            if self._needs_training():
+                self.train()
+            elif self.trained:
+                cluster = int(_nearest(vector, self._centroids)[0])
+                self._assignments[pos] = cluster
+                self._lists[cluster] = np.append(self._lists[cluster], pos)
+
+            self._mark_dirty()
+
+    def remove(self, file_id: int) -> None:
+        """Remove a file from the index; its slot is reclaimed on the next save/load"""
+        with self._lock:
+            pos = self._positions.pop(file_id, None)
+            if pos is None:
+                return
+            self._alive[pos] = False
+            cluster = self._assignments[pos]
+            if self.trained and cluster >= 0:
+                self._lists[cluster] = self._lists[cluster][self._lists[cluster] != pos]
+            self._mark_dirty()
+
+    def _mark_dirty(self):
+        self._dirty += 1
+        if self._loaded and self.save_every and self._dirty >= self.save_every:
+            self.save()
+
+    # Queries
+
+    def search(self, embedding: List[float], limit: int = 10, exclude: Optional[int] = None,
+               nprobe: Optional[int] = None, exact: bool = False) -> List[Tuple[int, float]]:
+        """Return up to `limit` (file_id, cosine similarity) pairs, best first"""
+        query = _normalize(np.asarray(embedding, dtype=np.float32).reshape(1, -1))[0]
+        with self._lock:
+            if not self._positions or query.shape[0] != self.dim:
+                return []
+
+            if self.trained and not exact:
+                nprobe = min(nprobe or self.nprobe, len(self._centroids))
+                centroid_scores = self._centroids @ query
+                probe = np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]
+                candidates = np.concatenate([self._lists[i] for i in probe])
+            else:
+                candidates = np.flatnonzero(self._alive[:self._size])
+
+            if exclude is not None and exclude in self._positions:
+                candidates = candidates[candidates != self._positions[exclude]]
+            if len(candidates) == 0:
+                return []
+
+            scores = self._vectors[candidates] @ query
+            if len(candidates) > limit:
+                top = np.argpartition(-scores, limit - 1)[:limit]
+            else:
+                top = np.arange(len(candidates))
+            top = top[np.argsort(-scores[top], kind='stable')]
+
+            return [(int(self._ids[candidates[i]]), float(scores[i])) for i in top]
+
+    def vector(self, file_id: int) -> Optional[np.ndarray]:
+        """Return the stored (normalized) embedding of a file"""
+        pos = self._positions.get(file_id)
+        return None if pos is None else self._vectors[pos].copy()
+
+    def recall_report(self, k: int = 10, n_queries: int = 100, nprobe: Optional[int] = None,
+                      seed: int = 0) -> Dict[str, Any]:
+        """
+        Measure recall@k and latency of the approximate search against an exact scan,
+        using randomly chosen indexed vectors as queries.
+        """
+        with self._lock:
+            ids = list(self._positions)
+            if not ids:
+                return {'queries': 0}
+            rng = np.random.default_rng(seed)
+            query_ids = rng.choice(ids, min(n_queries, len(ids)), replace=False).tolist()
+
+            hits = 0
+            ann_times, exact_times = [], []
+            for file_id in query_ids:
+                query = self._vectors[self._positions[file_id]]
+
+                start = time.perf_counter()
+                approx = self.search(query, k, exclude=file_id, nprobe=nprobe)
+                ann_times.append(time.perf_counter() - start)
+
+                start = time.perf_counter()
+                exact = self.search(query, k, exclude=file_id, exact=True)
+                exact_times.append(time.perf_counter() - start)
+
+                hits += len({i for i, _ in approx} & {i for i, _ in exact})
+
+            return {
+                'size': len(ids),
+                'dim': self.dim,
+                'trained': self.trained,
+                'nlist': len(self._centroids) if self.trained else 0,
+                'nprobe': min(nprobe or self.nprobe, len(self._centroids)) if self.trained else 0,
+                'k': k,
+                'queries': len(query_ids),
+                'recall_at_k': hits / (k * len(query_ids)) if len(ids) > k else 1.0,
+                'ann_latency_ms': {
+                    'mean': float(np.mean(ann_times) * 1000),
+                    'p95': float(np.percentile(ann_times, 95) * 1000)
+                },
+                'exact_latency_ms': {
+                    'mean': float(np.mean(exact_times) * 1000),
+                    'p95': float(np.percentile(exact_times, 95) * 1000)
+                }
+            }
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    """L2-normalize rows, leaving zero vectors untouched"""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+def _nearest(vectors: np.ndarray, centroids: np.ndarray, chunk_size: int = 65536) -> np.ndarray:
+    """Assign each vector to its most similar centroid, in chunks to bound memory"""
+    assignments = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), chunk_size):
+        block = vectors[start:start + chunk_size]
+        assignments[start:start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return assignments
+
+def _kmeans(sample: np.ndarray, k: int, iterations: int, rng: np.random.Generator) -> np.ndarray:
+    """Spherical k-means: centroids are kept unit-length so assignment is a dot product"""
+    centroids = sample[rng.choice(len(sample), k, replace=False)].copy()
+    for _ in range(iterations):
+        assignments = _nearest(sample, centroids)
+        order = np.argsort(assignments, kind='stable')
+        counts = np.bincount(assignments, minlength=k)
+        sums = np.zeros_like(centroids)
+        nonempty = np.flatnonzero(counts)
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])[nonempty]
+        sums[nonempty] = np.add.reduceat(sample[order], starts, axis=0)
+        empty = counts == 0
+        if empty.any():
+            # Re-seed empty clusters from random sample points
+            sums[empty] = sample[rng.choice(len(sample), int(empty.sum()), replace=False)]
+        centroids = _normalize(sums)
+    return centroids
+
+class EmbeddingIndexError(Exception):
+    pass
@@ -0,0 +1,225 @@
+import numpy as np
+import threading
+from typing import Dict, Any, List, Tuple
+
+# Weights of the feature groups in the combined similarity score
+SIMILARITY_WEIGHTS = {
+    'tempo': 0.2,
+    'spectral': 0.3,
+    'mfcc': 0.4,
+    'key': 0.1
+}
+MAX_TEMPO_DIFF = 20
+MAX_SPECTRAL_DIFFS = np.array([5000, 5000, 2000], dtype=np.float32)  # centroid, rolloff, bandwidth
+MAX_KEY_DIFF = 6
+KEY_INDEX = {'C': 0, 'C#': 1, 'D': 2, 'D#': 3, 'E': 4, 'F': 5,
+             'F#': 6, 'G': 7, 'G#': 8, 'A': 9, 'A#': 10, 'B': 11}
+
+class FeatureIndex:
+    """
+    Process-resident index of the scalar and MFCC features used by /audio/similar.
+
+    Features are packed into contiguous NumPy arrays so that a query scores every
+    candidate in one vectorized pass instead of hydrating ORM rows one by one.
+    """
+
+    def __init__(self, n_mfcc: int = 13, initial_capacity: int = 1024):
+        self.n_mfcc = n_mfcc
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._last_feature_id = 0
+        self._allocate(initial_capacity)
+
+    def _allocate(self, capacity: int):
+        """Allocate empty storage for the given number of rows"""
+        self._size = 0
+        self._positions: Dict[int, int] = {}
+        self._ids = np.zeros(capacity, dtype=np.int64)
+        self._tempo = np.zeros(capacity, dtype=np.float32)
+        self._tempo_conf = np.zeros(capacity, dtype=np.float32)
+        self._key = np.full(capacity, -1, dtype=np.int8)
+        self._key_conf = np.zeros(capacity, dtype=np.float32)
+        self._spectral = np.zeros((capacity, 3), dtype=np.float32)
+        self._mfcc = np.zeros((capacity, self.n_mfcc), dtype=np.float32)
+
+    def _grow(self, min_capacity: int):
+        """Grow storage geometrically so that appends stay amortized O(1)"""
+        capacity = max(min_capacity, 2 * len(self._ids))
+        for name in ('_ids', '_tempo', '_tempo_conf', '_key', '_key_conf', '_spectral', '_mfcc'):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            if name == '_key':
+                new.fill(-1)
+            new[:self._size] = old[:self._size]
+            setattr(self, name, new)
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, file_id: int) -> bool:
+        return file_id in self._positions
+
+    def _query_rows(self, db, after_id: int = 0):
+        """Project the indexed feature columns, optionally only for rows newer than after_id"""
+        from ...models.audio import AudioFeatures
+
+        return db.query(
+            AudioFeatures.id,
+            AudioFeatures.audio_file_id,
+            AudioFeatures.tempo,
+            AudioFeatures.tempo_confidence,
+            AudioFeatures.key,
+            AudioFeatures.key_confidence,
+            AudioFeatures.spectral_centroid,
+            AudioFeatures.spectral_rolloff,
+            AudioFeatures.spectral_bandwidth,
+            AudioFeatures.mfcc_mean
+        ).filter(AudioFeatures.id > after_id).order_by(AudioFeatures.id)
+
+    def load(self, db) -> None:
+        """Build the index from the database using a column projection (no ORM hydration)"""
+        from ...models.audio import AudioFeatures
+
+        with self._lock:
+            self._allocate(max(1024, db.query(AudioFeatures).count()))
+            self._last_feature_id = 0
+            self._load_rows(self._query_rows(db).yield_per(10000))
+            self._loaded = True
+
+    def sync(self, db) -> None:
+        """Pick up feature rows written by other processes (e.g. bulk ingestion workers)"""
+        with self._lock:
+            self._load_rows(self._query_rows(db, after_id=self._last_feature_id))
+
+    def _load_rows(self, rows) -> None:
+        for row in rows:
+            self._insert(row[1], row[2:])
+            self._last_feature_id = max(self._last_feature_id, row[0])
+
+    def ensure_loaded(self, db) -> None:
+        """Load the index on first use, then keep it in step with the database"""
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self.load(db)
+                    return
+        self.sync(db)
+
+    def add(self, file_id: int, features) -> None:
+        """Insert or replace the features of a single file (an AudioFeatures row)"""
+        with self._lock:
+            self._insert(file_id, (
+                features.tempo,
+                features.tempo_confidence,
+                features.key,
+                features.key_confidence,
+                features.spectral_centroid,
+                features.spectral_rolloff,
+                features.spectral_bandwidth,
+                features.mfcc_mean
+            ))
+
+    def remove(self, file_id: int) -> None:
+        """Remove a file from the index by moving the last row into its slot"""
+        with self._lock:
+            pos = self._positions.pop(file_id, None)
+            if pos is None:
+                return
+            last = self._size - 1
+            if pos != last:
+                for name in ('_ids', '_tempo', '_tempo_conf', '_key', '_key_conf', '_spectral', '_mfcc'):
+                    arr = getattr(self, name)
+                    arr[pos] = arr[last]
+                self._positions[int(self._ids[pos])] = pos
+            self._size = last
+
+    def _insert(self, file_id: int, values: Tuple) -> None:
+        """Write one row of feature values; caller must hold the lock"""
+        tempo, tempo_conf, key, key_conf, centroid, rolloff, bandwidth, mfcc_mean = values
+
+        pos = self._positions.get(file_id)
+        if pos is None:
+            if self._size == len(self._ids):
+                self._grow(self._size + 1)
+            pos = self._size
+            self._size += 1
+            self._positions[file_id] = pos
+
+        self._ids[pos] = file_id
+        self._tempo[pos] = tempo or 0.0
+        self._tempo_conf[pos] = tempo_conf or 0.0
+        self._key[pos] = _parse_key(key)
+        self._key_conf[pos] = key_conf or 0.0
+        self._spectral[pos] = (centroid or 0.0, rolloff or 0.0, bandwidth or 0.0)
+
+        mfcc = np.zeros(self.n_mfcc, dtype=np.float32)
+        if mfcc_mean is not None and len(mfcc_mean):
+            coeffs = np.asarray(mfcc_mean, dtype=np.float32)[:self.n_mfcc]
+            mfcc[:len(coeffs)] = coeffs
+        # Store unit vectors so cosine similarity is a single matrix-vector product
+        norm = np.linalg.norm(mfcc)
+        self._mfcc[pos] = mfcc / norm if norm > 0 else mfcc
+
+    def _component_scores(self, pos: int) -> Dict[str, np.ndarray]:
+        """Compute per-feature similarity of row `pos` against every indexed row"""
+        sel = slice(0, self._size)
+
+        tempo_diff = np.abs(self._tempo[sel] - self._tempo[pos])
+        tempo = np.maximum(0, 1 - tempo_diff / MAX_TEMPO_DIFF) * ((self._tempo_conf[sel] + self._tempo_conf[pos]) / 2)
+
+        spectral_diff = np.abs(self._spectral[sel] - self._spectral[pos])
+        spectral = np.maximum(0, 1 - spectral_diff / MAX_SPECTRAL_DIFFS).mean(axis=1)
+
+        mfcc = self._mfcc[sel] @ self._mfcc[pos]
+
+        key_src = int(self._key[pos])
+        key_cand = self._key[sel].astype(np.int16)
+        key_diff = np.minimum((key_cand - key_src) % 12, (key_src - key_cand) % 12)
+        key = (1 - key_diff / MAX_KEY_DIFF) * ((self._key_conf[sel] + self._key_conf[pos]) / 2)
+        # Unknown keys contribute nothing rather than failing the whole query
+        key = np.where((key_cand < 0) | (key_src < 0), 0.0, key)
+
+        return {'tempo': tempo, 'spectral': spectral, 'mfcc': mfcc, 'key': key}
+
+    def search(self, file_id: int, limit: int = 10,
+               threshold: float = 0.0) -> List[Tuple[int, float, Dict[str, float]]]:
+        """
+        Return up to `limit` (file_id, score, matching_features) tuples most similar to `file_id`,
+        ordered by descending score and filtered by `threshold`.
+        """
+        with self._lock:
+            pos = self._positions.get(file_id)
+            if pos is None or self._size < 2:
+                return []
+
+            components = self._component_scores(pos)
+            scores = sum(components[name] * weight for name, weight in SIMILARITY_WEIGHTS.items())
+            scores[pos] = -np.inf
+
+            candidates = np.flatnonzero(scores >= threshold)
+            if len(candidates) > limit:
+                top = np.argpartition(-scores[candidates], limit - 1)[:limit]
+                candidates = candidates[top]
+            candidates = candidates[np.argsort(-scores[candidates], kind='stable')]
+
+            return [
+                (
+                    int(self._ids[i]),
+                    float(scores[i]),
+                    {name: float(values[i]) for name, values in components.items()}
+                )
+                for i in candidates
+            ]
+
+def _parse_key(key: Any) -> int:
+    """Map a stored key such as 'A minor' to its pitch class, or -1 if unknown"""
+    parts = str(key).split() if key is not None else []
+    if not parts:
+        return -1
+    if parts[0].isdigit():
+        return int(parts[0]) % 12
+    return KEY_INDEX.get(parts[0], -1)
@@ -0,0 +1,116 @@
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+
+class QueryStats:
+    """SQL statements executed, and time spent in them, within one request or block"""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+
+_current: ContextVar[Optional[QueryStats]] = ContextVar("query_stats", default=None)
+
+def track_queries(engine: Engine) -> None:
+    """Count every statement the engine executes towards the active QueryStats, if any"""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_start"].pop()
+        stats = _current.get()
+        if stats is not None:
+            stats.count += 1
+            stats.seconds += time.perf_counter() - started
+
+@contextmanager
+def count_queries() -> Iterator[QueryStats]:
+    """
+    Collect the queries run inside the block, including in threads started from it
+    with a copied context (FastAPI's threadpool does this for sync dependencies).
+    """
+    stats = QueryStats()
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+class RouteQueryStats:
+    """Per-route totals of the queries counted by QueryCountMiddleware"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes: Dict[str, Dict[str, Any]] = {}
+
+    def record(self, route: str, stats: QueryStats, elapsed: float) -> None:
+        with self._lock:
+            entry = self._routes.setdefault(route, {
+                'requests': 0, 'queries': 0, 'max_queries': 0, 'query_seconds': 0.0, 'request_seconds': 0.0
+            })
+            entry['requests'] += 1
+            entry['queries'] += stats.count
+            entry['max_queries'] = max(entry['max_queries'], stats.count)
+            entry['query_seconds'] += stats.seconds
+            entry['request_seconds'] += elapsed
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {
+                route: {
+                    'requests': entry['requests'],
+                    'mean_queries': round(entry['queries'] / entry['requests'], 2),
+                    'max_queries': entry['max_queries'],
+                    'mean_query_ms': round(1000 * entry['query_seconds'] / entry['requests'], 3),
+                    'mean_request_ms': round(1000 * entry['request_seconds'] / entry['requests'], 3)
+                }
+                for route, entry in sorted(self._routes.items())
+            }
+
+route_query_stats = RouteQueryStats()
+
+class QueryCountMiddleware:
+    """
+    ASGI middleware that counts the SQL queries of each request.
+
+    The count and time so far are sent as X-Query-Count / X-Query-Time-Ms response
+    headers, totals are kept per route in route_query_stats, and requests that run
+    more than warn_threshold queries (an N+1 pattern, usually) are logged.
+    """
+
+    def __init__(self, app, warn_threshold: int = 25):
+        self.app = app
+        self.warn_threshold = warn_threshold
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_counts(message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers["X-Query-Count"] = str(stats.count)
+                headers["X-Query-Time-Ms"] = f"{1000 * stats.seconds:.2f}"
+            await send(message)
+
+        start = time.perf_counter()
+        with count_queries() as stats:
+            try:
+                await self.app(scope, receive, send_with_counts)
+            finally:
+                elapsed = time.perf_counter() - start
+                # The route template (e.g. /files/{file_id}) keeps one entry per endpoint
+                route = getattr(scope.get("route"), "path", None) or scope["path"]
+                route_query_stats.record(f"{scope['method']} {route}", stats, elapsed)
+                if stats.count > self.warn_threshold:
+                    print(f"Warning: {scope['method']} {scope['path']} ran {stats.count} SQL queries "
+                          f"({1000 * stats.seconds:.1f} ms)")
@@ -0,0 +1,60 @@
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from ..config import settings
+from .instrumentation import track_queries
+
+def get_database_url(use_async: bool = False) -> str:
+    """Build the SQLAlchemy URL for the configured database (asyncpg/aiosqlite drivers if use_async)"""
+    if settings.DB_TYPE == "sqlite":
+        driver = "sqlite+aiosqlite" if use_async else "sqlite"
+        return f"{driver}:///{settings.DB_NAME}.db"
+    driver = "postgresql+asyncpg" if use_async else "postgresql"
+    return (
+        f"{driver}://{settings.DB_USER}:{settings.DB_PASSWORD}"
+        f"@{settings.DB_HOST}:{settings.DB_PORT}/{settings.DB_NAME}"
+    )
+
+def _pool_options() -> dict:
+    return {
+        'pool_size': settings.DB_POOL_SIZE,
+        'max_overflow': settings.DB_MAX_OVERFLOW,
+        'pool_timeout': settings.DB_POOL_TIMEOUT,
+        'pool_recycle': settings.DB_POOL_RECYCLE,
+        'pool_pre_ping': settings.DB_POOL_PRE_PING
+    }
+
+# Synchronous engine for Celery tasks, migrations and the jobs endpoints
+engine = create_engine(
+    get_database_url(),
+    connect_args={"check_same_thread": False} if settings.DB_TYPE == "sqlite" else {},
+    **_pool_options()
+)
+track_queries(engine)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+# Async engine for the audio and metadata endpoints, so queries do not block the event loop
+async_engine = create_async_engine(
+    get_database_url(use_async=True),
+    # aiosqlite defaults to NullPool, which would start a connection thread per request
+    **({'poolclass': AsyncAdaptedQueuePool} if settings.DB_TYPE == "sqlite" else {}),
+    **_pool_options()
+)
+track_queries(async_engine.sync_engine)
+# Objects stay loaded after commit: an expired attribute would need IO to refresh, which
+# an AsyncSession cannot do implicitly
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+def get_db():
+    """FastAPI dependency that yields a session and closes it afterwards"""
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_db():
+    """FastAPI dependency that yields an AsyncSession and closes it afterwards"""
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -1,7 +1,10 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import Response
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
 from config import settings
 from api.v1.router import api_router
+from db.instrumentation import QueryCountMiddleware, route_query_stats
 
 app = FastAPI(
     title=settings.APP_NAME,
@@ -18,9 +21,22 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Count SQL queries per request (X-Query-Count / X-Query-Time-Ms headers)
+app.add_middleware(QueryCountMiddleware, warn_threshold=settings.QUERY_COUNT_WARN_THRESHOLD)
+
 # Include API router
 app.include_router(api_router, prefix=settings.API_PREFIX)
 
 @app.get("/")
 async def root():
     return {"message": "Welcome to AMMMS API"}
+
+@app.get("/query-stats")
+async def query_stats():
+    """Per-route SQL query counts and time since startup"""
+    return route_query_stats.stats()
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics: analysis time, CPU and memory per stage, decodes and failures"""
+    return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
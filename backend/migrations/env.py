@@ -0,0 +1,58 @@
+from logging.config import fileConfig
+from alembic import context
+from sqlalchemy import engine_from_config, pool
+from backend.db.session import get_database_url
+from backend.models.base import Base
+import backend.models.audio  # noqa: F401 (registers tables on Base.metadata)
+import backend.models.jobs  # noqa: F401
+
+config = context.config
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+config.set_main_option("sqlalchemy.url", get_database_url())
+target_metadata = Base.metadata
+
+# Full-text search objects created with raw SQL in 0004_metadata_search_index, not by the models
+SEARCH_INDEX_OBJECTS = {"search_vector", "ix_metadata_search_vector", "ix_metadata_artist_trgm", "ix_metadata_title_trgm"}
+
+def include_object(object, name, type_, reflected, compare_to) -> bool:
+    """Keep autogenerate/check from proposing to drop the search index"""
+    if reflected and compare_to is None and name:
+        return name not in SEARCH_INDEX_OBJECTS and not name.startswith("metadata_fts")
+    return True
+
+def run_migrations_offline() -> None:
+    """Emit SQL to stdout instead of connecting (alembic upgrade --sql)"""
+    context.configure(
+        url=config.get_main_option("sqlalchemy.url"),
+        target_metadata=target_metadata,
+        literal_binds=True,
+        dialect_opts={"paramstyle": "named"},
+        render_as_batch=True,
+        include_object=include_object
+    )
+    with context.begin_transaction():
+        context.run_migrations()
+
+def run_migrations_online() -> None:
+    connectable = engine_from_config(
+        config.get_section(config.config_ini_section, {}),
+        prefix="sqlalchemy.",
+        poolclass=pool.NullPool
+    )
+    with connectable.connect() as connection:
+        # Batch mode lets ALTER-heavy migrations run on SQLite by recreating tables
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            render_as_batch=True,
+            include_object=include_object
+        )
+        with context.begin_transaction():
+            context.run_migrations()
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
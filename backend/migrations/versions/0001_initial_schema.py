@@ -0,0 +1,125 @@
+"""Initial schema
+
+Tables as they existed before migrations were introduced. Databases created
+before then already have them: run `alembic stamp 0001_initial_schema` once.
+
+Revision ID: 0001_initial_schema
+Revises:
+Create Date: 2024-03-01 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0001_initial_schema"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_table(
+        "audio_files",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("path", sa.String()),
+        sa.Column("filename", sa.String()),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("updated_at", sa.DateTime()),
+        sa.Column("duration", sa.Float()),
+        sa.Column("sample_rate", sa.Integer()),
+        sa.Column("channels", sa.Integer()),
+        sa.Column("bit_depth", sa.Integer()),
+        sa.Column("format", sa.String())
+    )
+    op.create_index("ix_audio_files_id", "audio_files", ["id"])
+    op.create_index("ix_audio_files_path", "audio_files", ["path"], unique=True)
+
+    op.create_table(
+        "audio_features",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("audio_file_id", sa.Integer(), sa.ForeignKey("audio_files.id")),
+        sa.Column("tempo", sa.Float()),
+        sa.Column("tempo_confidence", sa.Float()),
+        sa.Column("beat_positions", sa.JSON()),
+        sa.Column("spectral_centroid", sa.Float()),
+        sa.Column("spectral_rolloff", sa.Float()),
+        sa.Column("spectral_bandwidth", sa.Float()),
+        sa.Column("mfcc_mean", sa.JSON()),
+        sa.Column("mfcc_var", sa.JSON()),
+        sa.Column("key", sa.String()),
+        sa.Column("key_confidence", sa.Float()),
+        sa.Column("acoustid_fingerprint", sa.String()),
+        sa.Column("embedding", sa.JSON())
+    )
+    op.create_index("ix_audio_features_id", "audio_features", ["id"])
+
+    op.create_table(
+        "metadata",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("audio_file_id", sa.Integer(), sa.ForeignKey("audio_files.id")),
+        sa.Column("title", sa.String()),
+        sa.Column("artist", sa.String()),
+        sa.Column("album", sa.String()),
+        sa.Column("year", sa.Integer()),
+        sa.Column("genre", sa.String()),
+        sa.Column("style", sa.String()),
+        sa.Column("label", sa.String()),
+        sa.Column("musicbrainz_id", sa.String()),
+        sa.Column("discogs_id", sa.String()),
+        sa.Column("beatport_id", sa.String()),
+        sa.Column("bpm", sa.Float()),
+        sa.Column("key", sa.String()),
+        sa.Column("energy", sa.Float()),
+        sa.Column("mood", sa.String()),
+        sa.Column("primary_source", sa.String()),
+        sa.Column("last_updated", sa.DateTime())
+    )
+    op.create_index("ix_metadata_id", "metadata", ["id"])
+
+    op.create_table(
+        "tags",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("name", sa.String()),
+        sa.Column("category", sa.String())
+    )
+    op.create_index("ix_tags_id", "tags", ["id"])
+    op.create_index("ix_tags_name", "tags", ["name"], unique=True)
+
+    op.create_table(
+        "audio_tags",
+        sa.Column("audio_file_id", sa.Integer(), sa.ForeignKey("audio_files.id")),
+        sa.Column("tag_id", sa.Integer(), sa.ForeignKey("tags.id"))
+    )
+
+    op.create_table(
+        "ingest_jobs",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("status", sa.String()),
+        sa.Column("source", sa.String()),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("started_at", sa.DateTime()),
+        sa.Column("finished_at", sa.DateTime()),
+        sa.Column("total", sa.Integer()),
+        sa.Column("completed", sa.Integer()),
+        sa.Column("failed", sa.Integer()),
+        sa.Column("skipped", sa.Integer())
+    )
+    op.create_index("ix_ingest_jobs_id", "ingest_jobs", ["id"])
+
+    op.create_table(
+        "ingest_job_failures",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("job_id", sa.Integer(), sa.ForeignKey("ingest_jobs.id")),
+        sa.Column("path", sa.String()),
+        sa.Column("error", sa.Text()),
+        sa.Column("created_at", sa.DateTime())
+    )
+    op.create_index("ix_ingest_job_failures_id", "ingest_job_failures", ["id"])
+    op.create_index("ix_ingest_job_failures_job_id", "ingest_job_failures", ["job_id"])
+
+def downgrade() -> None:
+    op.drop_table("ingest_job_failures")
+    op.drop_table("ingest_jobs")
+    op.drop_table("audio_tags")
+    op.drop_table("tags")
+    op.drop_table("metadata")
+    op.drop_table("audio_features")
+    op.drop_table("audio_files")
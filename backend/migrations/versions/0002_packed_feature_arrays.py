@@ -0,0 +1,84 @@
+"""Store feature arrays as packed float32 instead of JSON
+
+Converts audio_features.beat_positions, mfcc_mean, mfcc_var and embedding from
+JSON lists to little-endian float32 bytes (see models/types.py:PackedArray).
+
+Revision ID: 0002_packed_feature_arrays
+Revises: 0001_initial_schema
+Create Date: 2024-03-08 00:00:00
+"""
+from alembic import op
+import numpy as np
+import sqlalchemy as sa
+
+revision = "0002_packed_feature_arrays"
+down_revision = "0001_initial_schema"
+branch_labels = None
+depends_on = None
+
+COLUMNS = ("beat_positions", "mfcc_mean", "mfcc_var", "embedding")
+BATCH_SIZE = 5000
+
+def _convert(source_type, target_type, target_suffix: str, encode) -> None:
+    """Copy every column into its `<name><target_suffix>` twin, BATCH_SIZE rows at a time"""
+    bind = op.get_bind()
+    table = sa.table(
+        "audio_features",
+        sa.column("id", sa.Integer),
+        *(sa.column(name, source_type) for name in COLUMNS),
+        *(sa.column(f"{name}{target_suffix}", target_type) for name in COLUMNS)
+    )
+    update = table.update().where(table.c.id == sa.bindparam("row_id")).values({
+        f"{name}{target_suffix}": sa.bindparam(f"new_{name}") for name in COLUMNS
+    })
+
+    last_id = 0
+    while True:
+        rows = bind.execute(
+            sa.select(table.c.id, *(table.c[name] for name in COLUMNS))
+            .where(table.c.id > last_id)
+            .order_by(table.c.id)
+            .limit(BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+        bind.execute(update, [
+            {'row_id': row[0], **{f"new_{name}": encode(value) for name, value in zip(COLUMNS, row[1:])}}
+            for row in rows
+        ])
+        last_id = rows[-1][0]
+
+def _pack(value):
+    if value is None:
+        return None
+    return np.asarray(value, dtype="<f4").ravel().tobytes()
+
+def _unpack(value):
+    if value is None:
+        return None
+    return np.frombuffer(value, dtype="<f4").tolist()
+
+def _swap_columns(new_type, temporary_suffix: str) -> None:
+    """Drop the original columns and rename the converted twins into their place"""
+    with op.batch_alter_table("audio_features") as batch_op:
+        for name in COLUMNS:
+            batch_op.drop_column(name)
+    with op.batch_alter_table("audio_features") as batch_op:
+        for name in COLUMNS:
+            batch_op.alter_column(f"{name}{temporary_suffix}", new_column_name=name, existing_type=new_type)
+
+def upgrade() -> None:
+    with op.batch_alter_table("audio_features") as batch_op:
+        for name in COLUMNS:
+            batch_op.add_column(sa.Column(f"{name}_packed", sa.LargeBinary()))
+
+    _convert(sa.JSON, sa.LargeBinary, "_packed", _pack)
+    _swap_columns(sa.LargeBinary(), "_packed")
+
+def downgrade() -> None:
+    with op.batch_alter_table("audio_features") as batch_op:
+        for name in COLUMNS:
+            batch_op.add_column(sa.Column(f"{name}_json", sa.JSON()))
+
+    _convert(sa.LargeBinary, sa.JSON, "_json", _unpack)
+    _swap_columns(sa.JSON(), "_json")
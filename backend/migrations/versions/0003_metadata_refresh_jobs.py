@@ -0,0 +1,34 @@
+"""Track batch metadata refresh jobs
+
+Revision ID: 0003_metadata_refresh_jobs
+Revises: 0002_packed_feature_arrays
+Create Date: 2024-03-15 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0003_metadata_refresh_jobs"
+down_revision = "0002_packed_feature_arrays"
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.create_table(
+        "metadata_refresh_jobs",
+        sa.Column("id", sa.Integer(), primary_key=True),
+        sa.Column("status", sa.String()),
+        sa.Column("criteria", sa.JSON()),
+        sa.Column("force", sa.Boolean()),
+        sa.Column("created_at", sa.DateTime()),
+        sa.Column("started_at", sa.DateTime()),
+        sa.Column("finished_at", sa.DateTime()),
+        sa.Column("total", sa.Integer()),
+        sa.Column("updated", sa.Integer()),
+        sa.Column("unchanged", sa.Integer()),
+        sa.Column("failed", sa.Integer()),
+        sa.Column("last_metadata_id", sa.Integer())
+    )
+    op.create_index("ix_metadata_refresh_jobs_id", "metadata_refresh_jobs", ["id"])
+
+def downgrade() -> None:
+    op.drop_table("metadata_refresh_jobs")
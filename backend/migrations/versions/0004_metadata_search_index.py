@@ -0,0 +1,81 @@
+"""Full-text search index for metadata
+
+PostgreSQL: a generated, GIN-indexed tsvector column metadata.search_vector plus
+pg_trgm indexes on artist and title for fuzzy matching. SQLite: an external-content
+FTS5 table metadata_fts kept in sync by triggers. Either way the database maintains
+the index on every write (see core/search/metadata_search.py).
+
+SQLite drops triggers when a batch migration recreates the metadata table, so such
+migrations must run create_sqlite_triggers() again afterwards.
+
+Revision ID: 0004_metadata_search_index
+Revises: 0003_metadata_refresh_jobs
+Create Date: 2024-03-22 00:00:00
+"""
+from alembic import op
+
+revision = "0004_metadata_search_index"
+down_revision = "0003_metadata_refresh_jobs"
+branch_labels = None
+depends_on = None
+
+FIELDS = ("title", "artist", "album", "genre", "style", "label")
+# setweight() classes: title and artist rank highest
+PG_WEIGHTS = {"title": "A", "artist": "A", "album": "B", "label": "C", "genre": "D", "style": "D"}
+
+def create_sqlite_triggers() -> None:
+    columns = ", ".join(FIELDS)
+    new_values = ", ".join(f"new.{name}" for name in FIELDS)
+    old_values = ", ".join(f"old.{name}" for name in FIELDS)
+    op.execute(f"""
+        CREATE TRIGGER metadata_fts_insert AFTER INSERT ON metadata BEGIN
+            INSERT INTO metadata_fts(rowid, {columns}) VALUES (new.id, {new_values});
+        END
+    """)
+    op.execute(f"""
+        CREATE TRIGGER metadata_fts_delete AFTER DELETE ON metadata BEGIN
+            INSERT INTO metadata_fts(metadata_fts, rowid, {columns}) VALUES ('delete', old.id, {old_values});
+        END
+    """)
+    # Only text field changes touch the index, not e.g. bpm or last_updated
+    op.execute(f"""
+        CREATE TRIGGER metadata_fts_update AFTER UPDATE OF {columns} ON metadata BEGIN
+            INSERT INTO metadata_fts(metadata_fts, rowid, {columns}) VALUES ('delete', old.id, {old_values});
+            INSERT INTO metadata_fts(rowid, {columns}) VALUES (new.id, {new_values});
+        END
+    """)
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        vector = " || ".join(
+            f"setweight(to_tsvector('simple', coalesce({name}, '')), '{PG_WEIGHTS[name]}')"
+            for name in FIELDS
+        )
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        op.execute(f"ALTER TABLE metadata ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ({vector}) STORED")
+        op.execute("CREATE INDEX ix_metadata_search_vector ON metadata USING gin (search_vector)")
+        op.execute("CREATE INDEX ix_metadata_artist_trgm ON metadata USING gin (artist gin_trgm_ops)")
+        op.execute("CREATE INDEX ix_metadata_title_trgm ON metadata USING gin (title gin_trgm_ops)")
+    elif dialect == "sqlite":
+        op.execute(f"""
+            CREATE VIRTUAL TABLE metadata_fts USING fts5(
+                {", ".join(FIELDS)},
+                content='metadata', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+            )
+        """)
+        create_sqlite_triggers()
+        op.execute("INSERT INTO metadata_fts(metadata_fts) VALUES ('rebuild')")
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == "postgresql":
+        op.execute("DROP INDEX IF EXISTS ix_metadata_title_trgm")
+        op.execute("DROP INDEX IF EXISTS ix_metadata_artist_trgm")
+        op.execute("DROP INDEX IF EXISTS ix_metadata_search_vector")
+        op.execute("ALTER TABLE metadata DROP COLUMN IF EXISTS search_vector")
+    elif dialect == "sqlite":
+        for name in ("insert", "delete", "update"):
+            op.execute(f"DROP TRIGGER IF EXISTS metadata_fts_{name}")
+        op.execute("DROP TABLE IF EXISTS metadata_fts")
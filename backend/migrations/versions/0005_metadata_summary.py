@@ -0,0 +1,153 @@
+"""Incrementally maintained counters for /metadata/stats
+
+Creates metadata_summary (one row per counter) and triggers on audio_files,
+metadata and tags that add each write's delta to it, then fills it from the
+current tables. PostgreSQL uses statement-level triggers with transition tables,
+so a bulk INSERT/UPDATE applies one aggregated delta per counter rather than one
+per row; SQLite uses row-level triggers.
+
+SQLite drops triggers when a batch migration recreates one of these tables, so
+such migrations must create them again afterwards.
+
+Revision ID: 0005_metadata_summary
+Revises: 0004_metadata_search_index
+Create Date: 2024-03-29 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0005_metadata_summary"
+down_revision = "0004_metadata_search_index"
+branch_labels = None
+depends_on = None
+
+# Keep in step with core/metadata/stats.py:COVERAGE_FIELDS
+COVERAGE_FIELDS = ("title", "artist", "album", "year", "genre", "label", "key", "bpm")
+# (table, column, counter prefix) of the per-value counters
+KEYED_COUNTERS = (("metadata", "primary_source", "source"), ("tags", "category", "tag_category"))
+# Counters of every row in a table
+ROW_COUNTERS = (("audio_files", "files"), ("tags", "tags"))
+TABLES = ("audio_files", "metadata", "tags")
+OPERATIONS = ("insert", "update", "delete")
+
+def _sqlite_statements(table: str, operation: str):
+    """Statements of a row-level SQLite trigger body"""
+    upsert = "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value"
+    statements = []
+    for row_table, counter in ROW_COUNTERS:
+        if row_table == table and operation != "update":
+            statements.append(f"INSERT INTO metadata_summary(name, value) VALUES ('{counter}', "
+                              f"{1 if operation == 'insert' else -1}) {upsert}")
+    if table == "metadata":
+        delta = {
+            "insert": "(new.{0} IS NOT NULL)",
+            "update": "(new.{0} IS NOT NULL) - (old.{0} IS NOT NULL)",
+            "delete": "-(old.{0} IS NOT NULL)"
+        }[operation]
+        values = ", ".join(f"('coverage:{field}', {delta.format(field)})" for field in COVERAGE_FIELDS)
+        statements.append(f"INSERT INTO metadata_summary(name, value) VALUES {values} {upsert}")
+    for keyed_table, column, prefix in KEYED_COUNTERS:
+        if keyed_table != table:
+            continue
+        changed = f" AND new.{column} IS NOT old.{column}" if operation == "update" else ""
+        if operation != "insert":
+            statements.append(f"INSERT INTO metadata_summary(name, value) SELECT '{prefix}:' || old.{column}, -1 "
+                              f"WHERE old.{column} IS NOT NULL{changed} {upsert}")
+        if operation != "delete":
+            statements.append(f"INSERT INTO metadata_summary(name, value) SELECT '{prefix}:' || new.{column}, 1 "
+                              f"WHERE new.{column} IS NOT NULL{changed} {upsert}")
+    return statements
+
+def _postgres_deltas(table: str, rows: str, sign: int) -> str:
+    """SELECT of (name, delta) pairs for one transition table"""
+    parts = []
+    for row_table, counter in ROW_COUNTERS:
+        if row_table == table:
+            parts.append(f"SELECT '{counter}' AS name, {sign} * count(*) AS delta FROM {rows}")
+    if table == "metadata":
+        counts = ", ".join(f"count({field}) AS {field}" for field in COVERAGE_FIELDS)
+        values = ", ".join(f"('coverage:{field}', counts.{field})" for field in COVERAGE_FIELDS)
+        # One scan of the transition table for every coverage field
+        parts.append(f"SELECT c.name, {sign} * c.delta FROM (SELECT {counts} FROM {rows}) counts "
+                     f"CROSS JOIN LATERAL (VALUES {values}) AS c(name, delta)")
+    for keyed_table, column, prefix in KEYED_COUNTERS:
+        if keyed_table == table:
+            parts.append(f"SELECT '{prefix}:' || {column}, {sign} * count(*) FROM {rows} "
+                         f"WHERE {column} IS NOT NULL GROUP BY {column}")
+    return " UNION ALL ".join(parts)
+
+def _postgres_function(table: str, operation: str) -> str:
+    deltas = []
+    if operation != "delete":
+        deltas.append(_postgres_deltas(table, "new_rows", 1))
+    if operation != "insert":
+        deltas.append(_postgres_deltas(table, "old_rows", -1))
+    # Sorted upserts take the counter row locks in a consistent order across transactions
+    return f"""
+        CREATE FUNCTION metadata_summary_{table}_{operation}() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            INSERT INTO metadata_summary(name, value)
+            SELECT name, sum(delta) FROM ({" UNION ALL ".join(deltas)}) deltas
+            GROUP BY name HAVING sum(delta) <> 0
+            ORDER BY name
+            ON CONFLICT (name) DO UPDATE SET value = metadata_summary.value + excluded.value;
+            RETURN NULL;
+        END
+        $$
+    """
+
+def _postgres_trigger(table: str, operation: str) -> str:
+    transition = {
+        "insert": "NEW TABLE AS new_rows",
+        "update": "OLD TABLE AS old_rows NEW TABLE AS new_rows",
+        "delete": "OLD TABLE AS old_rows"
+    }[operation]
+    return (f"CREATE TRIGGER metadata_summary_{operation} AFTER {operation.upper()} ON {table} "
+            f"REFERENCING {transition} FOR EACH STATEMENT "
+            f"EXECUTE FUNCTION metadata_summary_{table}_{operation}()")
+
+def create_triggers() -> None:
+    dialect = op.get_bind().dialect.name
+    for table in TABLES:
+        for operation in OPERATIONS:
+            if dialect == "postgresql":
+                op.execute(_postgres_function(table, operation))
+                op.execute(_postgres_trigger(table, operation))
+            elif dialect == "sqlite":
+                statements = _sqlite_statements(table, operation)
+                if statements:
+                    body = "".join(f"{statement};\n" for statement in statements)
+                    op.execute(f"CREATE TRIGGER metadata_summary_{table}_{operation} "
+                               f"AFTER {operation.upper()} ON {table} BEGIN\n{body}END")
+
+def drop_triggers() -> None:
+    dialect = op.get_bind().dialect.name
+    for table in TABLES:
+        for operation in OPERATIONS:
+            if dialect == "postgresql":
+                op.execute(f"DROP TRIGGER IF EXISTS metadata_summary_{operation} ON {table}")
+                op.execute(f"DROP FUNCTION IF EXISTS metadata_summary_{table}_{operation}()")
+            elif dialect == "sqlite":
+                op.execute(f"DROP TRIGGER IF EXISTS metadata_summary_{table}_{operation}")
+
+def upgrade() -> None:
+    op.create_table(
+        "metadata_summary",
+        sa.Column("name", sa.String(), primary_key=True),
+        sa.Column("value", sa.BigInteger(), nullable=False)
+    )
+    create_triggers()
+
+    coverage = " UNION ALL ".join(
+        f"SELECT 'coverage:{field}', count({field}) FROM metadata" for field in COVERAGE_FIELDS
+    )
+    op.execute(f"INSERT INTO metadata_summary(name, value) {coverage}")
+    for table, counter in ROW_COUNTERS:
+        op.execute(f"INSERT INTO metadata_summary(name, value) SELECT '{counter}', count(*) FROM {table}")
+    for table, column, prefix in KEYED_COUNTERS:
+        op.execute(f"INSERT INTO metadata_summary(name, value) SELECT '{prefix}:' || {column}, count(*) "
+                   f"FROM {table} WHERE {column} IS NOT NULL GROUP BY {column}")
+
+def downgrade() -> None:
+    drop_triggers()
+    op.drop_table("metadata_summary")
@@ -0,0 +1,43 @@
+"""Composite unique index on audio_tags
+
+Drops half-empty and duplicate (audio_file_id, tag_id) pairs, makes both columns
+NOT NULL and adds a unique index on the pair, which bulk tagging relies on for
+INSERT ... ON CONFLICT DO NOTHING, plus an index on tag_id for lookups by tag.
+
+Revision ID: 0006_audio_tags_unique
+Revises: 0005_metadata_summary
+Create Date: 2024-04-05 00:00:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = "0006_audio_tags_unique"
+down_revision = "0005_metadata_summary"
+branch_labels = None
+depends_on = None
+
+def upgrade() -> None:
+    op.execute("DELETE FROM audio_tags WHERE audio_file_id IS NULL OR tag_id IS NULL")
+    if op.get_bind().dialect.name == "postgresql":
+        op.execute(
+            "DELETE FROM audio_tags a USING audio_tags b "
+            "WHERE a.ctid > b.ctid AND a.audio_file_id = b.audio_file_id AND a.tag_id = b.tag_id"
+        )
+    else:
+        op.execute(
+            "DELETE FROM audio_tags WHERE rowid NOT IN "
+            "(SELECT min(rowid) FROM audio_tags GROUP BY audio_file_id, tag_id)"
+        )
+
+    with op.batch_alter_table("audio_tags") as batch_op:
+        batch_op.alter_column("audio_file_id", existing_type=sa.Integer(), nullable=False)
+        batch_op.alter_column("tag_id", existing_type=sa.Integer(), nullable=False)
+    op.create_index("ix_audio_tags_audio_file_id_tag_id", "audio_tags", ["audio_file_id", "tag_id"], unique=True)
+    op.create_index("ix_audio_tags_tag_id", "audio_tags", ["tag_id"])
+
+def downgrade() -> None:
+    op.drop_index("ix_audio_tags_tag_id", table_name="audio_tags")
+    op.drop_index("ix_audio_tags_audio_file_id_tag_id", table_name="audio_tags")
+    with op.batch_alter_table("audio_tags") as batch_op:
+        batch_op.alter_column("audio_file_id", existing_type=sa.Integer(), nullable=True)
+        batch_op.alter_column("tag_id", existing_type=sa.Integer(), nullable=True)
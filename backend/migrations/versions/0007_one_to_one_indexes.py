@@ -0,0 +1,32 @@
+"""Unique indexes on audio_features.audio_file_id and metadata.audio_file_id
+
+Both tables hold at most one row per audio file and are joined to audio_files
+by these columns when the file listing and similarity results are eager-loaded;
+without an index each join scans the whole table. Older duplicate rows for a
+file are dropped first, keeping the most recent one.
+
+Revision ID: 0007_one_to_one_indexes
+Revises: 0006_audio_tags_unique
+Create Date: 2024-04-12 00:00:00
+"""
+from alembic import op
+
+revision = "0007_one_to_one_indexes"
+down_revision = "0006_audio_tags_unique"
+branch_labels = None
+depends_on = None
+
+TABLES = ("audio_features", "metadata")
+
+def upgrade() -> None:
+    for table in TABLES:
+        # Row deletes keep the metadata_summary counters and search index in step via their triggers
+        op.execute(
+            f"DELETE FROM {table} WHERE audio_file_id IS NOT NULL AND id NOT IN "
+            f"(SELECT max(id) FROM {table} WHERE audio_file_id IS NOT NULL GROUP BY audio_file_id)"
+        )
+        op.create_index(f"ix_{table}_audio_file_id", table, ["audio_file_id"], unique=True)
+
+def downgrade() -> None:
+    for table in reversed(TABLES):
+        op.drop_index(f"ix_{table}_audio_file_id", table_name=table)
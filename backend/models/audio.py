@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, String, Float, JSON, ForeignKey, Table, DateTime
+from sqlalchemy import Column, Integer, BigInteger, String, Float, ForeignKey, Index, Table, DateTime
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from .base import Base
+from .types import PackedArray
 
 class AudioFile(Base):
     __tablename__ = "audio_files"
@@ -21,19 +22,20 @@ class AudioFile(Base):
     
     # Relationships
     features = relationship("AudioFeatures", back_populates="audio_file", uselist=False)
-    metadata = relationship("Metadata", back_populates="audio_file", uselist=False)
-    tags = relationship("Tag", secondary="audio_tags")
+    # "metadata" is reserved by the declarative base; the API still exposes it as "metadata"
+    track_metadata = relationship("Metadata", back_populates="audio_file", uselist=False)
+    tags = relationship("Tag", secondary="audio_tags", back_populates="audio_files")
 
 class AudioFeatures(Base):
     __tablename__ = "audio_features"
 
     id = Column(Integer, primary_key=True, index=True)
-    audio_file_id = Column(Integer, ForeignKey("audio_files.id"))
+    audio_file_id = Column(Integer, ForeignKey("audio_files.id"), unique=True, index=True)
     
     # Temporal features
     tempo = Column(Float)
     tempo_confidence = Column(Float)
-    beat_positions = Column(JSON)  # List of beat positions in seconds
+    beat_positions = Column(PackedArray("float32"))  # Beat positions in seconds
     
     # Spectral features
     spectral_centroid = Column(Float)
@@ -41,8 +43,8 @@ class AudioFeatures(Base):
     spectral_bandwidth = Column(Float)
     
     # MFCC features
-    mfcc_mean = Column(JSON)  # List of mean MFCC coefficients
-    mfcc_var = Column(JSON)   # List of MFCC variances
+    mfcc_mean = Column(PackedArray("float32"))  # Mean MFCC coefficients
+    mfcc_var = Column(PackedArray("float32"))   # MFCC variances
     
     # Key detection
     key = Column(String)
@@ -52,7 +54,7 @@ class AudioFeatures(Base):
     acoustid_fingerprint = Column(String)
     
     # Neural network features
-    embedding = Column(JSON)  # Neural network embedding for similarity search
+    embedding = Column(PackedArray("float32"))  # Neural network embedding for similarity search
     
     # Relationships
     audio_file = relationship("AudioFile", back_populates="features")
@@ -61,7 +63,7 @@ class Metadata(Base):
     __tablename__ = "metadata"
 
     id = Column(Integer, primary_key=True, index=True)
-    audio_file_id = Column(Integer, ForeignKey("audio_files.id"))
+    audio_file_id = Column(Integer, ForeignKey("audio_files.id"), unique=True, index=True)
     
     # Basic metadata
     title = Column(String)
@@ -88,7 +90,18 @@ class Metadata(Base):
     last_updated = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
-    audio_file = relationship("AudioFile", back_populates="metadata")
+    audio_file = relationship("AudioFile", back_populates="track_metadata")
+
+class MetadataSummary(Base):
+    """
+    Running counts behind /metadata/stats, one row per counter, e.g. 'files',
+    'coverage:title', 'source:discogs' or 'tag_category:genre'. Maintained by
+    database triggers (migration 0005) on audio_files, metadata and tags.
+    """
+    __tablename__ = "metadata_summary"
+
+    name = Column(String, primary_key=True)
+    value = Column(BigInteger, nullable=False, default=0)
 
 class Tag(Base):
     __tablename__ = "tags"
@@ -98,12 +111,15 @@ class Tag(Base):
     category = Column(String)  # e.g., 'genre', 'mood', 'instrument', 'custom'
     
     # Relationships
-    audio_files = relationship("AudioFile", secondary="audio_tags")
+    audio_files = relationship("AudioFile", secondary="audio_tags", back_populates="tags")
 
 # Association table for audio files and tags
 audio_tags = Table(
     "audio_tags",
     Base.metadata,
-    Column("audio_file_id", Integer, ForeignKey("audio_files.id")),
-    Column("tag_id", Integer, ForeignKey("tags.id")),
+    Column("audio_file_id", Integer, ForeignKey("audio_files.id"), nullable=False),
+    Column("tag_id", Integer, ForeignKey("tags.id"), nullable=False),
+    # Each pair at most once; bulk tagging inserts with ON CONFLICT DO NOTHING against it
+    Index("ix_audio_tags_audio_file_id_tag_id", "audio_file_id", "tag_id", unique=True),
+    Index("ix_audio_tags_tag_id", "tag_id"),
 )
\ No newline at end of file
@@ -0,0 +1,55 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Text, JSON, Boolean
+from sqlalchemy.orm import relationship
+from datetime import datetime
+from .base import Base
+
+class IngestJob(Base):
+    __tablename__ = "ingest_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    status = Column(String, default="pending")  # pending, running, completed
+    source = Column(String)  # Directory that was scanned, or 'paths' for an explicit file list
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+    
+    # Progress counters, updated once per batch
+    total = Column(Integer, default=0)
+    completed = Column(Integer, default=0)
+    failed = Column(Integer, default=0)
+    skipped = Column(Integer, default=0)  # Files already in the library
+    
+    # Relationships
+    failures = relationship("IngestJobFailure", back_populates="job")
+
+class IngestJobFailure(Base):
+    __tablename__ = "ingest_job_failures"
+
+    id = Column(Integer, primary_key=True, index=True)
+    job_id = Column(Integer, ForeignKey("ingest_jobs.id"), index=True)
+    path = Column(String)
+    error = Column(Text)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    # Relationships
+    job = relationship("IngestJob", back_populates="failures")
+
+class MetadataRefreshJob(Base):
+    __tablename__ = "metadata_refresh_jobs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    status = Column(String, default="pending")  # pending, running, completed
+    criteria = Column(JSON)  # Filter selecting the Metadata rows to refresh
+    force = Column(Boolean, default=False)  # Overwrite filled fields instead of only filling empty ones
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime)
+    finished_at = Column(DateTime)
+    
+    # Progress counters, updated once per batch
+    total = Column(Integer, default=0)
+    updated = Column(Integer, default=0)
+    unchanged = Column(Integer, default=0)  # Rows the providers had nothing new for
+    failed = Column(Integer, default=0)
+    
+    # Keyset cursor: id of the last Metadata row processed, so a redelivered task resumes after it
+    last_metadata_id = Column(Integer, default=0)
@@ -0,0 +1,30 @@
+import numpy as np
+from sqlalchemy.types import TypeDecorator, LargeBinary
+
+class PackedArray(TypeDecorator):
+    """
+    A 1-D numeric array stored as packed little-endian bytes (BYTEA / BLOB).
+
+    Accepts lists or numpy arrays on write. Reads return a read-only numpy view
+    over the fetched bytes (np.frombuffer), so loading a row parses nothing.
+    """
+
+    impl = LargeBinary
+    cache_ok = True
+
+    def __init__(self, dtype: str = "float32", *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.dtype = np.dtype(dtype).newbyteorder("<")
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return np.asarray(value, dtype=self.dtype).ravel().tobytes()
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return np.frombuffer(value, dtype=self.dtype)
+
+    def coerce_compared_value(self, op, value):
+        return self
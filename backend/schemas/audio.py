@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from typing import List, Literal, Optional, Dict, Any
 from datetime import datetime
 
 class AudioFeatureBase(BaseModel):
@@ -17,7 +17,8 @@ class AudioFeatureBase(BaseModel):
     embedding: Optional[List[float]] = None
 
 class AudioFeatureCreate(AudioFeatureBase):
-    pass
+    class Config:
+        from_attributes = True
 
 class AudioFeature(AudioFeatureBase):
     id: int
@@ -44,7 +45,8 @@ class MetadataBase(BaseModel):
     primary_source: Optional[str] = None
 
 class MetadataCreate(MetadataBase):
-    pass
+    class Config:
+        from_attributes = True
 
 class Metadata(MetadataBase):
     id: int
@@ -67,6 +69,12 @@ class Tag(TagBase):
     class Config:
         from_attributes = True
 
+# Every tag in tag_ids added to (or removed from) every file in file_ids
+class TagBulkUpdate(BaseModel):
+    file_ids: List[int] = Field(..., min_length=1, max_length=10000)
+    tag_ids: List[int] = Field(..., min_length=1, max_length=100)
+    action: Literal['add', 'remove'] = 'add'
+
 class AudioFileBase(BaseModel):
     path: str
     filename: str
@@ -84,7 +92,21 @@ class AudioFile(AudioFileBase):
     created_at: datetime
     updated_at: datetime
     features: Optional[AudioFeature] = None
-    metadata: Optional[Metadata] = None
+    metadata: Optional[Metadata] = Field(None, validation_alias="track_metadata")
+    tags: List[Tag] = []
+
+    class Config:
+        from_attributes = True
+
+# Listing entry: file properties, metadata and tags, without features
+class AudioFileSummary(BaseModel):
+    id: int
+    path: str
+    filename: str
+    duration: Optional[float] = None
+    format: Optional[str] = None
+    created_at: datetime
+    metadata: Optional[Metadata] = Field(None, validation_alias="track_metadata")
     tags: List[Tag] = []
 
     class Config:
@@ -94,8 +116,20 @@ class AudioAnalysisResult(BaseModel):
     features: AudioFeatureCreate
     metadata: MetadataCreate
     suggested_tags: List[TagCreate] = []
+    timings: Dict[str, Any] = {}
+    profile: Optional[List[Dict[str, Any]]] = None
 
 class SimilaritySearchResult(BaseModel):
     audio_file: AudioFile
     similarity_score: float
-    matching_features: Dict[str, Any]
\ No newline at end of file
+    matching_features: Dict[str, Any]
+
+class DuplicatePair(BaseModel):
+    file_ids: List[int]
+    bit_error_rate: float
+    offset_seconds: float
+
+# Near-identical recordings: files connected by confirmed pairs
+class DuplicateCluster(BaseModel):
+    files: List[AudioFileSummary]
+    pairs: List[DuplicatePair]
@@ -0,0 +1,59 @@
+from pydantic import BaseModel
+from typing import Any, Dict, List, Optional
+from datetime import datetime
+
+class IngestJobCreate(BaseModel):
+    directory: Optional[str] = None
+    paths: List[str] = []
+    recursive: bool = True
+
+class IngestJobFailure(BaseModel):
+    path: str
+    error: str
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+class IngestJob(BaseModel):
+    id: int
+    status: str
+    source: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    total: int
+    completed: int
+    failed: int
+    skipped: int
+    progress: float  # Percentage of files processed
+    throughput: float  # Files processed per second
+    eta_seconds: Optional[float] = None
+    failures: List[IngestJobFailure] = []
+
+class MetadataRefreshFilter(BaseModel):
+    missing: List[str] = []  # Refresh rows where any of these fields is empty
+    primary_source: Optional[str] = None
+    tag: Optional[str] = None  # Tag name
+    updated_after: Optional[datetime] = None
+    updated_before: Optional[datetime] = None
+
+class MetadataRefreshJobCreate(BaseModel):
+    filter: MetadataRefreshFilter = MetadataRefreshFilter()
+    force: bool = False
+
+class MetadataRefreshJob(BaseModel):
+    id: int
+    status: str
+    criteria: Dict[str, Any] = {}
+    force: bool
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    total: int
+    updated: int
+    unchanged: int
+    failed: int
+    progress: float  # Percentage of rows processed
+    throughput: float  # Rows processed per second
+    eta_seconds: Optional[float] = None
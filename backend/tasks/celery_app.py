@@ -0,0 +1,24 @@
+from celery import Celery
+from ..config import settings
+
+def _redis_url() -> str:
+    return f"redis://{settings.REDIS_HOST}:{settings.REDIS_PORT}/{settings.REDIS_DB}"
+
+celery_app = Celery(
+    "ammms",
+    broker=settings.CELERY_BROKER_URL or _redis_url(),
+    backend=settings.CELERY_RESULT_BACKEND or _redis_url()
+)
+
+celery_app.conf.update(
+    task_serializer="json",
+    result_serializer="json",
+    accept_content=["json"],
+    # Analysis is long-running and CPU-bound: hand out one batch at a time and
+    # only acknowledge it once it is done so a crashed worker's batch is redelivered
+    task_acks_late=True,
+    worker_prefetch_multiplier=1,
+    worker_max_tasks_per_child=settings.ANALYSIS_MAX_JOBS_PER_WORKER,
+    task_always_eager=settings.CELERY_TASK_ALWAYS_EAGER,
+    result_expires=settings.CACHE_TTL
+)
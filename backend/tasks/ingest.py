@@ -0,0 +1,178 @@
+import asyncio
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import TYPE_CHECKING, List, Dict, Any, Tuple
+from sqlalchemy import update
+from .celery_app import celery_app
+from ..config import settings
+from ..core.audio.records import build_audio_file, build_audio_features, build_metadata
+from ..core.audio.waveform import WaveformStore
+from ..db.session import SessionLocal
+from ..models.audio import AudioFile
+from ..models.jobs import IngestJob, IngestJobFailure
+
+if TYPE_CHECKING:
+    from ..core.audio.analyzer import AudioAnalyzer
+    from ..core.cache.analysis_cache import AnalysisCache
+    from ..core.metadata.enricher import MetadataEnricher
+
+# Created (and their modules imported) lazily so that importing this module
+# (e.g. from the API) stays cheap
+_analyzer = None
+_enricher = None
+_analysis_cache = None
+_loop = None
+waveform_store = WaveformStore()
+
+def _services() -> Tuple["AudioAnalyzer", "MetadataEnricher", "AnalysisCache"]:
+    """Per-worker analyzer, enricher and cache; analysis runs inline in the Celery worker"""
+    global _analyzer, _enricher, _analysis_cache
+    if _analyzer is None:
+        from ..core.audio.analyzer import AudioAnalyzer
+        from ..core.cache.analysis_cache import AnalysisCache
+        from ..core.metadata.enricher import MetadataEnricher
+        _analyzer = AudioAnalyzer()
+        _enricher = MetadataEnricher()
+        _analysis_cache = AnalysisCache(analyzer_version=_analyzer.version)
+    return _analyzer, _enricher, _analysis_cache
+
+def _run(coro):
+    """Run a coroutine on this worker's event loop, which keeps pooled connections usable across tasks"""
+    global _loop
+    if _loop is None:
+        _loop = asyncio.new_event_loop()
+    return _loop.run_until_complete(coro)
+
+def discover_audio_files(directory: str, recursive: bool = True) -> List[str]:
+    """List audio files under a directory, filtered by settings.AUDIO_FORMATS"""
+    formats = {f".{fmt.lower()}" for fmt in settings.AUDIO_FORMATS}
+    found = []
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            if Path(name).suffix.lower() in formats:
+                found.append(os.path.join(root, name))
+        if not recursive:
+            break
+    return found
+
+def dispatch_ingest_job(job_id: int, paths: List[str]) -> None:
+    """Split the files of a job into batches of settings.BATCH_SIZE and queue one task per batch"""
+    from celery import group
+
+    batch_size = max(1, settings.BATCH_SIZE)
+    group(
+        ingest_batch.s(job_id, paths[start:start + batch_size])
+        for start in range(0, len(paths), batch_size)
+    ).apply_async()
+
+@celery_app.task(name="ammms.ingest_batch")
+def ingest_batch(job_id: int, paths: List[str]) -> Dict[str, int]:
+    """Analyze and enrich a batch of files, then write them in a single transaction"""
+    db = SessionLocal()
+    try:
+        db.execute(
+            update(IngestJob)
+            .where(IngestJob.id == job_id, IngestJob.started_at.is_(None))
+            .values(status="running", started_at=datetime.utcnow())
+        )
+        db.commit()
+
+        # Files that are already in the library are not analyzed again
+        existing = {
+            row[0] for row in db.query(AudioFile.path).filter(AudioFile.path.in_(paths))
+        }
+        pending = [path for path in paths if path not in existing]
+    finally:
+        db.close()
+
+    results, failures = _run(_process_batch(pending))
+
+    db = SessionLocal()
+    try:
+        written = []
+        try:
+            written = _write_batch(db, results)
+        except Exception as e:
+            # The batch is written atomically, so every file in it failed
+            db.rollback()
+            failures.extend((path, f"Database write failed: {str(e)}") for path, _, _, _ in results)
+            results = []
+
+        db.add_all(IngestJobFailure(job_id=job_id, path=path, error=error) for path, error in failures)
+        db.execute(
+            update(IngestJob)
+            .where(IngestJob.id == job_id)
+            .values(
+                completed=IngestJob.completed + len(results),
+                failed=IngestJob.failed + len(failures),
+                skipped=IngestJob.skipped + len(existing)
+            )
+        )
+        db.execute(
+            update(IngestJob)
+            .where(
+                IngestJob.id == job_id,
+                IngestJob.status != "completed",
+                IngestJob.completed + IngestJob.failed + IngestJob.skipped >= IngestJob.total
+            )
+            .values(status="completed", finished_at=datetime.utcnow())
+        )
+        db.commit()
+    finally:
+        db.close()
+
+    for content_hash, file_id in written:
+        waveform_store.link(content_hash, file_id)
+
+    return {'completed': len(results), 'failed': len(failures), 'skipped': len(existing)}
+
+async def _process_batch(paths: List[str]) -> Tuple[List[Tuple[str, str, Dict[str, Any], Dict[str, Any]]], List[Tuple[str, str]]]:
+    """Analyze and enrich each file, collecting successes and per-file errors"""
+    from ..core.cache.analysis_cache import hash_file
+
+    analyzer, enricher, analysis_cache = _services()
+    results, failures = [], []
+
+    for path in paths:
+        try:
+            content_hash = hash_file(path)
+            waveform_path = waveform_store.path_for_hash(content_hash)
+            features = await analysis_cache.get(content_hash)
+            if features is None:
+                features = await analyzer.analyze_file(
+                    path,
+                    waveform_path=None if waveform_path.exists() else str(waveform_path)
+                )
+                await analysis_cache.set(content_hash, features)
+            elif not waveform_path.exists():
+                await analyzer.generate_waveform(path, str(waveform_path))
+
+            metadata = await enricher.enrich_metadata(
+                basic_metadata={'filename': os.path.basename(path)},
+                genre_prediction=features.get('genre')
+            )
+            results.append((path, content_hash, features, metadata))
+        except Exception as e:
+            failures.append((path, str(e)))
+
+    return results, failures
+
+def _write_batch(db, results: List[Tuple[str, str, Dict[str, Any], Dict[str, Any]]]) -> List[Tuple[str, int]]:
+    """Stage files, features and metadata for a batch; the caller commits. Returns (content hash, file id) pairs"""
+    audio_files = [
+        build_audio_file(path, os.path.basename(path), features)
+        for path, _, features, _ in results
+    ]
+    db.add_all(audio_files)
+    db.flush()
+
+    for audio_file, (_, _, features, metadata) in zip(audio_files, results):
+        db.add(build_audio_features(audio_file.id, features))
+        db.add(build_metadata(audio_file.id, metadata))
+    db.flush()
+    return [(content_hash, audio_file.id) for audio_file, (_, content_hash, _, _) in zip(audio_files, results)]
+
+# Registers the metadata refresh task with workers started on this module
+from . import refresh  # noqa: E402,F401
@@ -0,0 +1,151 @@
+import asyncio
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+from sqlalchemy import or_, select, update
+from .celery_app import celery_app
+from .ingest import _run
+from ..config import settings
+from ..core.audio.records import METADATA_COLUMNS
+from ..db.session import SessionLocal
+from ..models.audio import Metadata, Tag, audio_tags
+from ..models.jobs import MetadataRefreshJob
+from ..schemas.jobs import MetadataRefreshFilter
+
+if TYPE_CHECKING:
+    from ..core.metadata.enricher import MetadataEnricher
+
+# Fields a refresh may write; last_updated is set by the refresh itself
+REFRESH_FIELDS = METADATA_COLUMNS - {'last_updated'}
+
+_enricher = None
+
+def _get_enricher() -> "MetadataEnricher":
+    global _enricher
+    if _enricher is None:
+        from ..core.metadata.enricher import MetadataEnricher
+        _enricher = MetadataEnricher()
+    return _enricher
+
+def metadata_filter(criteria: MetadataRefreshFilter) -> List:
+    """SQL conditions on Metadata selecting the rows a refresh job covers"""
+    conditions = []
+    if criteria.missing:
+        conditions.append(or_(*(getattr(Metadata, field).is_(None) for field in criteria.missing)))
+    if criteria.primary_source:
+        conditions.append(Metadata.primary_source == criteria.primary_source)
+    if criteria.tag:
+        conditions.append(Metadata.audio_file_id.in_(
+            select(audio_tags.c.audio_file_id)
+            .join(Tag, Tag.id == audio_tags.c.tag_id)
+            .where(Tag.name == criteria.tag)
+        ))
+    if criteria.updated_after:
+        conditions.append(Metadata.last_updated >= _utc(criteria.updated_after))
+    if criteria.updated_before:
+        conditions.append(Metadata.last_updated < _utc(criteria.updated_before))
+    return conditions
+
+def _utc(value: datetime) -> datetime:
+    """last_updated is stored as naive UTC"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def dispatch_refresh_job(job_id: int) -> None:
+    refresh_metadata_batch.delay(job_id)
+
+@celery_app.task(name="ammms.refresh_metadata_batch")
+def refresh_metadata_batch(job_id: int) -> Dict[str, int]:
+    """
+    Re-enrich the next METADATA_REFRESH_BATCH_SIZE rows of a refresh job, then queue
+    the following batch. Rows are walked in id order from the job's cursor, so a
+    redelivered task resumes where the last committed batch stopped. Batches run one
+    after another rather than in parallel to keep within the provider rate limits.
+    """
+    db = SessionLocal()
+    try:
+        job = db.get(MetadataRefreshJob, job_id)
+        if job is None or job.status == "completed":
+            return {'updated': 0, 'unchanged': 0, 'failed': 0}
+        if job.started_at is None:
+            job.status = "running"
+            job.started_at = datetime.utcnow()
+            db.commit()
+
+        criteria = MetadataRefreshFilter.model_validate(job.criteria or {})
+        batch_size = max(1, settings.METADATA_REFRESH_BATCH_SIZE)
+        rows = db.execute(
+            select(*Metadata.__table__.columns)
+            .where(Metadata.id > (job.last_metadata_id or 0), *metadata_filter(criteria))
+            .order_by(Metadata.id)
+            .limit(batch_size)
+        ).mappings().all()
+        force = bool(job.force)
+    finally:
+        db.close()
+
+    enriched = _run(_enrich_rows(rows, settings.METADATA_REFRESH_CONCURRENCY))
+
+    now = datetime.utcnow()
+    updates = []
+    counts = {'updated': 0, 'unchanged': 0, 'failed': 0}
+    for row, metadata in zip(rows, enriched):
+        if metadata is None:
+            counts['failed'] += 1
+            continue
+        changes = _changes(row, metadata, force)
+        if changes:
+            updates.append({'id': row['id'], 'last_updated': now, **changes})
+            counts['updated'] += 1
+        else:
+            counts['unchanged'] += 1
+
+    db = SessionLocal()
+    try:
+        if updates:
+            # ORM bulk UPDATE by primary key: one executemany per set of changed columns
+            db.execute(update(Metadata), updates)
+        values = {
+            'updated': MetadataRefreshJob.updated + counts['updated'],
+            'unchanged': MetadataRefreshJob.unchanged + counts['unchanged'],
+            'failed': MetadataRefreshJob.failed + counts['failed']
+        }
+        if rows:
+            values['last_metadata_id'] = rows[-1]['id']
+        if len(rows) < batch_size:
+            values.update(status="completed", finished_at=now)
+        db.execute(update(MetadataRefreshJob).where(MetadataRefreshJob.id == job_id).values(**values))
+        db.commit()
+    finally:
+        db.close()
+
+    if len(rows) == batch_size:
+        refresh_metadata_batch.delay(job_id)
+    return counts
+
+async def _enrich_rows(rows, concurrency: int) -> List[Optional[Dict[str, Any]]]:
+    """Enrich rows with at most `concurrency` lookups in flight; None marks a failed row"""
+    enricher = _get_enricher()
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def enrich(row):
+        async with semaphore:
+            try:
+                return await enricher.enrich_metadata({
+                    'title': row['title'],
+                    'artist': row['artist'],
+                    'album': row['album']
+                })
+            except Exception as e:
+                print(f"Warning: Metadata refresh failed for metadata {row['id']}: {str(e)}")
+                return None
+
+    return await asyncio.gather(*(enrich(row) for row in rows))
+
+def _changes(row, metadata: Dict[str, Any], force: bool) -> Dict[str, Any]:
+    """Fields to write: every new value if force, otherwise only values for empty fields"""
+    return {
+        field: value for field, value in metadata.items()
+        if field in REFRESH_FIELDS and value is not None
+        and (force or not row[field]) and row[field] != value
+    }
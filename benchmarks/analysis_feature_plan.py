@@ -0,0 +1,92 @@
+"""
+Per-track feature extraction time with and without the shared FeaturePlan.
+
+"before" calls every librosa extractor on the raw signal, as AudioAnalyzer did
+originally (each one recomputes its own STFT / mel spectrogram); "after" feeds
+them all from one FeaturePlan. Results are checked for equality.
+
+    python benchmarks/analysis_feature_plan.py --durations 30 180 600 --repeat 3
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+
+import librosa
+import numpy as np
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+from core.audio.feature_plan import FeaturePlan  # noqa: E402
+
+from common import SR, synthesize  # noqa: E402
+
+def extract_before(y: np.ndarray, sr: int) -> dict:
+    tempo, beats = librosa.beat.beat_track(y=y, sr=sr)
+    return {
+        'tempo': tempo,
+        'beats': beats,
+        'centroid': librosa.feature.spectral_centroid(y=y, sr=sr),
+        'rolloff': librosa.feature.spectral_rolloff(y=y, sr=sr),
+        'bandwidth': librosa.feature.spectral_bandwidth(y=y, sr=sr),
+        'mfcc': librosa.feature.mfcc(y=y, sr=sr, n_mfcc=13),
+        'mel_db': librosa.power_to_db(librosa.feature.melspectrogram(y=y, sr=sr), ref=np.max),
+        'chroma': librosa.feature.chroma_cqt(y=y, sr=sr)
+    }
+
+def extract_after(y: np.ndarray, sr: int) -> dict:
+    plan = FeaturePlan(y, sr)
+    tempo, beats = librosa.beat.beat_track(onset_envelope=plan.onset_envelope, sr=sr)
+    result = {
+        'tempo': tempo,
+        'beats': beats,
+        'centroid': librosa.feature.spectral_centroid(S=plan.stft_magnitude, sr=sr),
+        'rolloff': librosa.feature.spectral_rolloff(S=plan.stft_magnitude, sr=sr),
+        'bandwidth': librosa.feature.spectral_bandwidth(S=plan.stft_magnitude, sr=sr),
+        'mfcc': librosa.feature.mfcc(S=plan.mel_db, n_mfcc=13),
+        'mel_db': plan.mel_db - plan.mel_db.max(),
+        'chroma': librosa.feature.chroma_cqt(y=y, sr=sr)
+    }
+    plan.release()
+    return result
+
+def best_of(fn, y, repeat: int):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(y, SR)
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--durations", type=float, nargs="+", default=[30, 180])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    # Warm up numba-compiled code paths so they do not count against "before"
+    extract_before(synthesize(5), SR)
+    extract_after(synthesize(5), SR)
+
+    results = []
+    print(f"{'duration (s)':>12} {'before (s)':>11} {'after (s)':>10} {'speedup':>8}  identical")
+    for duration in args.durations:
+        y = synthesize(duration)
+        before, expected = best_of(extract_before, y, args.repeat)
+        after, actual = best_of(extract_after, y, args.repeat)
+        identical = all(np.allclose(expected[k], actual[k], rtol=1e-5, atol=1e-5) for k in expected)
+        results.append({
+            'duration': duration,
+            'before_s': before,
+            'after_s': after,
+            'speedup': before / after,
+            'identical': identical
+        })
+        print(f"{duration:>12.0f} {before:>11.3f} {after:>10.3f} {before / after:>7.2f}x  {identical}")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Import-time budget for an API worker: how long importing the routers takes,
+how much memory it leaves resident, and which modules it pulls in.
+
+Imports backend.api.v1.router and mounts it on an app, as backend/main.py
+does, in fresh interpreters, and reports the median time and the resident
+memory afterwards, plus the slowest imports from one more run under
+`python -X importtime` (which slows imports down, so it is not timed). Exits
+non-zero if the median exceeds --budget-ms, memory exceeds --budget-mb, or
+any of the heavy modules that only analysis or provider lookups need
+(librosa, scipy, TensorFlow, provider clients, Redis) is imported at
+startup; those belong behind the lazy providers in backend/api/v1/services.py.
+The default budgets leave some headroom on a slow single-core machine;
+tighten them to what your CI runners need.
+
+    python benchmarks/api_startup.py --repeat 5 --budget-ms 1000
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from common import ROOT, REQUIRED_SETTINGS
+
+# Modules the API may only import once a request needs them
+DEFERRED_MODULES = [
+    "tensorflow", "librosa", "scipy", "numba", "soundfile", "soxr", "acoustid",
+    "musicbrainzngs", "discogs_client", "aiohttp", "redis", "aiofiles",
+    "backend.core.audio.analyzer", "backend.core.metadata.enricher", "backend.core.cache.analysis_cache"
+]
+# Default budgets, also enforced by tests/test_api_startup.py
+BUDGET_MS = 2000
+BUDGET_MB = 120
+
+STARTUP = """
+import importlib, json, sys, time
+sys.path.insert(0, {root!r})
+start = time.perf_counter()
+sys.modules['backend.core.config'] = importlib.import_module('backend.config')
+sys.modules['config'] = sys.modules['backend.core.config']
+from fastapi import FastAPI
+from backend.api.v1.router import api_router
+app = FastAPI()
+app.include_router(api_router, prefix='/api/v1')
+seconds = time.perf_counter() - start
+try:
+    with open('/proc/self/statm') as f:
+        rss = int(f.read().split()[1]) * __import__('os').sysconf('SC_PAGE_SIZE')
+except OSError:
+    rss = None
+print(json.dumps({{'seconds': seconds, 'rss_bytes': rss, 'modules': sorted(sys.modules)}}))
+"""
+
+def start_worker(env: Dict[str, str], importtime: bool = False) -> Tuple[dict, List[Tuple[int, str]]]:
+    """
+    One cold import in a fresh interpreter; returns its report and, with
+    importtime, (own µs, module) for every import
+    """
+    options = ["-X", "importtime"] if importtime else []
+    result = subprocess.run(
+        [sys.executable, *options, "-c", STARTUP.format(root=str(ROOT))],
+        capture_output=True, text=True, check=True, env=env
+    )
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        own, _, name = line[len("import time:"):].split("|")
+        imports.append((int(own), name.strip()))
+    return json.loads(result.stdout), imports
+
+def deferred_loaded(modules) -> List[str]:
+    """The DEFERRED_MODULES (or any of their submodules) among the given module names"""
+    return [
+        name for name in DEFERRED_MODULES
+        if any(module == name or module.startswith(name + ".") for module in modules)
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=BUDGET_MS, help="Most time the median import may take")
+    parser.add_argument("--budget-mb", type=float, default=BUDGET_MB, help="Most resident memory after the import")
+    parser.add_argument("--top", type=int, default=15, help="Number of slowest imports to list")
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {**REQUIRED_SETTINGS, **os.environ, 'DB_TYPE': "sqlite", 'DB_NAME': os.path.join(tmp, "startup")}
+        runs = [start_worker(env)[0] for _ in range(args.repeat)]
+        _, imports = start_worker(env, importtime=True)
+
+    seconds = [report['seconds'] for report in runs]
+    rss = [report['rss_bytes'] for report in runs if report['rss_bytes'] is not None]
+    rss_mb = max(rss) / 2 ** 20 if rss else None
+    loaded = set(runs[-1]['modules'])
+    deferred = deferred_loaded(loaded)
+    slowest = sorted(imports, reverse=True)[:args.top]
+
+    results = {
+        'median_ms': 1000 * statistics.median(seconds),
+        'max_ms': 1000 * max(seconds),
+        'rss_mb': rss_mb,
+        'modules': len(loaded),
+        'deferred_modules_loaded': deferred,
+        'slowest_imports': [{'module': name, 'own_ms': microseconds / 1000} for microseconds, name in slowest],
+        'budget_ms': args.budget_ms,
+        'budget_mb': args.budget_mb
+    }
+    print(f"router import: median {results['median_ms']:.0f} ms (max {results['max_ms']:.0f} ms) over "
+          f"{args.repeat} runs, " + (f"{rss_mb:.0f} MB resident, " if rss_mb is not None else "")
+          + f"{len(loaded)} modules; slowest imports by own time:")
+    for entry in results['slowest_imports']:
+        print(f"  {entry['own_ms']:8.1f} ms  {entry['module']}")
+
+    failures = []
+    if results['median_ms'] > args.budget_ms:
+        failures.append(f"median import time {results['median_ms']:.0f} ms exceeds {args.budget_ms:.0f} ms")
+    if rss_mb is not None and rss_mb > args.budget_mb:
+        failures.append(f"resident memory {rss_mb:.0f} MB exceeds {args.budget_mb:.0f} MB")
+    if deferred:
+        failures.append(f"imported at startup: {', '.join(deferred)}")
+    for failure in failures:
+        print(f"FAIL {failure}")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+    if failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Tagging a crate of files: one request per (file, tag) pair vs /metadata/tags/bulk.
+
+Migrates a fresh SQLite database, seeds files and tags, then tags every file
+with the same tags twice over: once through POST /metadata/files/{id}/tags/{id}
+per pair and once with a single bulk request (followed by a bulk removal).
+Requests run in-process through QueryCountMiddleware, so the totals include
+every SQL statement issued.
+
+    python benchmarks/bulk_tags.py --files 2000 --tags 3
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from common import configure, make_app, migrate, request as asgi_request
+
+def seed(files: int, tags: int):
+    from backend.db.session import engine
+
+    with engine.begin() as connection:
+        connection.exec_driver_sql(
+            "INSERT INTO audio_files (id, path, filename) VALUES (:id, :path, :filename)",
+            [{'id': i, 'path': f"/library/{i}.flac", 'filename': f"{i}.flac"} for i in range(1, files + 1)]
+        )
+        connection.exec_driver_sql(
+            "INSERT INTO tags (id, name, category) VALUES (:id, :name, 'custom')",
+            [{'id': i, 'name': f"crate-{i}"} for i in range(1, tags + 1)]
+        )
+
+async def request(app, method: str, path: str, body: dict = None) -> int:
+    """Run one request in-process; returns the X-Query-Count it reported"""
+    response = await asgi_request(app, method, path, body=body)
+    if response.status != 200:
+        raise RuntimeError(f"{method} {path} returned {response.status}")
+    return int(response.headers['x-query-count'])
+
+def tagged_pairs() -> int:
+    from backend.db.session import engine
+    with engine.connect() as connection:
+        return connection.exec_driver_sql("SELECT count(*) FROM audio_tags").scalar()
+
+async def run(files: int, tags: int):
+    app = make_app(count_queries=True)
+    file_ids, tag_ids = list(range(1, files + 1)), list(range(1, tags + 1))
+    results = {}
+
+    start, queries = time.perf_counter(), 0
+    for file_id in file_ids:
+        for tag_id in tag_ids:
+            queries += await request(app, "POST", f"/api/v1/metadata/files/{file_id}/tags/{tag_id}")
+    results['per_pair'] = {'requests': files * tags, 'queries': queries,
+                           'seconds': time.perf_counter() - start, 'pairs': tagged_pairs()}
+
+    start = time.perf_counter()
+    queries = await request(app, "POST", "/api/v1/metadata/tags/bulk",
+                            {'file_ids': file_ids, 'tag_ids': tag_ids, 'action': 'remove'})
+    results['bulk_remove'] = {'requests': 1, 'queries': queries,
+                              'seconds': time.perf_counter() - start, 'pairs': tagged_pairs()}
+
+    start = time.perf_counter()
+    queries = await request(app, "POST", "/api/v1/metadata/tags/bulk", {'file_ids': file_ids, 'tag_ids': tag_ids})
+    results['bulk_add'] = {'requests': 1, 'queries': queries,
+                           'seconds': time.perf_counter() - start, 'pairs': tagged_pairs()}
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--tags", type=int, default=3)
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        configure(os.path.join(tmp, "tags"))
+        migrate()
+        seed(args.files, args.tags)
+        results = asyncio.run(run(args.files, args.tags))
+
+    for name, result in results.items():
+        print(f"{name:>11}: {result['requests']:5d} requests, {result['queries']:5d} queries, "
+              f"{result['seconds']:.3f} s, {result['pairs']} pairs tagged afterwards")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Helpers shared by the benchmarks: settings for running the backend without its
+services (SQLite, no Redis or provider keys), migrations, in-process ASGI
+requests and deterministic synthetic audio.
+
+Benchmarks run as scripts (python benchmarks/<name>.py), so they import this
+module as `common`. Call configure() before importing anything from backend.
+"""
+import importlib
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Any, Dict, NamedTuple, Optional
+from urllib.parse import urlencode
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[1]
+SR = 22050
+
+# Settings without defaults that the benchmarks do not use
+REQUIRED_SETTINGS = {
+    **{name: "benchmark" for name in (
+        'DB_TYPE', 'DB_HOST', 'DB_NAME', 'DB_USER', 'DB_PASSWORD', 'REDIS_HOST', 'ACOUSTID_API_KEY',
+        'MUSICBRAINZ_APP_NAME', 'DISCOGS_TOKEN', 'BEATPORT_CLIENT_ID', 'BEATPORT_CLIENT_SECRET',
+        'LASTFM_API_KEY', 'LASTFM_API_SECRET', 'APP_NAME', 'APP_ENV', 'SECRET_KEY', 'API_PREFIX',
+        'UPLOAD_DIR', 'TEMP_DIR', 'LOG_LEVEL', 'LOG_FILE'
+    )},
+    'DB_PORT': '0', 'REDIS_PORT': '6379', 'REDIS_DB': '0', 'MUSICBRAINZ_VERSION': '1.0', 'DEBUG': 'false',
+    'CORS_ORIGINS': '[]', 'MAX_UPLOAD_SIZE': '0', 'AUDIO_FORMATS': '[]', 'ENABLE_NEURAL_PROCESSING': 'false',
+    'BATCH_SIZE': '1', 'NUM_WORKERS': '1', 'CACHE_TTL': '0', 'METADATA_CACHE_TTL': '0'
+}
+
+def configure(database: Optional[str] = None, **overrides: str) -> None:
+    """
+    Point the settings at a SQLite database file (if given), apply overrides and
+    fill in the required settings that are still unset.
+    """
+    if database:
+        os.environ.update({'DB_TYPE': "sqlite", 'DB_NAME': database})
+        os.environ.setdefault('EMBEDDING_INDEX_PATH', os.path.join(os.path.dirname(database), "embeddings.npz"))
+    os.environ.update(overrides)
+    for name, value in REQUIRED_SETTINGS.items():
+        os.environ.setdefault(name, value)
+    if str(ROOT) not in sys.path:
+        sys.path.insert(0, str(ROOT))
+    # core modules import settings as `..config`, i.e. relative to the core package
+    sys.modules.setdefault("backend.core.config", importlib.import_module("backend.config"))
+    # and endpoints/settings.py imports it as top-level `config`
+    sys.modules.setdefault("config", importlib.import_module("backend.config"))
+
+def migrate() -> None:
+    """Create the schema with the Alembic migrations, as a deployment would"""
+    from alembic import command
+    from alembic.config import Config
+    config = Config(str(ROOT / "backend" / "alembic.ini"))
+    config.set_main_option("script_location", str(ROOT / "backend" / "migrations"))
+    command.upgrade(config, "head")
+
+def make_app(count_queries: bool = False):
+    """The API router on a bare app; with count_queries, responses carry X-Query-Count"""
+    from fastapi import FastAPI
+    from backend.api.v1.router import api_router
+
+    app = FastAPI()
+    if count_queries:
+        from backend.db.instrumentation import QueryCountMiddleware
+        app.add_middleware(QueryCountMiddleware, warn_threshold=10 ** 6)
+    app.include_router(api_router, prefix="/api/v1")
+    return app
+
+class Response(NamedTuple):
+    status: int
+    headers: Dict[str, str]
+    body: bytes
+
+    def json(self) -> Any:
+        return json.loads(self.body)
+
+async def request(app, method: str, path: str, params: Optional[dict] = None, body: Any = None,
+                  headers: Optional[Dict[str, str]] = None) -> Response:
+    """
+    Run one request through the ASGI app in-process. A dict or list body is sent
+    as JSON. Header names in the response are lower-cased.
+    """
+    if isinstance(body, (dict, list)):
+        body = json.dumps(body).encode()
+        headers = {'content-type': "application/json", **(headers or {})}
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method,
+        "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "",
+        "query_string": urlencode(params or {}).encode(),
+        "headers": [(key.lower().encode(), value.encode()) for key, value in (headers or {}).items()],
+        "client": ("127.0.0.1", 0), "server": ("testserver", 80)
+    }
+    response = {'body': b""}
+
+    async def receive():
+        return {"type": "http.request", "body": body or b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response['status'] = message["status"]
+            response['headers'] = {key.decode().lower(): value.decode() for key, value in message["headers"]}
+        elif message["type"] == "http.response.body":
+            response['body'] += message.get("body", b"")
+
+    await app(scope, receive, send)
+    return Response(response['status'], response['headers'], response['body'])
+
+def synthesize(duration: float, seed: int = 0, sr: int = SR) -> np.ndarray:
+    """Deterministic test signal: a chord with a 120 BPM pulse plus noise"""
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(duration * sr)) / sr
+    y = sum(np.sin(2 * np.pi * f * t) for f in (220.0, 277.18, 329.63)) / 3
+    y *= 0.5 + 0.5 * (np.sin(2 * np.pi * 2.0 * t) > 0)
+    y += 0.05 * rng.standard_normal(len(t))
+    return y.astype(np.float32)
@@ -0,0 +1,154 @@
+"""
+Request latency under concurrency: sync Session vs AsyncSession in async endpoints.
+
+Migrates a fresh SQLite database, seeds files with metadata and serves the same
+moderately heavy query (a LIKE scan joined to audio_files) from two in-process
+endpoints: one through a synchronous Session, as the audio and metadata
+endpoints used to, which blocks the event loop for the whole query, and one
+through get_async_db. While each batch of concurrent clients runs, a probe hits
+a trivial /ping endpoint to show how long unrelated requests wait.
+
+    python benchmarks/db_concurrency.py --rows 50000 --clients 1 8 32
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from common import configure, migrate, request
+
+SEED_CHUNK = 50000
+QUERY = (
+    "SELECT count(*) FROM metadata JOIN audio_files ON audio_files.id = metadata.audio_file_id "
+    "WHERE metadata.title LIKE :pattern OR metadata.artist LIKE :pattern"
+)
+
+def seed(rows: int):
+    from backend.db.session import engine
+
+    for chunk_start in range(1, rows + 1, SEED_CHUNK):
+        ids = range(chunk_start, min(chunk_start + SEED_CHUNK, rows + 1))
+        with engine.begin() as connection:
+            connection.exec_driver_sql(
+                "INSERT INTO audio_files (id, path, filename) VALUES (:id, :path, :filename)",
+                [{'id': i, 'path': f"/library/{i}.flac", 'filename': f"{i}.flac"} for i in ids]
+            )
+            connection.exec_driver_sql(
+                "INSERT INTO metadata (id, audio_file_id, title, artist) VALUES (:id, :id, :title, :artist)",
+                [{'id': i, 'title': f"Title {i}", 'artist': f"Artist {i % 5000}"} for i in ids]
+            )
+
+def make_app():
+    from fastapi import Depends, FastAPI
+    from sqlalchemy import text
+    from sqlalchemy.ext.asyncio import AsyncSession
+    from backend.db.session import SessionLocal, get_async_db
+
+    app = FastAPI()
+
+    @app.get("/sync")
+    async def sync_query(pattern: str = "%77%"):
+        db = SessionLocal()
+        try:
+            return {'count': db.execute(text(QUERY), {'pattern': pattern}).scalar()}
+        finally:
+            db.close()
+
+    @app.get("/async")
+    async def async_query(pattern: str = "%77%", db: AsyncSession = Depends(get_async_db)):
+        return {'count': (await db.execute(text(QUERY), {'pattern': pattern})).scalar()}
+
+    @app.get("/ping")
+    async def ping():
+        return {'ok': True}
+
+    return app
+
+async def get(app, path: str) -> float:
+    """Run one GET in-process; returns its latency in seconds"""
+    start = time.perf_counter()
+    # Yield once, as reading a request off a socket would, so a request queues behind
+    # whatever is holding the event loop
+    await asyncio.sleep(0)
+    response = await request(app, "GET", path)
+    if response.status != 200:
+        raise RuntimeError(f"{path} returned {response.status}")
+    return time.perf_counter() - start
+
+async def probe(app, stop: asyncio.Event, interval: float = 0.005):
+    """/ping latencies, counted from when each ping was due rather than when the loop got to it"""
+    latencies = []
+    while not stop.is_set():
+        due = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+        await get(app, "/ping")
+        latencies.append(time.perf_counter() - due)
+    return latencies
+
+async def load(app, path: str, clients: int, requests: int):
+    latencies = []
+
+    async def client():
+        for _ in range(requests):
+            latencies.append(await get(app, path))
+
+    stop = asyncio.Event()
+    probe_task = asyncio.ensure_future(probe(app, stop))
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(clients)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    pings = await probe_task
+
+    return {
+        'clients': clients,
+        'requests': len(latencies),
+        'requests_per_second': len(latencies) / elapsed,
+        'p50_ms': 1000 * float(np.percentile(latencies, 50)),
+        'p95_ms': 1000 * float(np.percentile(latencies, 95)),
+        'ping_p95_ms': 1000 * float(np.percentile(pings, 95)) if pings else None
+    }
+
+async def run(clients_levels, requests: int):
+    app = make_app()
+    # Warm up both pools
+    await get(app, "/sync")
+    await get(app, "/async")
+    return {
+        mode: [await load(app, f"/{mode}", clients, requests) for clients in clients_levels]
+        for mode in ("sync", "async")
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--requests", type=int, default=10, help="Requests per client")
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        configure(os.path.join(tmp, "concurrency"))
+        migrate()
+        seed(args.rows)
+        results = asyncio.run(run(args.clients, args.requests))
+        from backend.db.session import async_engine, engine
+        asyncio.run(async_engine.dispose())
+        engine.dispose()
+
+    for mode, levels in results.items():
+        for result in levels:
+            print(f"{mode:>5} x{result['clients']:<3} {result['requests_per_second']:7.1f} req/s, "
+                  f"p50 {result['p50_ms']:7.1f} ms, p95 {result['p95_ms']:7.1f} ms, "
+                  f"/ping p95 {result['ping_p95_ms'] or 0:7.1f} ms")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""
+Duplicate detection over Chromaprint fingerprints: the inverted index behind
+GET /audio/duplicates vs comparing every pair.
+
+Migrates a fresh SQLite database and seeds it with synthetic fingerprints (two
+minutes, as the analyzer computes them): random recordings plus planted copies
+of some of them, each trimmed at the start, with a fraction of sub-fingerprints
+corrupted by bit flips the way lossy re-encoding does. For growing corpus sizes
+it times the first /audio/duplicates request (which builds the index) and a
+second one, and checks the clusters against the planted copies. The exhaustive
+scan is timed on a sample of pairs, searching the same alignment window, and
+extrapolated to all N²/2 pairs.
+
+    python benchmarks/duplicate_detection.py --files 2000 8000 --copies 0.2
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from common import configure, make_app, migrate, request
+
+ITEMS = 950        # Sub-fingerprints in 120 s
+MAX_TRIM = 64      # Copies lose up to this many sub-fingerprints (~8 s) at the start
+
+def synthetic_corpus(files: int, copies: float, corrupted: float, seed: int = 0):
+    """
+    Raw fingerprints of `files` files, a `copies` fraction of which copy an earlier
+    file; returns (fingerprints, planted pairs)
+    """
+    rng = np.random.default_rng(seed)
+    fingerprints, pairs = [], set()
+    for file_id in range(1, files + 1):
+        if file_id > 1 and rng.random() < copies:
+            original = int(rng.integers(1, file_id))
+            source = fingerprints[original - 1]
+            trim = int(rng.integers(0, MAX_TRIM))
+            values = source[trim:].copy()
+            # Re-encoding leaves most sub-fingerprints intact and flips a few bits in the rest
+            hit = rng.random(len(values)) < corrupted
+            flips = rng.random((int(hit.sum()), 32)) < 0.1
+            values[hit] ^= (flips * (1 << np.arange(32, dtype=np.uint64))).sum(axis=1).astype(np.uint32)
+            # Copies of copies belong to the original's cluster
+            pairs.add((original, file_id))
+        else:
+            # Neighbouring sub-fingerprints of real audio share many bits
+            values = np.bitwise_xor.accumulate(
+                rng.integers(0, 2 ** 32, ITEMS, dtype=np.uint32) & rng.integers(0, 2 ** 32, ITEMS, dtype=np.uint32)
+            )
+        fingerprints.append(values.astype(np.uint32))
+    return fingerprints, pairs
+
+def seed(fingerprints, first_id: int = 1):
+    from backend.core.audio.fingerprint import encode_fingerprint
+    from backend.db.session import engine
+
+    ids = range(first_id, first_id + len(fingerprints))
+    with engine.begin() as connection:
+        connection.exec_driver_sql(
+            "INSERT INTO audio_files (id, path, filename, created_at) VALUES (:id, :path, :filename, CURRENT_TIMESTAMP)",
+            [{'id': i, 'path': f"/library/{i}.flac", 'filename': f"{i}.flac"} for i in ids]
+        )
+        connection.exec_driver_sql(
+            "INSERT INTO audio_features (audio_file_id, acoustid_fingerprint) VALUES (:id, :fingerprint)",
+            [{'id': i, 'fingerprint': encode_fingerprint(values)} for i, values in zip(ids, fingerprints)]
+        )
+
+async def get(app, path: str, params: dict = None):
+    """Run one GET request in-process; returns the decoded JSON body"""
+    response = await request(app, "GET", path, params)
+    if response.status != 200:
+        raise RuntimeError(f"GET {path} returned {response.status}: {response.body[:200]}")
+    return response.json()
+
+def cluster_pairs(clusters):
+    """Every (lower id, higher id) pair within the same cluster"""
+    pairs = set()
+    for cluster in clusters:
+        ids = sorted(cluster)
+        pairs.update((a, b) for i, a in enumerate(ids) for b in ids[i + 1:])
+    return pairs
+
+def planted_clusters(planted, files: int):
+    """Close the planted pairs transitively (copies of copies)"""
+    parent = list(range(files + 1))
+
+    def find(x):
+        while parent[x] != x:
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for a, b in planted:
+        if b <= files:
+            parent[find(a)] = find(b)
+    groups = {}
+    for file_id in range(1, files + 1):
+        groups.setdefault(find(file_id), []).append(file_id)
+    return [group for group in groups.values() if len(group) > 1]
+
+def exhaustive_pairs_per_second(fingerprints, sample: int = 300, seed: int = 1) -> float:
+    """Pairs compared per second by a scan that tries every alignment within MAX_TRIM"""
+    from backend.core.similarity.duplicate_index import bit_error_rate
+
+    rng = np.random.default_rng(seed)
+    pairs = rng.integers(0, len(fingerprints), (sample, 2))
+    start = time.perf_counter()
+    for a, b in pairs:
+        min(
+            ber for ber in (bit_error_rate(fingerprints[a], fingerprints[b], offset)
+                            for offset in range(-MAX_TRIM, MAX_TRIM + 1))
+            if ber is not None
+        )
+    return sample / (time.perf_counter() - start)
+
+async def run(app, files: int, planted) -> dict:
+    from backend.api.v1.endpoints import audio
+    from backend.core.similarity.duplicate_index import DuplicateIndex
+
+    # A new index, so the first request builds it from the database
+    audio.duplicate_index = DuplicateIndex(max_bit_error_rate=audio.settings.DUPLICATE_MAX_BIT_ERROR_RATE)
+    start = time.perf_counter()
+    clusters = await get(app, "/api/v1/audio/duplicates")
+    first = time.perf_counter() - start
+
+    start = time.perf_counter()
+    await get(app, "/api/v1/audio/duplicates")
+    second = time.perf_counter() - start
+
+    start = time.perf_counter()
+    await get(app, "/api/v1/audio/duplicates", {'file_id': files})
+    single = time.perf_counter() - start
+
+    found = cluster_pairs([[f['id'] for f in cluster['files']] for cluster in clusters])
+    expected = cluster_pairs(planted_clusters(planted, files))
+    rates = [pair['bit_error_rate'] for cluster in clusters for pair in cluster['pairs']]
+    stats = await get(app, "/api/v1/audio/duplicate-index/stats")
+    return {
+        'files': files,
+        'first_request_seconds': first,
+        'request_seconds': second,
+        'single_file_seconds': single,
+        'clusters': len(clusters),
+        'recall': len(found & expected) / len(expected) if expected else 1.0,
+        'precision': len(found & expected) / len(found) if found else 1.0,
+        'max_bit_error_rate': max(rates) if rates else None,
+        'index_entries': stats['entries'],
+        'index_mb': stats['memory_mb']
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, nargs="+", default=[2000, 8000])
+    parser.add_argument("--copies", type=float, default=0.2, help="Fraction of files that copy another")
+    parser.add_argument("--corrupted", type=float, default=0.4, help="Fraction of a copy's sub-fingerprints with bit flips")
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    sizes = sorted(args.files)
+    fingerprints, planted = synthetic_corpus(sizes[-1], args.copies, args.corrupted)
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        configure(os.path.join(tmp, "duplicates"))
+        migrate()
+        app = make_app()
+        seeded = 0
+        for files in sizes:
+            # Copies only copy earlier files, so every prefix of the corpus is self-contained
+            seed(fingerprints[seeded:files], first_id=seeded + 1)
+            seeded = files
+            result = asyncio.run(run(app, files, planted))
+            rate = exhaustive_pairs_per_second(fingerprints[:files])
+            result['exhaustive_seconds_estimate'] = files * (files - 1) / 2 / rate
+            results.append(result)
+
+            print(f"{files:6d} files: index {result['first_request_seconds']:6.2f} s first request, "
+                  f"{result['request_seconds']:5.2f} s after, {result['single_file_seconds'] * 1000:6.1f} ms for one file | "
+                  f"exhaustive scan ~{result['exhaustive_seconds_estimate']:8.0f} s | "
+                  f"{result['clusters']} clusters, recall {result['recall']:.3f}, precision {result['precision']:.3f}, "
+                  f"{result['index_entries']} entries ({result['index_mb']} MB)")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+    if any(result['recall'] < 0.99 or result['precision'] < 0.99 for result in results):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
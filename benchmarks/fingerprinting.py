@@ -0,0 +1,77 @@
+"""
+Fingerprinting after analysis: decoding the file again vs reusing the samples.
+
+Writes synthetic FLAC files and, for each, decodes it as the analyzer does
+(librosa.load) and then fingerprints it twice: the way the analyzer used to,
+acoustid.fingerprint_file on the path (fpcalc or audioread decoding the file a
+second time), and with fingerprint_pcm on the decoded samples (libchromaprint
+in-process, or fpcalc reading them from stdin). Needs libchromaprint or fpcalc
+(set FPCALC to its path if it is not on PATH).
+
+    python benchmarks/fingerprinting.py --files 20 --seconds 240
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from common import configure
+
+def write_corpus(directory: str, files: int, seconds: float, seed: int = 0):
+    """Stereo 44.1 kHz FLAC files: a few detuned tones with noise bursts"""
+    import soundfile as sf
+
+    rng = np.random.default_rng(seed)
+    sr = 44100
+    t = np.arange(int(seconds * sr)) / sr
+    paths = []
+    for i in range(files):
+        tones = sum(np.sin(2 * np.pi * f * t) for f in rng.uniform(80, 2000, 4))
+        bursts = rng.normal(0, 1, len(t)) * (np.sin(2 * np.pi * rng.uniform(0.5, 4) * t) > 0.9)
+        signal = 0.1 * tones + 0.05 * bursts
+        path = os.path.join(directory, f"{i}.flac")
+        sf.write(path, np.stack([signal, np.roll(signal, 17)], axis=1).astype(np.float32), sr)
+        paths.append(path)
+    return paths
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=20)
+    parser.add_argument("--seconds", type=float, default=240)
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    configure()
+    import acoustid
+    import librosa
+    from backend.core.audio.fingerprint import fingerprint_pcm
+
+    results = {'file': {'latencies': [], 'decodes': 2}, 'pcm': {'latencies': [], 'decodes': 1}}
+    with tempfile.TemporaryDirectory() as tmp:
+        for path in write_corpus(tmp, args.files, args.seconds):
+            y, sr = librosa.load(path)
+
+            start = time.perf_counter()
+            acoustid.fingerprint_file(path)
+            results['file']['latencies'].append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            _, backend = fingerprint_pcm(y, sr)
+            results['pcm']['latencies'].append(time.perf_counter() - start)
+            results['pcm']['backend'] = backend
+
+    for name, result in results.items():
+        latencies = np.array(result.pop('latencies')) * 1000
+        result.update({'mean_ms': float(latencies.mean()), 'p95_ms': float(np.percentile(latencies, 95))})
+        print(f"{name:>4}: {result['decodes']} decodes per file, fingerprint mean {result['mean_ms']:7.1f} ms, "
+              f"p95 {result['p95_ms']:7.1f} ms" + (f" ({result['backend']})" if 'backend' in result else ""))
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""
+Genre/embedding inference throughput with and without micro-batching.
+
+Loads the tiny SavedModel in benchmarks/models (or --model) through
+InferenceService and runs predictions for a number of concurrent tracks with
+synthetic mel spectrograms: once with batch size 1, i.e. one model call per
+spectrogram window as the analyzer used to make, and once batching windows
+across tracks up to --batch-size with a --max-wait-ms deadline. Checks that both
+give the same predictions, and that importing the analyzer does not import
+TensorFlow (exits non-zero otherwise).
+
+    python benchmarks/inference_batching.py --tracks 64 --batch-size 32
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+from common import ROOT, configure
+TINY_MODEL = Path(__file__).resolve().parent / "models" / "tiny_audio_tagger"
+
+def analyzer_import() -> dict:
+    """Import the analyzer in a fresh interpreter; report the time taken and whether TensorFlow came along"""
+    code = (
+        "import importlib, sys, time\n"
+        f"sys.path.insert(0, {str(ROOT)!r})\n"
+        "sys.modules['backend.core.config'] = importlib.import_module('backend.config')\n"
+        "start = time.perf_counter()\n"
+        "import backend.core.audio.analyzer\n"
+        "print(time.perf_counter() - start, 'tensorflow' in sys.modules)\n"
+    )
+    seconds, tensorflow = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True, env=os.environ
+    ).stdout.split()
+    return {'seconds': float(seconds), 'imports_tensorflow': tensorflow == "True"}
+
+def synthetic_spectrograms(tracks: int, seed: int = 0):
+    """Mel spectrograms in dB below peak, 20 s to 4 min long"""
+    rng = np.random.default_rng(seed)
+    return [
+        np.clip(rng.normal(-40, 15, (128, int(rng.integers(860, 10300)))), -80, 0).astype(np.float32)
+        for _ in range(tracks)
+    ]
+
+async def run(model: str, spectrograms, batch_size: int, max_wait: float) -> dict:
+    from backend.core.audio.inference import InferenceService
+
+    service = InferenceService(model_path=model, batch_size=batch_size, max_wait=max_wait)
+    # Load the model outside the timed section
+    await service.predict(spectrograms[0])
+    loaded = service.stats()
+
+    latencies = []
+
+    async def track(mel):
+        start = time.perf_counter()
+        result = await service.predict(mel)
+        latencies.append(time.perf_counter() - start)
+        return result
+
+    start = time.perf_counter()
+    predictions = await asyncio.gather(*(track(mel) for mel in spectrograms))
+    elapsed = time.perf_counter() - start
+    stats = service.stats()
+    service.close()
+
+    return {
+        'tracks_per_second': len(spectrograms) / elapsed,
+        'p95_latency_ms': 1000 * float(np.percentile(latencies, 95)),
+        'model_calls': stats['batches'] - loaded['batches'],
+        'mean_batch_size': stats['mean_batch_size'],
+        'load_seconds': stats['load_seconds'],
+        'predictions': predictions
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=str(TINY_MODEL))
+    parser.add_argument("--tracks", type=int, default=64)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--max-wait-ms", type=float, default=10.0)
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    configure(INFERENCE_MODEL_PATH=args.model, ENABLE_NEURAL_PROCESSING="true")
+    imported = analyzer_import()
+    spectrograms = synthetic_spectrograms(args.tracks)
+    results = {
+        'unbatched': asyncio.run(run(args.model, spectrograms, 1, 0.0)),
+        'batched': asyncio.run(run(args.model, spectrograms, args.batch_size, args.max_wait_ms / 1000))
+    }
+
+    same = all(
+        a['genre'].keys() == b['genre'].keys()
+        and np.allclose(list(a['genre'].values()), list(b['genre'].values()), atol=1e-5)
+        and np.allclose(a['embedding'], b['embedding'], atol=1e-5)
+        for a, b in zip(results['unbatched'].pop('predictions'), results['batched'].pop('predictions'))
+    )
+
+    print(f"analyzer import: {imported['seconds']:.2f} s, imports tensorflow: {imported['imports_tensorflow']}")
+    for name, result in results.items():
+        print(f"{name:>9}: {result['tracks_per_second']:7.1f} tracks/s, p95 {result['p95_latency_ms']:7.1f} ms, "
+              f"{result['model_calls']} model calls (mean batch {result['mean_batch_size']:.1f}), "
+              f"model load {result['load_seconds']:.2f} s")
+    print(f"batched predictions match unbatched: {same}")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps({'analyzer_import': imported, **results, 'match': same}, indent=2))
+    if imported['imports_tensorflow'] or not same:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
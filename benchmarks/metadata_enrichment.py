@@ -0,0 +1,181 @@
+"""
+Metadata enrichment throughput against local stub servers.
+
+Starts one aiohttp server that imitates MusicBrainz (XML), Discogs, Beatport and
+Last.fm with a fixed response latency, points the provider URLs at it and
+enriches a batch of tracks concurrently (every track is requested twice, as
+happens when the same file is uploaded and ingested at once). Reports the
+enricher's per-provider stats, the peak request rate each stub observed and the
+worst event-loop stall while the batch ran.
+
+    python benchmarks/metadata_enrichment.py --tracks 10 --latency 0.2
+"""
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+
+from aiohttp import web
+
+MB_RECORDING = """<?xml version="1.0" encoding="UTF-8"?>
+<metadata xmlns="http://musicbrainz.org/ns/mmd-2.0#" xmlns:ext="http://musicbrainz.org/ns/ext#-2.0">
+<recording-list count="1" offset="0"><recording id="00000000-0000-0000-0000-000000000001" ext:score="100">
+<title>{title}</title>
+<artist-credit><name-credit><artist id="00000000-0000-0000-0000-000000000002"><name>{artist}</name></artist></name-credit></artist-credit>
+<release-list><release id="00000000-0000-0000-0000-000000000003"><title>Stub Release</title><date>2001-05-01</date></release></release-list>
+</recording></recording-list></metadata>"""
+
+def stub_app(latency: float, hits):
+    async def delay(provider):
+        hits[provider].append(time.monotonic())
+        await asyncio.sleep(latency)
+
+    async def musicbrainz(request):
+        await delay('musicbrainz')
+        return web.Response(
+            text=MB_RECORDING.format(title="Stub Title", artist="Stub Artist"),
+            content_type="application/xml"
+        )
+
+    async def discogs_search(request):
+        await delay('discogs')
+        base = f"{request.scheme}://{request.host}"
+        return web.json_response({
+            'pagination': {'page': 1, 'pages': 1, 'per_page': 50, 'items': 1, 'urls': {}},
+            'results': [{'id': 1, 'type': 'release', 'title': 'Stub Artist - Stub Title',
+                         'resource_url': f"{base}/discogs/releases/1"}]
+        })
+
+    async def discogs_release(request):
+        await delay('discogs')
+        return web.json_response({
+            'id': 1, 'title': 'Stub Title', 'year': 2001,
+            'artists': [{'id': 2, 'name': 'Stub Artist'}],
+            'labels': [{'id': 3, 'name': 'Stub Label'}],
+            'genres': ['Electronic'], 'styles': ['Techno']
+        })
+
+    async def beatport(request):
+        await delay('beatport')
+        return web.json_response({'results': [{
+            'name': 'Stub Title', 'artists': [{'name': 'Stub Artist'}], 'label': {'name': 'Stub Label'},
+            'genre': {'name': 'Techno'}, 'key': {'name': 'A min'}, 'bpm': 128
+        }]})
+
+    async def lastfm(request):
+        await delay('lastfm')
+        return web.json_response({'track': {
+            'name': 'Stub Title', 'artist': {'name': 'Stub Artist'}, 'album': {'title': 'Stub Release'},
+            'toptags': {'tag': [{'name': 'techno'}]}
+        }})
+
+    app = web.Application()
+    app.router.add_get("/ws/2/recording/", musicbrainz)
+    app.router.add_get("/discogs/database/search", discogs_search)
+    app.router.add_get("/discogs/releases/1", discogs_release)
+    app.router.add_get("/beatport/search", beatport)
+    app.router.add_get("/lastfm/", lastfm)
+    return app
+
+def peak_rate(timestamps, window: float = 1.0) -> int:
+    """Most requests seen in any `window` seconds"""
+    timestamps = sorted(timestamps)
+    best, start = 0, 0
+    for end in range(len(timestamps)):
+        while timestamps[end] - timestamps[start] >= window:
+            start += 1
+        best = max(best, end - start + 1)
+    return best
+
+async def monitor_loop_lag(stop: asyncio.Event, interval: float = 0.01):
+    worst = 0.0
+    while not stop.is_set():
+        before = time.monotonic()
+        await asyncio.sleep(interval)
+        worst = max(worst, time.monotonic() - before - interval)
+    return worst
+
+async def run(tracks: int, latency: float, port: int):
+    hits = defaultdict(list)
+    runner = web.AppRunner(stub_app(latency, hits))
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+
+    from backend.core.metadata.enricher import MetadataEnricher
+    enricher = MetadataEnricher()
+
+    stop = asyncio.Event()
+    lag_task = asyncio.ensure_future(monitor_loop_lag(stop))
+    queries = [{'artist': f"Artist {i}", 'title': f"Title {i}"} for i in range(tracks)] * 2
+
+    start = time.monotonic()
+    results = await asyncio.gather(*(
+        enricher.enrich_metadata(query, genre_prediction={'techno': 0.9}) for query in queries
+    ))
+    elapsed = time.monotonic() - start
+    stop.set()
+    worst_lag = await lag_task
+
+    await enricher.close()
+    await runner.cleanup()
+
+    return {
+        'enrichments': len(queries),
+        'seconds': elapsed,
+        'complete_results': sum(1 for result in results if result.get('label') and result.get('title')),
+        'max_event_loop_stall_ms': 1000 * worst_lag,
+        'providers': {
+            name: {**stats, 'stub_peak_requests_per_second': peak_rate(hits[name])}
+            for name, stats in enricher.stats().items()
+        }
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tracks", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.2, help="Stub response latency in seconds")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    base = f"http://127.0.0.1:{args.port}"
+    os.environ.update({
+        'MUSICBRAINZ_API_URL': base,
+        'DISCOGS_API_URL': f"{base}/discogs",
+        'BEATPORT_API_URL': f"{base}/beatport/search",
+        'LASTFM_API_URL': f"{base}/lastfm/"
+    })
+    # Required settings that the benchmark does not use
+    for name in ('DB_TYPE', 'DB_HOST', 'DB_NAME', 'DB_USER', 'DB_PASSWORD', 'REDIS_HOST', 'ACOUSTID_API_KEY',
+                 'MUSICBRAINZ_APP_NAME', 'DISCOGS_TOKEN', 'BEATPORT_CLIENT_ID', 'BEATPORT_CLIENT_SECRET',
+                 'LASTFM_API_KEY', 'LASTFM_API_SECRET', 'APP_NAME', 'APP_ENV', 'SECRET_KEY', 'API_PREFIX',
+                 'UPLOAD_DIR', 'TEMP_DIR', 'LOG_LEVEL', 'LOG_FILE'):
+        os.environ.setdefault(name, "benchmark")
+    for name, value in (('DB_PORT', '0'), ('REDIS_PORT', '6379'), ('REDIS_DB', '0'), ('MUSICBRAINZ_VERSION', '1.0'),
+                        ('DEBUG', 'false'), ('CORS_ORIGINS', '[]'), ('MAX_UPLOAD_SIZE', '0'), ('AUDIO_FORMATS', '[]'),
+                        ('ENABLE_NEURAL_PROCESSING', 'false'), ('BATCH_SIZE', '1'), ('NUM_WORKERS', '1'),
+                        ('CACHE_TTL', '0'), ('METADATA_CACHE_TTL', '0')):
+        os.environ.setdefault(name, value)
+    sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+    # core modules import settings as `..config`, i.e. relative to the core package
+    sys.modules.setdefault("backend.core.config", importlib.import_module("backend.config"))
+
+    results = asyncio.run(run(args.tracks, args.latency, args.port))
+    print(f"{results['enrichments']} enrichments in {results['seconds']:.2f} s, "
+          f"{results['complete_results']} complete, worst event loop stall {results['max_event_loop_stall_ms']:.1f} ms")
+    for name, stats in results['providers'].items():
+        print(f"{name:>12}: {stats['requests']:3d} requests ({stats['coalesced']} coalesced), "
+              f"{stats['requests_per_second']:.2f} req/s (limit {stats['rate_limit']}), "
+              f"peak {stats['stub_peak_requests_per_second']} in any 1 s, "
+              f"mean latency {stats['mean_latency_ms'] or 0:.0f} ms")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
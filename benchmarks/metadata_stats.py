@@ -0,0 +1,144 @@
+"""
+/metadata/stats cost: per-field COUNT queries vs one aggregate pass vs the
+trigger-maintained metadata_summary table.
+
+Migrates a fresh SQLite database to head, seeds audio_files/metadata rows with
+a realistic fill rate and a few sources and tag categories (the summary triggers
+fire for every row, so seeding also shows their write cost), checks that the
+counters match a full recount and times each way of computing the stats.
+
+    python benchmarks/metadata_stats.py --rows 1000000
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from common import configure, migrate
+
+SOURCES = [None, "musicbrainz", "discogs", "beatport", "lastfm"]
+CATEGORIES = ["genre", "mood", "instrument", "custom"]
+SEED_CHUNK = 50000
+
+def seed(engine, rows: int, start_id: int = 1, seed: int = 0) -> float:
+    """Insert `rows` files with metadata; returns the seconds spent"""
+    rng = random.Random(seed)
+
+    def maybe(value, rate):
+        return value if rng.random() < rate else None
+
+    elapsed = 0.0
+    for chunk_start in range(start_id, start_id + rows, SEED_CHUNK):
+        ids = range(chunk_start, min(chunk_start + SEED_CHUNK, start_id + rows))
+        files = [{'id': i, 'path': f"/library/{i}.flac", 'filename': f"{i}.flac"} for i in ids]
+        metadata = [{
+            'id': i, 'audio_file_id': i,
+            'title': maybe(f"Title {i}", 0.98), 'artist': maybe(f"Artist {i % 5000}", 0.95),
+            'album': maybe(f"Album {i % 20000}", 0.8), 'year': maybe(1970 + i % 55, 0.6),
+            'genre': maybe("Techno", 0.7), 'label': maybe(f"Label {i % 800}", 0.5),
+            'key': maybe("A min", 0.4), 'bpm': maybe(120.0 + i % 20, 0.4),
+            'primary_source': rng.choice(SOURCES)
+        } for i in ids]
+        start = time.perf_counter()
+        with engine.begin() as connection:
+            connection.exec_driver_sql(
+                "INSERT INTO audio_files (id, path, filename) VALUES (:id, :path, :filename)", files
+            )
+            connection.exec_driver_sql(
+                "INSERT INTO metadata (id, audio_file_id, title, artist, album, year, genre, label, key, bpm, "
+                "primary_source) VALUES (:id, :audio_file_id, :title, :artist, :album, :year, :genre, :label, "
+                ":key, :bpm, :primary_source)", metadata
+            )
+        elapsed += time.perf_counter() - start
+    with engine.begin() as connection:
+        connection.exec_driver_sql(
+            "INSERT INTO tags (name, category) VALUES (:name, :category)",
+            [{'name': f"tag-{start_id}-{i}", 'category': CATEGORIES[i % len(CATEGORIES)]} for i in range(200)]
+        )
+    return elapsed
+
+def legacy_stats(db):
+    """The previous implementation: one COUNT per field, source and tag category"""
+    from backend.models.audio import AudioFile, Metadata, Tag
+    total_files = db.query(AudioFile).count()
+    stats = {"total_files": total_files, "coverage": {}, "sources": {},
+             "tags": {"total": db.query(Tag).count(), "by_category": {}}}
+    for field in ["title", "artist", "album", "year", "genre", "label", "key", "bpm"]:
+        filled = db.query(Metadata).filter(getattr(Metadata, field).isnot(None)).count()
+        stats["coverage"][field] = round(filled / total_files * 100, 2) if total_files > 0 else 0
+    for source in db.query(Metadata.primary_source).distinct().all():
+        if source[0]:
+            stats["sources"][source[0]] = db.query(Metadata).filter(Metadata.primary_source == source[0]).count()
+    for category in db.query(Tag.category).distinct().all():
+        if category[0]:
+            stats["tags"]["by_category"][category[0]] = db.query(Tag).filter(Tag.category == category[0]).count()
+    return stats
+
+def best_of(fn, repeat: int):
+    times, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        configure(os.path.join(tmp, "stats"))
+        migrate()
+        from backend.core.metadata.stats import aggregate_counts, format_stats, summary_counts
+        from backend.db.session import SessionLocal, engine
+
+        seed_seconds = seed(engine, args.rows)
+        db = SessionLocal()
+        try:
+            summary = summary_counts(db)
+            exact = aggregate_counts(db)
+            assert summary == exact, "metadata_summary drifted from the tables"
+
+            timings = {}
+            timings['legacy_s'], legacy = best_of(lambda: legacy_stats(db), args.repeat)
+            timings['aggregate_s'], aggregated = best_of(lambda: format_stats(aggregate_counts(db)), args.repeat)
+            timings['summary_s'], summarized = best_of(lambda: format_stats(summary_counts(db)), args.repeat)
+            assert legacy == aggregated == summarized
+        finally:
+            db.close()
+
+        # Write cost of the triggers: the same insert with and without them
+        batch = max(1, min(args.rows // 10, 100000))
+        with_triggers = seed(engine, batch, start_id=args.rows + 1, seed=1)
+        with engine.begin() as connection:
+            for (name,) in connection.exec_driver_sql(
+                "SELECT name FROM sqlite_master WHERE type = 'trigger' AND name LIKE 'metadata_summary_%'"
+            ).fetchall():
+                connection.exec_driver_sql(f"DROP TRIGGER {name}")
+        without_triggers = seed(engine, batch, start_id=args.rows + batch + 1, seed=2)
+        engine.dispose()
+
+    results = {
+        'rows': args.rows,
+        'seed_s': seed_seconds,
+        **timings,
+        'insert_batch_rows': batch,
+        'insert_with_triggers_s': with_triggers,
+        'insert_without_triggers_s': without_triggers
+    }
+    print(f"{args.rows} rows seeded in {seed_seconds:.1f} s")
+    print(f"legacy {timings['legacy_s'] * 1000:.1f} ms, one aggregate pass {timings['aggregate_s'] * 1000:.1f} ms, "
+          f"summary table {timings['summary_s'] * 1000:.2f} ms")
+    print(f"inserting {batch} rows: {with_triggers:.2f} s with summary triggers, {without_triggers:.2f} s without")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
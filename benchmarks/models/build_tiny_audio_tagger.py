@@ -0,0 +1,59 @@
+"""
+Build the tiny SavedModel in benchmarks/models/tiny_audio_tagger.
+
+It has the same signature as a production model for core/audio/inference.py
+(`mel` windows in, `genre` probabilities and an `embedding` out) but only a few
+thousand random weights, so inference can be exercised and benchmarked without
+a trained model. The weights are seeded, so rebuilding gives the same model.
+
+    python benchmarks/models/build_tiny_audio_tagger.py
+"""
+import argparse
+import shutil
+from pathlib import Path
+
+import tensorflow as tf
+
+N_MELS = 128
+WINDOW_FRAMES = 128
+EMBEDDING_DIM = 32
+LABELS = ["ambient", "breakbeat", "disco", "drum and bass", "dub", "house", "techno", "trance"]
+
+class TinyAudioTagger(tf.Module):
+    def __init__(self, seed: int = 0):
+        super().__init__()
+        rng = tf.random.Generator.from_seed(seed)
+        self.conv = tf.Variable(rng.normal([5, 5, 1, 8], stddev=0.2), name="conv")
+        self.embed = tf.Variable(rng.normal([8 * 4, EMBEDDING_DIM], stddev=0.2), name="embed")
+        self.classify = tf.Variable(rng.normal([EMBEDDING_DIM, len(LABELS)], stddev=0.5), name="classify")
+
+    @tf.function(input_signature=[tf.TensorSpec([None, N_MELS, WINDOW_FRAMES, 1], tf.float32, name="mel")])
+    def serve(self, mel):
+        # dB relative to the peak, i.e. [-80, 0], scaled to roughly [-1, 1]
+        x = mel / 40.0 + 1.0
+        x = tf.nn.relu(tf.nn.conv2d(x, self.conv, strides=4, padding="SAME"))
+        # Pool time away and mel bands into 4 coarse bands
+        x = tf.reduce_mean(x, axis=2)
+        x = tf.reshape(tf.reduce_mean(tf.reshape(x, [-1, 4, N_MELS // 16, 8]), axis=2), [-1, 4 * 8])
+        embedding = tf.math.l2_normalize(tf.matmul(x, self.embed), axis=1)
+        return {
+            'genre': tf.nn.softmax(tf.matmul(embedding, self.classify) * 4.0),
+            'embedding': embedding
+        }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default=str(Path(__file__).resolve().parent / "tiny_audio_tagger"))
+    args = parser.parse_args()
+
+    output = Path(args.output)
+    if output.exists():
+        shutil.rmtree(output)
+    model = TinyAudioTagger()
+    tf.saved_model.save(model, str(output), signatures={'serving_default': model.serve})
+    (output / "assets").mkdir(exist_ok=True)
+    (output / "assets" / "labels.txt").write_text("\n".join(LABELS) + "\n")
+    print(f"Wrote {output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,2 @@
+Իƞ逥Ϲ͕ ٴ(
+2
\ No newline at end of file
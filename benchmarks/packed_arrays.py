@@ -0,0 +1,104 @@
+"""
+Storage size and load time of feature arrays as JSON vs packed float32 columns.
+
+Builds two SQLite databases with the same synthetic audio_features rows (beat
+positions for a ~4 minute track, 13 MFCC means/variances and a 128-d embedding)
+and times the reads the similarity indexes do: a column projection over every
+row, materialized as float32 arrays.
+
+    python benchmarks/packed_arrays.py --rows 50000
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from sqlalchemy import JSON, Column, Integer, create_engine, select
+from sqlalchemy.orm import Session, declarative_base
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+from models.types import PackedArray  # noqa: E402
+
+def make_model(column_type):
+    Base = declarative_base()
+
+    class Features(Base):
+        __tablename__ = "audio_features"
+        id = Column(Integer, primary_key=True)
+        beat_positions = Column(column_type())
+        mfcc_mean = Column(column_type())
+        mfcc_var = Column(column_type())
+        embedding = Column(column_type())
+
+    return Base, Features
+
+def synthetic_rows(n: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    for i in range(n):
+        beats = np.cumsum(rng.uniform(0.45, 0.55, size=480)).astype(np.float32)
+        yield {
+            'id': i + 1,
+            'beat_positions': beats.tolist(),
+            'mfcc_mean': rng.normal(0, 20, 13).astype(np.float32).tolist(),
+            'mfcc_var': rng.uniform(0, 400, 13).astype(np.float32).tolist(),
+            'embedding': rng.normal(0, 1, 128).astype(np.float32).tolist()
+        }
+
+def run(name: str, column_type, rows: int, directory: str):
+    path = os.path.join(directory, f"{name}.db")
+    engine = create_engine(f"sqlite:///{path}")
+    Base, Features = make_model(column_type)
+    Base.metadata.create_all(engine)
+
+    start = time.perf_counter()
+    with Session(engine) as db:
+        db.execute(Features.__table__.insert(), list(synthetic_rows(rows)))
+        db.commit()
+    write_time = time.perf_counter() - start
+
+    timings = {}
+    with Session(engine) as db:
+        for column in ('mfcc_mean', 'embedding', 'beat_positions'):
+            start = time.perf_counter()
+            values = db.execute(select(getattr(Features, column))).scalars().all()
+            matrix = np.array([np.asarray(value, dtype=np.float32) for value in values])
+            timings[column] = time.perf_counter() - start
+            assert len(matrix) == rows
+
+    engine.dispose()
+    return {
+        'file_mb': os.path.getsize(path) / 1e6,
+        'write_s': write_time,
+        **{f"read_{column}_s": seconds for column, seconds in timings.items()}
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=20000)
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {
+            'json': run("json", JSON, args.rows, tmp),
+            'packed': run("packed", lambda: PackedArray("float32"), args.rows, tmp)
+        }
+
+    for name, result in results.items():
+        print(f"{name:>6}: " + ", ".join(
+            f"{key} {value:.3f}" for key, value in result.items()
+        ))
+    print("speedup: " + ", ".join(
+        f"{key} {results['json'][key] / results['packed'][key]:.1f}x"
+        for key in results['json']
+    ))
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
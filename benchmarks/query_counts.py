@@ -0,0 +1,118 @@
+"""
+SQL queries per request for the main read endpoints, with upper bounds.
+
+Migrates a fresh SQLite database, seeds files with features, metadata and tags,
+then calls each endpoint in-process through QueryCountMiddleware and reads the
+X-Query-Count header, reporting each count against the endpoint's budget
+(tests/test_query_counts.py enforces the budgets). For comparison it also
+counts what serializing the same files with lazy relationship loading costs.
+
+    python benchmarks/query_counts.py --files 200
+"""
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+from common import configure, make_app, migrate, request
+
+PAGE = 50
+
+# (path, query parameters, most queries allowed); shared with tests/test_query_counts.py
+BUDGETS = [
+    ("/api/v1/audio/files", {'limit': PAGE}, 2),  # files + metadata (joined), tags (selectin)
+    ("/api/v1/audio/similar/1", {'limit': 20, 'threshold': 0}, 4),  # source, index sync, candidates, tags
+    ("/api/v1/metadata/files/1", {}, 1),
+    ("/api/v1/metadata/search", {'query': 'track', 'limit': 20}, 2),  # ranked ids, rows
+    ("/api/v1/metadata/stats", {}, 1),
+    ("/api/v1/metadata/tags", {}, 1),
+    ("/api/v1/audio/jobs", {}, 1)
+]
+
+def seed(files: int):
+    from backend.db.session import SessionLocal
+    from backend.models.audio import AudioFeatures, AudioFile, Metadata, Tag
+
+    rng = np.random.default_rng(0)
+    db = SessionLocal()
+    try:
+        tags = [Tag(name=f"tag-{i}", category=["genre", "mood"][i % 2]) for i in range(20)]
+        db.add_all(tags)
+        for i in range(files):
+            audio_file = AudioFile(
+                path=f"/library/{i}.flac", filename=f"{i}.flac", duration=240.0,
+                sample_rate=44100, channels=2, bit_depth=16, format="flac"
+            )
+            audio_file.tags = [tags[i % 20], tags[(i * 7 + 1) % 20]]
+            db.add(audio_file)
+            db.flush()
+            db.add(AudioFeatures(
+                audio_file_id=audio_file.id, tempo=120 + i % 10, tempo_confidence=0.9,
+                beat_positions=np.arange(480, dtype=np.float32) * 0.5,
+                spectral_centroid=2000.0, spectral_rolloff=4000.0, spectral_bandwidth=1500.0,
+                mfcc_mean=rng.normal(0, 20, 13).astype(np.float32),
+                mfcc_var=rng.uniform(0, 400, 13).astype(np.float32),
+                key="A", key_confidence=0.8
+            ))
+            db.add(Metadata(audio_file_id=audio_file.id, title=f"Track {i}", artist=f"Artist {i % 30}"))
+        db.commit()
+    finally:
+        db.close()
+
+def lazy_listing_queries() -> int:
+    """Queries to serialize a page of files the way the endpoints used to: lazy relationships"""
+    from backend.db.instrumentation import count_queries
+    from backend.db.session import SessionLocal
+    from backend.models.audio import AudioFile
+    from backend.schemas.audio import AudioFile as AudioFileSchema
+
+    db = SessionLocal()
+    try:
+        with count_queries() as stats:
+            for audio_file in db.query(AudioFile).order_by(AudioFile.id).limit(PAGE).all():
+                AudioFileSchema.model_validate(audio_file)
+        return stats.count
+    finally:
+        db.close()
+
+async def run() -> list:
+    app = make_app(count_queries=True)
+    # Warm up: the first similarity query loads the feature index
+    await request(app, "GET", "/api/v1/audio/similar/1")
+    results = []
+    for path, params, budget in BUDGETS:
+        response = await request(app, "GET", path, params)
+        results.append({
+            'path': path, 'status': response.status, 'budget': budget,
+            'queries': int(response.headers['x-query-count']), 'query_ms': float(response.headers['x-query-time-ms'])
+        })
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--files", type=int, default=200)
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        configure(os.path.join(tmp, "queries"))
+        migrate()
+        seed(args.files)
+        results = asyncio.run(run())
+        lazy = lazy_listing_queries()
+
+    for result in results:
+        ok = result['status'] == 200 and result['queries'] <= result['budget']
+        print(f"{'ok' if ok else 'over':>4} {result['path']:<28} {result['queries']:3d} queries "
+              f"(budget {result['budget']}), {result['query_ms']:.2f} ms, status {result['status']}")
+    print(f"lazy loading a page of {PAGE} files for comparison: {lazy} queries")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps({'endpoints': results, 'lazy_listing_queries': lazy}, indent=2))
+
+if __name__ == "__main__":
+    main()
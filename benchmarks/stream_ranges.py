@@ -0,0 +1,127 @@
+"""
+Seek latency and bytes transferred for /audio/stream, before and after range support.
+
+Drives the ASGI responses in-process (no network) against a synthetic file:
+"before" is the original 8 KB StreamingResponse generator, which ignores Range,
+so a seek has to read from byte zero up to the target window; "after" is
+RangeFileResponse answering a single Range request per seek.
+
+    python benchmarks/stream_ranges.py --size-mb 200 --seeks 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from starlette.datastructures import Headers
+from starlette.responses import StreamingResponse
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "backend"))
+from api.v1.responses import RangeFileResponse  # noqa: E402
+
+WINDOW = 256 * 1024  # Bytes a player needs after seeking
+
+def legacy_response(path: str, headers: Headers):
+    def iterfile():
+        with open(path, 'rb') as f:
+            while chunk := f.read(8192):
+                yield chunk
+    return StreamingResponse(iterfile(), media_type="audio/flac")
+
+def range_response(path: str, headers: Headers):
+    return RangeFileResponse(path, headers, media_type="audio/flac")
+
+async def fetch(make_response, path: str, headers: dict, stop_after: int = None):
+    """Run one request; returns (status, bytes received, seconds). Stops reading after stop_after bytes."""
+    scope = {"type": "http", "method": "GET", "headers": [], "extensions": {}}
+    received = 0
+    status = None
+
+    class Done(Exception):
+        pass
+
+    disconnected = asyncio.Event()
+
+    async def receive():
+        # StreamingResponse listens for a disconnect while streaming; never send one
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal received, status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            received += len(message.get("body", b""))
+            if stop_after is not None and received >= stop_after:
+                raise Done()
+
+    start = time.perf_counter()
+    try:
+        await make_response(path, Headers(headers))(scope, receive, send)
+    except Exception as exc:
+        # The client stopped reading; StreamingResponse wraps this in an exception group
+        if not isinstance(exc, Done) and not all(isinstance(e, Done) for e in getattr(exc, "exceptions", [None])):
+            raise
+    return status, received, time.perf_counter() - start
+
+async def run(size_mb: int, seeks: int, seed: int):
+    rng = random.Random(seed)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "track.flac")
+        with open(path, "wb") as f:
+            for _ in range(size_mb):
+                f.write(os.urandom(1024 * 1024))
+        size = os.path.getsize(path)
+        offsets = [rng.randrange(0, size - WINDOW) for _ in range(seeks)]
+
+        results = {}
+        for name, make_response in (("before", legacy_response), ("after", range_response)):
+            times, transferred = [], 0
+            for offset in offsets:
+                headers = {"range": f"bytes={offset}-{offset + WINDOW - 1}"}
+                # Without range support the client must read up to the end of the window
+                stop_after = offset + WINDOW if name == "before" else None
+                status, received, elapsed = await fetch(make_response, path, headers, stop_after)
+                times.append(elapsed)
+                transferred += received
+            _, full_bytes, full_time = await fetch(make_response, path, {})
+            results[name] = {
+                "seek_mean_ms": 1000 * sum(times) / len(times),
+                "seek_max_ms": 1000 * max(times),
+                "seek_bytes_total": transferred,
+                "full_download_mb_s": full_bytes / full_time / 1e6,
+                "seek_status": status
+            }
+
+        _, _, conditional = await fetch(range_response, path, {"if-none-match": RangeFileResponse(path, Headers({})).etag})
+        results["after"]["revalidate_ms"] = 1000 * conditional
+        return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size-mb", type=int, default=100)
+    parser.add_argument("--seeks", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Write results to this file")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args.size_mb, args.seeks, args.seed))
+    for name, result in results.items():
+        print(
+            f"{name:>6}: seek mean {result['seek_mean_ms']:8.2f} ms, max {result['seek_max_ms']:8.2f} ms, "
+            f"{result['seek_bytes_total'] / 1e6:9.1f} MB for {args.seeks} seeks (status {result['seek_status']}), "
+            f"full download {result['full_download_mb_s']:7.1f} MB/s"
+        )
+    print(f"revalidation (304): {results['after']['revalidate_ms']:.2f} ms")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,301 @@
+"""
+Benchmark suite: analysis, similarity, search, stats and streaming, with a
+stored baseline to catch regressions.
+
+Analyzes deterministic synthetic WAV files (a chord, a pulse and noise) of
+each --durations length with AudioAnalyzer.analyze_file, in-process and
+without the genre model. Then, for each --rows size, seeds a fresh SQLite
+database (migrated to head, so the search index and summary triggers are
+live) with that many files, each with features and metadata, and times
+/audio/similar (the first request, which loads the feature index, and warm
+ones), /metadata/search, /metadata/stats and /audio/stream (whole file and
+single ranges) through the API in-process.
+
+Each case reports the median, p95 and fastest of --repeat runs. With
+--baseline, medians are compared against a previous --json output and the
+script exits non-zero if any case got slower than its threshold allows;
+--save-baseline writes this run as the new baseline. Timings only compare
+on the same machine, so keep one baseline per machine (or CI runner type).
+
+    python benchmarks/suite.py --rows 10000 100000 1000000 --json results.json
+    python benchmarks/suite.py --baseline benchmarks/baseline.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+from common import ROOT, SR, configure, make_app, migrate, request, synthesize
+
+SEED_CHUNK = 50000
+STREAM_SECONDS = 300   # Length of the file served by the stream cases
+RANGE_BYTES = 256 * 1024
+KEYS = ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B']
+GENRES = ["Techno", "House", "Ambient", "Drum & Bass", "Jazz", None]
+
+# Allowed slowdown of the median before a case counts as a regression, by case
+# prefix; the analysis is long and steady, the millisecond requests are noisier
+THRESHOLDS = {
+    'analyze_file': 0.25,
+    'similar': 0.5,
+    'search': 0.5,
+    'stats': 0.5,
+    'stream': 0.5
+}
+# Differences below this are noise whatever the ratio
+MIN_REGRESSION_MS = 1.0
+
+def summarize(times: List[float]) -> Dict[str, float]:
+    ms = np.array(times) * 1000
+    return {
+        'runs': len(ms),
+        'p50_ms': round(float(np.median(ms)), 3),
+        'p95_ms': round(float(np.percentile(ms, 95)), 3),
+        'min_ms': round(float(ms.min()), 3)
+    }
+
+def measure(fn: Callable, repeat: int, warmup: int = 1) -> List[float]:
+    for _ in range(warmup):
+        fn()
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return times
+
+def write_wav(path: str, duration: float, seed: int = 0) -> str:
+    import soundfile as sf
+    sf.write(path, synthesize(duration, seed=seed), SR, subtype="PCM_16")
+    return path
+
+def bench_analysis(directory: str, durations: List[float], repeat: int) -> Dict[str, dict]:
+    from backend.core.audio.analyzer import AudioAnalyzer
+
+    analyzer = AudioAnalyzer(load_model=False)
+    results = {}
+    for duration in durations:
+        path = write_wav(os.path.join(directory, f"analysis-{duration:g}.wav"), duration)
+        stages: Dict[str, List[float]] = {}
+
+        def analyze():
+            features = asyncio.run(analyzer.analyze_file(path))
+            for name, stage in features['timings']['stages'].items():
+                if 'wall_ms' in stage:
+                    stages.setdefault(name, []).append(stage['wall_ms'])
+
+        # The warm-up run compiles librosa's numba code paths
+        result = summarize(measure(analyze, repeat))
+        result['stages_p50_ms'] = {name: float(np.median(values)) for name, values in stages.items()}
+        results[f"analyze_file/{duration:g}s"] = result
+    return results
+
+def seed(engine, rows: int, start_id: int = 1, seed: int = 0) -> float:
+    """Insert files `start_id`.. with features and metadata; returns the seconds spent"""
+    rng = np.random.default_rng(seed + start_id)
+    elapsed = 0.0
+    for chunk_start in range(start_id, start_id + rows, SEED_CHUNK):
+        ids = np.arange(chunk_start, min(chunk_start + SEED_CHUNK, start_id + rows))
+        n = len(ids)
+        tempo = rng.uniform(70, 180, n)
+        spectral = rng.uniform([500, 1000, 500], [5000, 9000, 3000], (n, 3))
+        mfcc_mean = rng.normal(0, 20, (n, 13)).astype("<f4")
+        mfcc_var = rng.uniform(0, 400, (n, 13)).astype("<f4")
+        keys = rng.integers(0, len(KEYS), n)
+        genres = rng.integers(0, len(GENRES), n)
+        beats = (np.arange(480, dtype="<f4") * 0.5).tobytes()
+        files = [{'id': int(i), 'path': f"/library/{i}.flac", 'filename': f"{i}.flac"} for i in ids]
+        features = [{
+            'id': int(i), 'audio_file_id': int(i), 'tempo': float(tempo[j]), 'tempo_confidence': 0.9,
+            'beat_positions': beats, 'spectral_centroid': float(spectral[j, 0]), 'spectral_rolloff': float(spectral[j, 1]),
+            'spectral_bandwidth': float(spectral[j, 2]), 'mfcc_mean': mfcc_mean[j].tobytes(),
+            'mfcc_var': mfcc_var[j].tobytes(), 'key': KEYS[keys[j]], 'key_confidence': 0.8
+        } for j, i in enumerate(ids)]
+        metadata = [{
+            'id': int(i), 'audio_file_id': int(i), 'title': f"Track {i}", 'artist': f"Artist {i % 5000}",
+            'album': f"Album {i % 20000}", 'genre': GENRES[genres[j]], 'bpm': round(float(tempo[j]), 1)
+        } for j, i in enumerate(ids)]
+        start = time.perf_counter()
+        with engine.begin() as connection:
+            connection.exec_driver_sql(
+                "INSERT INTO audio_files (id, path, filename, duration, sample_rate, channels, bit_depth, format, "
+                "created_at, updated_at) VALUES (:id, :path, :filename, 240.0, 44100, 2, 16, 'flac', "
+                "CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)", files
+            )
+            connection.exec_driver_sql(
+                "INSERT INTO audio_features (id, audio_file_id, tempo, tempo_confidence, beat_positions, "
+                "spectral_centroid, spectral_rolloff, spectral_bandwidth, mfcc_mean, mfcc_var, key, key_confidence) "
+                "VALUES (:id, :audio_file_id, :tempo, :tempo_confidence, :beat_positions, :spectral_centroid, "
+                ":spectral_rolloff, :spectral_bandwidth, :mfcc_mean, :mfcc_var, :key, :key_confidence)", features
+            )
+            connection.exec_driver_sql(
+                "INSERT INTO metadata (id, audio_file_id, title, artist, album, genre, bpm, last_updated) "
+                "VALUES (:id, :audio_file_id, :title, :artist, :album, :genre, :bpm, CURRENT_TIMESTAMP)", metadata
+            )
+        elapsed += time.perf_counter() - start
+    return elapsed
+
+def point_at(engine, file_id: int, path: str):
+    """Make file_id stream the given file"""
+    with engine.begin() as connection:
+        connection.exec_driver_sql(
+            "UPDATE audio_files SET path = :path, format = 'wav' WHERE id = :id", {'path': path, 'id': file_id}
+        )
+
+async def get(app, path: str, params: Optional[dict] = None, headers: Optional[dict] = None):
+    response = await request(app, "GET", path, params, headers=headers)
+    if response.status not in (200, 206):
+        raise RuntimeError(f"GET {path} returned {response.status}: {response.body[:200]}")
+    return response
+
+def bench_requests(app, rows: int, stream_file: str, repeat: int) -> Dict[str, dict]:
+    from backend.api.v1.endpoints import audio
+    from backend.core.similarity.feature_index import FeatureIndex
+
+    rng = np.random.default_rng(rows)
+    ids = iter(rng.integers(1, rows + 1, 10 * repeat + 10))
+    stream_size = os.path.getsize(stream_file)
+    offsets = iter(rng.integers(0, stream_size - RANGE_BYTES, 10 * repeat + 10))
+
+    def call(path: str, params: Optional[dict] = None, headers: Optional[dict] = None):
+        return lambda: asyncio.run(get(app, path, params, headers))
+
+    def seek():
+        offset = int(next(offsets))
+        call("/api/v1/audio/stream/1", headers={'range': f"bytes={offset}-{offset + RANGE_BYTES - 1}"})()
+
+    def first_similar():
+        # A new index, so the request loads every row from the database
+        audio.feature_index = FeatureIndex()
+        call("/api/v1/audio/similar/1", {'limit': 10, 'threshold': 0})()
+
+    results = {f"similar_first_request@{rows}": summarize(measure(first_similar, max(3, repeat // 4), warmup=0))}
+    cases = {
+        'similar': lambda: call(f"/api/v1/audio/similar/{next(ids)}", {'limit': 10, 'threshold': 0})(),
+        'search/word': call("/api/v1/metadata/search", {'query': "artist 42", 'limit': 20}),
+        'search/prefix': call("/api/v1/metadata/search", {'query': "alb", 'limit': 20}),
+        'search/field': call("/api/v1/metadata/search", {'query': "techno", 'field': "genre", 'limit': 20}),
+        'stats': call("/api/v1/metadata/stats"),
+        'stats/exact': call("/api/v1/metadata/stats", {'exact': "true"}),
+        'stream/whole_file': call("/api/v1/audio/stream/1"),
+        'stream/range': seek
+    }
+    for name, fn in cases.items():
+        results[f"{name}@{rows}"] = summarize(measure(fn, repeat))
+    return results
+
+def environment() -> Dict[str, object]:
+    import librosa
+    import sqlite3
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'machine': platform.machine(),
+        'platform': platform.platform(),
+        'processor': platform.processor(),
+        'cpus': os.cpu_count(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'librosa': librosa.__version__,
+        'sqlite': sqlite3.sqlite_version,
+        'commit': commit
+    }
+
+def threshold_for(case: str, override: Optional[float]) -> float:
+    if override is not None:
+        return override
+    return next((value for prefix, value in THRESHOLDS.items() if case.startswith(prefix)), 0.25)
+
+def compare(results: dict, baseline: dict, override: Optional[float]) -> List[str]:
+    """Print each case against the baseline; returns the regressed cases"""
+    for key in ('machine', 'cpus', 'python'):
+        if results['environment'].get(key) != baseline['environment'].get(key):
+            print(f"Warning: baseline was recorded with {key}={baseline['environment'].get(key)!r}, "
+                  f"this run has {results['environment'].get(key)!r}; timings may not compare")
+    regressions = []
+    for case, result in results['cases'].items():
+        before = baseline['cases'].get(case)
+        if before is None:
+            print(f"{case:36s} {result['p50_ms']:10.2f} ms  (not in baseline)")
+            continue
+        threshold = threshold_for(case, override)
+        ratio = result['p50_ms'] / before['p50_ms'] if before['p50_ms'] else float('inf')
+        regressed = ratio > 1 + threshold and result['p50_ms'] - before['p50_ms'] > MIN_REGRESSION_MS
+        print(f"{case:36s} {result['p50_ms']:10.2f} ms  baseline {before['p50_ms']:10.2f} ms  "
+              f"{ratio:5.2f}x" + (f"  REGRESSION (> {1 + threshold:.2f}x)" if regressed else ""))
+        if regressed:
+            regressions.append(case)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, nargs="+", default=[10000], help="Seeded library sizes")
+    parser.add_argument("--durations", type=float, nargs="+", default=[30, 120], help="Seconds of audio to analyze")
+    parser.add_argument("--repeat", type=int, default=20, help="Runs per request case")
+    parser.add_argument("--analysis-repeat", type=int, default=3, help="Runs per analysis case")
+    parser.add_argument("--skip-analysis", action="store_true")
+    parser.add_argument("--json", help="Write results to this file")
+    parser.add_argument("--baseline", help="Compare against this earlier --json output")
+    parser.add_argument("--threshold", type=float, help="Allowed slowdown for every case, e.g. 0.25 for 25%%")
+    parser.add_argument("--save-baseline", help="Write this run to this file as the new baseline")
+    args = parser.parse_args()
+
+    results = {
+        'environment': None,
+        'parameters': {
+            'rows': sorted(args.rows), 'durations': args.durations,
+            'repeat': args.repeat, 'analysis_repeat': args.analysis_repeat
+        },
+        'seed_seconds': {},
+        'cases': {}
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        configure(os.path.join(tmp, "suite"))
+        migrate()
+        from backend.db.session import engine
+        results['environment'] = environment()
+
+        if not args.skip_analysis:
+            results['cases'].update(bench_analysis(tmp, args.durations, args.analysis_repeat))
+
+        app = make_app()
+        stream_file = write_wav(os.path.join(tmp, "stream.wav"), STREAM_SECONDS, seed=1)
+        seeded = 0
+        for rows in sorted(args.rows):
+            results['seed_seconds'][str(rows)] = seed(engine, rows - seeded, start_id=seeded + 1)
+            if not seeded:
+                point_at(engine, 1, stream_file)
+            seeded = rows
+            results['cases'].update(bench_requests(app, rows, stream_file, args.repeat))
+        engine.dispose()
+
+    for case, result in results['cases'].items():
+        print(f"{case:36s} p50 {result['p50_ms']:10.2f} ms  p95 {result['p95_ms']:10.2f} ms  "
+              f"min {result['min_ms']:10.2f} ms")
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(results, indent=2))
+    if args.save_baseline:
+        Path(args.save_baseline).write_text(json.dumps(results, indent=2) + "\n")
+    if args.baseline:
+        regressions = compare(results, json.loads(Path(args.baseline).read_text()), args.threshold)
+        if regressions:
+            print(f"{len(regressions)} case(s) regressed: {', '.join(regressions)}")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""
+Shared setup: every test runs against one migrated SQLite database in a
+temporary directory, configured through the benchmark helpers before any
+backend module is imported.
+"""
+import os
+import shutil
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "benchmarks"))
+from common import configure, make_app, migrate  # noqa: E402
+
+TMP = tempfile.mkdtemp(prefix="ammms-tests-")
+configure(
+    os.path.join(TMP, "test.db"),
+    REDIS_HOST="127.0.0.1",
+    AUDIO_FORMATS='["wav", "flac", "mp3"]',
+    MAX_UPLOAD_SIZE=str(100 * 2 ** 20),
+    TEMP_DIR=os.path.join(TMP, "tmp"),
+    UPLOAD_DIR=os.path.join(TMP, "uploads"),
+    WAVEFORM_DIR=os.path.join(TMP, "waveforms"),
+    ANALYSIS_CACHE_DIR=os.path.join(TMP, "analysis-cache")
+)
+
+@pytest.fixture(scope="session", autouse=True)
+def database():
+    migrate()
+    yield
+    from backend.db.session import engine
+    engine.dispose()
+    shutil.rmtree(TMP, ignore_errors=True)
+
+@pytest.fixture(scope="session")
+def app(database):
+    return make_app()
+
+@pytest.fixture(scope="session")
+def counting_app(database):
+    return make_app(count_queries=True)
@@ -0,0 +1,54 @@
+import asyncio
+
+import pytest
+from redis.exceptions import ConnectionError as RedisConnectionError, DataError
+
+FEATURES = {'tempo': 120.0, 'key': "A", 'timings': {'decodes': 1}}
+
+class FakeRedis:
+    def __init__(self, down: bool = False):
+        self.down = down
+        self.values = {}
+        self.expiry = {}
+
+    async def get(self, key):
+        if self.down:
+            raise RedisConnectionError("down")
+        return self.values.get(key)
+
+    async def set(self, key, value, ex=None):
+        if self.down:
+            raise RedisConnectionError("down")
+        if ex is not None and ex <= 0:
+            # As redis-py does for ex=0
+            raise DataError("ex must be a positive integer")
+        self.values[key] = value
+        self.expiry[key] = ex
+
+@pytest.fixture
+def make_cache(tmp_path):
+    from backend.core.cache.analysis_cache import AnalysisCache
+
+    def make(ttl: int, redis_down: bool):
+        cache = AnalysisCache(analyzer_version="test", ttl=ttl, directory=str(tmp_path))
+        cache.redis = FakeRedis(down=redis_down)
+        return cache
+
+    return make
+
+@pytest.mark.parametrize("redis_down", [False, True], ids=["redis", "disk"])
+def test_zero_ttl_never_expires(make_cache, redis_down):
+    cache = make_cache(ttl=0, redis_down=redis_down)
+    asyncio.run(cache.set("ab" * 32, FEATURES))
+    assert asyncio.run(cache.get("ab" * 32)) == {'tempo': 120.0, 'key': "A"}
+    if not redis_down:
+        assert list(cache.redis.expiry.values()) == [None]
+
+def test_disk_entries_expire_after_ttl(make_cache):
+    import os
+
+    cache = make_cache(ttl=60, redis_down=True)
+    asyncio.run(cache.set("cd" * 32, FEATURES))
+    path = cache._disk_path("cd" * 32)
+    os.utime(path, (path.stat().st_atime, path.stat().st_mtime - 120))
+    assert asyncio.run(cache.get("cd" * 32)) is None
@@ -0,0 +1,70 @@
+import asyncio
+import io
+
+import pytest
+
+from common import SR, request, synthesize
+
+BOUNDARY = "ammms-test-boundary"
+
+class FakeEnricher:
+    """Stands in for the provider lookups, which need network access and API keys"""
+
+    async def enrich_metadata(self, basic_metadata, genre_prediction=None, revalidate=False):
+        return {'title': basic_metadata.get('filename'), 'primary_source': None}
+
+@pytest.fixture
+def analyze(app, monkeypatch):
+    """POST a synthetic WAV to /audio/analyze, analyzing in-process instead of in worker processes"""
+    import soundfile as sf
+    from backend.api.v1.endpoints import audio
+    from backend.core.audio.analyzer import AudioAnalyzer
+
+    analyzer = AudioAnalyzer(load_model=False)
+    monkeypatch.setattr(audio, "get_analyzer", lambda: analyzer)
+    monkeypatch.setattr(audio, "get_enricher", FakeEnricher)
+
+    def post(seconds: float = 5, seed: int = 0, profile: bool = False):
+        wav = io.BytesIO()
+        sf.write(wav, synthesize(seconds, seed=seed), SR, format="WAV", subtype="PCM_16")
+        body = (
+            f"--{BOUNDARY}\r\nContent-Disposition: form-data; name=\"file\"; filename=\"test-{seed}.wav\"\r\n"
+            f"Content-Type: audio/wav\r\n\r\n".encode() + wav.getvalue() + f"\r\n--{BOUNDARY}--\r\n".encode()
+        )
+        return asyncio.run(request(
+            app, "POST", "/api/v1/audio/analyze", params={'profile': "true"} if profile else None, body=body,
+            headers={'content-type': f"multipart/form-data; boundary={BOUNDARY}"}
+        ))
+
+    return post
+
+def test_analyze_returns_features_and_timings(analyze):
+    response = analyze(seed=1)
+    assert response.status == 200, response.body[:500]
+    result = response.json()
+    assert result['features']['tempo'] > 0
+    assert len(result['features']['mfcc_mean']) == 13
+    assert result['metadata']['title'] == "test-1.wav"
+    assert result['timings']['decodes'] == 1
+    assert {'load', 'tempo', 'mfcc', 'fingerprint'} <= set(result['timings']['stages'])
+    assert result['profile'] is None
+
+def test_analyze_with_profile(analyze):
+    response = analyze(seed=2, profile=True)
+    assert response.status == 200, response.body[:500]
+    profile = response.json()['profile']
+    assert profile
+    assert {'function', 'calls', 'own_ms', 'cumulative_ms'} <= set(profile[0])
+
+def test_cached_analysis_skips_decoding(analyze):
+    first = analyze(seed=3)
+    assert first.status == 200, first.body[:500]
+    timings = first.json()['timings']
+    assert timings['decodes'] == 1
+    assert 'wall_ms' in timings['stages']['fingerprint']
+
+    # Same bytes again: features come from the cache and the waveform already exists
+    second = analyze(seed=3)
+    assert second.status == 200, second.body[:500]
+    assert second.json()['timings'] == {'decodes': 0, 'cached': True}
+    assert second.json()['features'] == first.json()['features']
@@ -0,0 +1,30 @@
+"""
+Startup budget of an API worker: importing the routers must not pull in the
+analysis stack or provider clients, and must stay within the time and memory
+budgets of benchmarks/api_startup.py.
+"""
+import os
+import statistics
+
+import pytest
+
+from api_startup import BUDGET_MB, BUDGET_MS, deferred_loaded, start_worker
+from common import REQUIRED_SETTINGS
+
+RUNS = 3
+
+@pytest.fixture(scope="module")
+def env():
+    return {**REQUIRED_SETTINGS, **os.environ}
+
+def test_heavy_modules_are_not_imported_at_startup(env):
+    _, imports = start_worker(env, importtime=True)
+    assert imports, "python -X importtime reported no imports"
+    assert deferred_loaded(name for _, name in imports) == []
+
+def test_startup_within_budget(env):
+    runs = [start_worker(env)[0] for _ in range(RUNS)]
+    assert 1000 * statistics.median(run['seconds'] for run in runs) <= BUDGET_MS
+    rss = [run['rss_bytes'] for run in runs if run['rss_bytes'] is not None]
+    if rss:
+        assert max(rss) / 2 ** 20 <= BUDGET_MB
@@ -0,0 +1,97 @@
+import threading
+
+import numpy as np
+
+def make_index(seed: int, size: int = 200, dim: int = 16):
+    from backend.core.similarity.embedding_index import EmbeddingIndex
+
+    index = EmbeddingIndex()
+    vectors = np.random.default_rng(seed).standard_normal((size, dim)).astype(np.float32)
+    index.build(list(range(seed * size, (seed + 1) * size)), vectors)
+    return index
+
+def test_concurrent_saves_leave_one_complete_file(tmp_path):
+    from backend.core.similarity.embedding_index import EmbeddingIndex
+
+    # Two processes holding their own index used to share one fixed temp path
+    path = tmp_path / "embeddings.npz"
+    indexes = [make_index(seed) for seed in range(4)]
+    errors = []
+
+    def save(index):
+        try:
+            for _ in range(10):
+                index.save(str(path))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=save, args=(index,)) for index in indexes]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    assert [p.name for p in tmp_path.iterdir()] == ["embeddings.npz"]
+    loaded = EmbeddingIndex()
+    assert loaded.load_file(str(path))
+    assert len(loaded) == 200
+
+def test_quantizer_is_retrained_as_the_index_grows(monkeypatch):
+    from backend.core.similarity.embedding_index import EmbeddingIndex
+
+    monkeypatch.setattr(EmbeddingIndex, "MIN_TRAIN_SIZE", 256)
+    index = EmbeddingIndex()
+    vectors = np.random.default_rng(0).standard_normal((5000, 8)).astype(np.float32)
+    nlists = set()
+    for file_id, vector in enumerate(vectors):
+        index.add(file_id, vector)
+        if index.trained:
+            nlists.add(len(index._centroids))
+
+    # Trained at 256 vectors, then retrained at each fourfold growth
+    assert sorted(nlists) == [16, 32, 64]
+    sizes = [len(positions) for positions in index._lists]
+    assert sum(sizes) == len(index) == 5000
+    assert np.mean(sizes) <= EmbeddingIndex.RETRAIN_FACTOR * len(sizes)
+    assert max(sizes) < 5000 / 16
+
+def test_loaded_index_is_retrained_when_too_coarse(tmp_path, monkeypatch):
+    from backend.core.similarity.embedding_index import EmbeddingIndex
+
+    monkeypatch.setattr(EmbeddingIndex, "MIN_TRAIN_SIZE", 256)
+    index = EmbeddingIndex()
+    index.build(list(range(1000)), np.random.default_rng(1).standard_normal((1000, 8)), nlist=4)
+    index.save(str(tmp_path / "embeddings.npz"))
+
+    loaded = EmbeddingIndex()
+    assert loaded.load_file(str(tmp_path / "embeddings.npz"))
+    assert len(loaded._centroids) == 31
+    assert sum(len(positions) for positions in loaded._lists) == 1000
+
+def test_sync_picks_up_embeddings_written_elsewhere():
+    from backend.core.similarity.embedding_index import EmbeddingIndex
+    from backend.db.session import SessionLocal
+    from backend.models.audio import AudioFeatures, AudioFile
+
+    def write(name: str, embedding):
+        # Stands in for a bulk ingestion worker, which writes through its own session
+        with SessionLocal() as db:
+            audio_file = AudioFile(path=f"/sync/{name}", filename=name)
+            db.add(audio_file)
+            db.flush()
+            db.add(AudioFeatures(audio_file_id=audio_file.id, embedding=embedding))
+            db.commit()
+            return audio_file.id
+
+    first = write("first.wav", [1.0, 0.0, 0.0, 0.0])
+    index = EmbeddingIndex()
+    with SessionLocal() as db:
+        index.ensure_loaded(db)
+    assert first in index
+
+    second = write("second.wav", [0.0, 1.0, 0.0, 0.0])
+    with SessionLocal() as db:
+        index.ensure_loaded(db)
+    assert second in index
+    assert index.search([0.0, 1.0, 0.0, 0.0], limit=1)[0][0] == second
@@ -0,0 +1,36 @@
+import asyncio
+
+import pytest
+
+@pytest.fixture
+def enricher():
+    from backend.core.cache.metadata_cache import MetadataCache
+    from backend.core.metadata.enricher import MetadataEnricher
+
+    cache = MetadataCache()
+    # Memory only, so entries left in a local Redis by earlier runs cannot answer lookups
+    cache._redis_down_until = float('inf')
+    enricher = MetadataEnricher(cache=cache)
+    enricher.queries = []
+
+    async def query(metadata):
+        enricher.queries.append((metadata.get('artist'), metadata.get('title')))
+        return {}
+
+    for provider in ("musicbrainz", "discogs", "lastfm"):
+        setattr(enricher, f"_query_{provider}", query)
+    return enricher
+
+def test_filename_only_lookups_are_cached(enricher):
+    async def enrich_twice():
+        for _ in range(2):
+            await enricher.enrich_metadata({'filename': "01 - Aphex Twin - Xtal.wav"})
+
+    asyncio.run(enrich_twice())
+    # One query per provider, with artist and title parsed from the filename
+    assert enricher.queries == [("Aphex Twin", "Xtal")] * 3
+    assert enricher.cache.counters['hits'] == 3
+
+def test_tags_take_precedence_over_filename(enricher):
+    asyncio.run(enricher.enrich_metadata({'filename': "track01.wav", 'artist': "Autechre", 'title': None}))
+    assert enricher.queries == [("Autechre", None)] * 3
@@ -0,0 +1,54 @@
+import asyncio
+import threading
+
+from common import request
+
+def test_ingest_job_scans_off_the_event_loop(app, monkeypatch, tmp_path):
+    from backend.api.v1.endpoints import jobs
+    from backend.tasks import ingest
+
+    for name in ("a.wav", "b.flac", "notes.txt"):
+        (tmp_path / name).write_bytes(b"")
+    threads, dispatched = [], []
+
+    def discover(directory, recursive=True):
+        threads.append(threading.current_thread())
+        return ingest.discover_audio_files(directory, recursive)
+
+    monkeypatch.setattr(jobs, "discover_audio_files", discover)
+    monkeypatch.setattr(jobs, "dispatch_ingest_job", lambda job_id, paths: dispatched.append((job_id, paths)))
+
+    async def create():
+        loop_thread = threading.current_thread()
+        response = await request(app, "POST", "/api/v1/audio/jobs", body={'directory': str(tmp_path)})
+        return loop_thread, response
+
+    loop_thread, response = asyncio.run(create())
+    assert response.status == 202, response.body[:500]
+    assert response.json()['total'] == 2
+    assert [paths for _, paths in dispatched] == [[str(tmp_path / "a.wav"), str(tmp_path / "b.flac")]]
+    # The directory walk must not block the event loop
+    assert threads and threads[0] is not loop_thread
+
+def test_refresh_job_dispatches_off_the_event_loop(app, monkeypatch):
+    from backend.api.v1.endpoints import metadata
+    from backend.db.session import SessionLocal
+    from backend.models.audio import AudioFile, Metadata
+
+    with SessionLocal() as db:
+        audio_file = AudioFile(path="/refresh/track.wav", filename="track.wav")
+        db.add(audio_file)
+        db.flush()
+        db.add(Metadata(audio_file_id=audio_file.id, title="Track"))
+        db.commit()
+    threads = []
+    monkeypatch.setattr(metadata, "dispatch_refresh_job", lambda job_id: threads.append(threading.current_thread()))
+
+    async def create():
+        loop_thread = threading.current_thread()
+        response = await request(app, "POST", "/api/v1/metadata/refresh", body={'filter': {}})
+        return loop_thread, response
+
+    loop_thread, response = asyncio.run(create())
+    assert response.status == 202, response.body[:500]
+    assert threads and threads[0] is not loop_thread
@@ -0,0 +1,44 @@
+import asyncio
+
+import pytest
+
+from test_analysis_cache import FakeRedis
+
+@pytest.fixture
+def make_cache():
+    from backend.core.cache.metadata_cache import MetadataCache
+
+    def make(ttl: int, stale_ttl: int = 0):
+        cache = MetadataCache(ttl=ttl, negative_ttl=ttl, stale_ttl=stale_ttl, max_entries=100)
+        cache.redis = FakeRedis()
+        return cache
+
+    return make
+
+def lookups(cache, times: int = 3):
+    calls = []
+
+    async def loader():
+        calls.append(1)
+        return {'source': "musicbrainz", 'title': "Xtal"}
+
+    async def run():
+        for _ in range(times):
+            await cache.fetch("musicbrainz", "Aphex Twin", "Xtal", loader)
+        # Let any background revalidation finish
+        await asyncio.sleep(0)
+
+    asyncio.run(run())
+    return len(calls)
+
+def test_zero_ttl_never_expires(make_cache):
+    cache = make_cache(ttl=0)
+    assert lookups(cache) == 1
+    assert cache.counters['stale_hits'] == 0
+    assert cache.counters['redis_errors'] == 0
+    assert list(cache.redis.expiry.values()) == [None]
+
+def test_positive_ttl_expires_in_redis(make_cache):
+    cache = make_cache(ttl=60, stale_ttl=30)
+    assert lookups(cache) == 1
+    assert list(cache.redis.expiry.values()) == [90]
@@ -0,0 +1,39 @@
+import asyncio
+import threading
+
+import pytest
+
+@pytest.fixture
+def clients():
+    from backend.core.metadata.clients import MetadataClients
+
+    return MetadataClients(pool_size=2, timeout=5, sdk_threads=1)
+
+async def get_session(clients):
+    return clients._get_session()
+
+def test_session_of_an_idle_loop_is_closed_on_loop_change(clients):
+    # A worker's own loop, idle between tasks
+    worker_loop = asyncio.new_event_loop()
+    try:
+        old = worker_loop.run_until_complete(get_session(clients))
+        new = asyncio.run(get_session(clients))
+        assert old.closed
+        assert new is not old and not new.closed
+    finally:
+        worker_loop.close()
+
+def test_session_of_a_running_loop_is_closed_there(clients):
+    other_loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=other_loop.run_forever)
+    thread.start()
+    try:
+        old = asyncio.run_coroutine_threadsafe(get_session(clients), other_loop).result(5)
+        asyncio.run(get_session(clients))
+        # The close was scheduled on the loop that owns the session
+        asyncio.run_coroutine_threadsafe(asyncio.sleep(0.05), other_loop).result(5)
+        assert old.closed
+    finally:
+        other_loop.call_soon_threadsafe(other_loop.stop)
+        thread.join()
+        other_loop.close()
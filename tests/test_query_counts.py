@@ -0,0 +1,39 @@
+"""
+Upper bounds on SQL queries per request for the main read endpoints; an
+N+1 regression shows up as a count that grows past its budget.
+"""
+import asyncio
+
+import pytest
+
+from common import request
+from query_counts import BUDGETS, seed
+
+FILES = 60
+
+@pytest.fixture(scope="module")
+def seeded(counting_app):
+    seed(FILES)
+    # The first similarity query loads the feature index
+    asyncio.run(request(counting_app, "GET", "/api/v1/audio/similar/1"))
+    return counting_app
+
+@pytest.mark.parametrize("path, params, budget", BUDGETS, ids=[path for path, _, _ in BUDGETS])
+def test_query_budget(seeded, path, params, budget):
+    response = asyncio.run(request(seeded, "GET", path, params))
+    assert response.status == 200, response.body[:500]
+    assert int(response.headers['x-query-count']) <= budget
+
+def test_eager_loads_use_foreign_key_indexes(seeded):
+    from sqlalchemy import text
+    from backend.db.session import engine
+
+    # The joins joinedload() emits for /files and /similar results
+    with engine.connect() as connection:
+        plan = [row[3] for row in connection.execute(text(
+            "EXPLAIN QUERY PLAN SELECT * FROM audio_files "
+            "LEFT JOIN audio_features ON audio_files.id = audio_features.audio_file_id "
+            "LEFT JOIN metadata ON audio_files.id = metadata.audio_file_id "
+            "WHERE audio_files.id IN (1, 2, 3)"
+        ))]
+    assert not [step for step in plan if step.startswith("SCAN") or "AUTOMATIC" in step], plan
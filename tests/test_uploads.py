@@ -0,0 +1,33 @@
+import asyncio
+import hashlib
+import tempfile
+
+import pytest
+
+def spooled_upload(data: bytes, filename: str = "track.wav"):
+    from fastapi import UploadFile
+
+    # Larger than max_size, so the body has rolled over to disk as it does for real uploads
+    spool = tempfile.SpooledTemporaryFile(max_size=1024)
+    spool.write(data)
+    spool.seek(0)
+    return UploadFile(spool, filename=filename)
+
+def test_save_upload_copies_and_hashes(tmp_path):
+    from backend.core.audio.uploads import save_upload
+
+    data = bytes(range(256)) * 64
+    destination = tmp_path / "track.wav"
+    assert asyncio.run(save_upload(spooled_upload(data), destination)) == hashlib.sha256(data).hexdigest()
+    assert destination.read_bytes() == data
+
+def test_oversized_upload_is_removed(tmp_path, monkeypatch):
+    from backend.config import settings
+    from backend.core.audio.uploads import UploadRejectedError, save_upload
+
+    monkeypatch.setattr(settings, "MAX_UPLOAD_SIZE", 4096)
+    destination = tmp_path / "track.wav"
+    with pytest.raises(UploadRejectedError) as e:
+        asyncio.run(save_upload(spooled_upload(b"\0" * 8192), destination))
+    assert e.value.status_code == 413
+    assert not destination.exists()
@@ -0,0 +1,43 @@
+import threading
+
+import numpy as np
+
+def run_concurrently(target, count: int = 8, repeat: int = 20):
+    results, errors = [], []
+
+    def run():
+        try:
+            for _ in range(repeat):
+                results.append(target())
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, errors
+
+def test_concurrent_writes_of_the_same_peaks(tmp_path):
+    from backend.core.audio.waveform import WaveformFile, write_peaks_file
+
+    path = tmp_path / "track.peaks"
+    level = np.stack([np.full(4096, -100), np.full(4096, 100)], axis=1).astype(np.int16)
+    _, errors = run_concurrently(lambda: write_peaks_file(str(path), [level], 22050, 256))
+
+    assert errors == []
+    assert [p.name for p in tmp_path.iterdir()] == ["track.peaks"]
+    assert WaveformFile(str(path)).sample_rate == 22050
+
+def test_concurrent_links_of_the_same_file(tmp_path):
+    from backend.core.audio.waveform import WaveformStore, write_peaks_file
+
+    store = WaveformStore(str(tmp_path))
+    level = np.zeros((2048, 2), dtype=np.int8)
+    write_peaks_file(str(store.path_for_hash("ab" * 32)), [level], 22050, 256)
+    results, errors = run_concurrently(lambda: store.link("ab" * 32, 7))
+
+    assert errors == []
+    assert all(results)
+    assert [p.name for p in store.path_for_file(7).parent.iterdir()] == ["7.peaks"]